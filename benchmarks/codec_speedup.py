@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import timeit
+
+from bss_direct_inject.protocol import (
+    ACK,
+    ESC,
+    ETX,
+    NAK,
+    SPECIAL_BYTES,
+    STX,
+    DirectInjectCodec,
+)
+
+
+def _legacy_escape_bytes(data: bytes) -> bytes:
+    escaped = bytearray()
+    for byte in data:
+        if byte in SPECIAL_BYTES:
+            escaped.append(ESC)
+            escaped.append(byte + 0x80)
+        else:
+            escaped.append(byte)
+    return bytes(escaped)
+
+
+def _legacy_unescape_bytes(data: bytes) -> bytes:
+    unescaped = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte == ESC:
+            unescaped.append(data[i + 1] - 0x80)
+            i += 2
+        else:
+            unescaped.append(byte)
+            i += 1
+    return bytes(unescaped)
+
+
+def _legacy_checksum(data: bytes) -> int:
+    value = 0
+    for byte in data:
+        value ^= byte
+    return value & 0xFF
+
+
+def legacy_encode(body: bytes) -> bytes:
+    checksum = _legacy_checksum(body)
+    escaped_body = _legacy_escape_bytes(body)
+    escaped_checksum = _legacy_escape_bytes(bytes([checksum]))
+    return bytes([STX]) + escaped_body + escaped_checksum + bytes([ETX])
+
+
+def legacy_decode(frame: bytes) -> bytes:
+    unescaped = _legacy_unescape_bytes(frame[1:-1])
+    body, checksum = unescaped[:-1], unescaped[-1]
+    if _legacy_checksum(body) != checksum:
+        msg = "Checksum does not match message body."
+        raise ValueError(msg)
+    return body
+
+
+BODIES = {
+    "set_sv": bytes([0x88, 0x00, 0x01, 0x03, 0x00, 0x01, 0x00, 0x00, 0x00])
+    + (-100000).to_bytes(4, "big", signed=True),
+    "set_sv_escaped": bytes([0x88, 0x00, 0x02, 0x03, 0x00, 0x01, 0x06, 0x00, 0x15])
+    + (3).to_bytes(4, "big"),
+    "string_sv": bytes([0x91, 0x00, 0x01, 0x03, 0x00, 0x01, 0x00, 0x00, 0x02])
+    + b"\x00\x21"
+    + b"a" * 32
+    + b"\x00",
+    "worst_case_1k": bytes([STX, ETX, ACK, NAK, ESC]) * 205,
+}
+
+
+def _best_of(func, arg: bytes, number: int) -> float:
+    return min(timeit.repeat(lambda: func(arg), number=number, repeat=5)) / number
+
+
+def main() -> None:
+    print(f"{'case':<16}{'op':<8}{'legacy us':>12}{'current us':>12}{'speedup':>10}")
+    for name, body in BODIES.items():
+        frame = DirectInjectCodec.encode(body)
+        assert legacy_encode(body) == frame
+        assert legacy_decode(frame) == DirectInjectCodec.decode(frame)
+        number = 200 if len(body) > 100 else 20000
+        for op, legacy, current, arg in (
+            ("encode", legacy_encode, DirectInjectCodec.encode, body),
+            ("decode", legacy_decode, DirectInjectCodec.decode, frame),
+        ):
+            before = _best_of(legacy, arg, number) * 1e6
+            after = _best_of(current, arg, number) * 1e6
+            print(
+                f"{name:<16}{op:<8}{before:>12.3f}{after:>12.3f}{before / after:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+
+def compare(
+    baseline: dict, current: dict, threshold: float
+) -> list[tuple[str, float, float, float, bool]]:
+    rows = []
+    for name, before in baseline["results"].items():
+        after = current["results"].get(name)
+        if after is None:
+            continue
+        old, new = float(before["value"]), float(after["value"])
+        if before["higher_is_better"]:
+            change = old / new - 1.0 if new else float("inf")
+        else:
+            change = new / old - 1.0 if old else float("inf")
+        rows.append((name, old, new, change, change > threshold))
+    return rows
+
+
+def _environment(report: dict) -> tuple[str, str, str, str]:
+    major_minor = ".".join(str(report.get("python", "")).split(".")[:2])
+    # Free-threaded and GIL builds have very different single-thread costs.
+    gil = "gil" if report.get("gil", True) else "free-threaded"
+    return (
+        major_minor,
+        str(report.get("implementation")),
+        str(report.get("machine")),
+        gil,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Flag benchmark regressions against a baseline."
+    )
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("current", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown as a fraction (default: 0.25).",
+    )
+    parser.add_argument(
+        "--allow-mismatch",
+        action="store_true",
+        help="Compare even if the interpreter or machine differs from the baseline.",
+    )
+    args = parser.parse_args(argv)
+    if not args.baseline.exists():
+        # A fresh checkout has no baseline until one is recorded on the
+        # reference machine, and that alone is not a failure.
+        print(
+            f"No baseline at {args.baseline}; skipping the comparison. Record one "
+            "with `just bench-baseline` on the supported interpreter."
+        )
+        return
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    current = json.loads(args.current.read_text(encoding="utf-8"))
+    if _environment(baseline) != _environment(current) and not args.allow_mismatch:
+        raise SystemExit(
+            f"Baseline was recorded on {_environment(baseline)} but this run is "
+            f"{_environment(current)}; re-record it with `just bench-baseline`."
+        )
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'benchmark':<48}{'baseline':>14}{'current':>14}{'slowdown':>10}")
+    for name, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<48}{old:>14.3f}{new:>14.3f}{change:>+10.1%}{flag}")
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        raise SystemExit(f"{len(regressions)} benchmark(s) regressed.")
+
+
+if __name__ == "__main__":
+    main()
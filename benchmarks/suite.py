@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from bss_direct_inject import scaling
+from bss_direct_inject.async_client import AsyncDirectInjectClient
+from bss_direct_inject.capture import CaptureReader, WireCapture
+from bss_direct_inject.client import DirectInjectClient
+from bss_direct_inject.engine import DirectInjectEngine
+from bss_direct_inject.meters import MeterBank
+from bss_direct_inject.protocol import (
+    ACK,
+    ESC,
+    ETX,
+    NAK,
+    STX,
+    DiCommand,
+    DirectInjectCodec,
+    DiTarget,
+    build_bump_sv_percent_body,
+    build_param_preset_recall_body,
+    build_set_string_sv_body,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+    build_subscribe_sv_body,
+    build_subscribe_sv_percent_body,
+    build_unsubscribe_sv_body,
+    build_unsubscribe_sv_percent_body,
+    build_venue_preset_recall_body,
+    compile_target,
+)
+from bss_direct_inject.protocol_client import AsyncDirectInjectProtocolClient
+from bss_direct_inject.replay import replay_capture
+from bss_direct_inject.scene import Scene
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0
+)
+ESCAPED_TARGET = DiTarget(
+    node=0x0002, virtual_device=0x03, object_id=0x000106, state_variable=0x15
+)
+SPECIALS = bytes([STX, ETX, ACK, NAK, ESC])
+
+BODIES = {
+    "set_sv": build_set_sv_body(TARGET, -100000),
+    "set_sv_escaped": build_set_sv_body(ESCAPED_TARGET, 3),
+    "string_sv": build_set_string_sv_body(TARGET, "a" * 32),
+    "worst_case_13": SPECIALS * 2 + SPECIALS[:3],
+    "worst_case_1k": SPECIALS * 205,
+}
+
+BUILDERS: dict[str, Callable[[], bytes]] = {
+    "build_set_sv_body": lambda: build_set_sv_body(TARGET, -100000),
+    "build_set_sv_percent_body": lambda: build_set_sv_percent_body(TARGET, 65536),
+    "build_bump_sv_percent_body": lambda: build_bump_sv_percent_body(TARGET, -65536),
+    "build_subscribe_sv_body": lambda: build_subscribe_sv_body(TARGET, 50),
+    "build_subscribe_sv_percent_body": lambda: build_subscribe_sv_percent_body(
+        TARGET, 50
+    ),
+    "build_unsubscribe_sv_body": lambda: build_unsubscribe_sv_body(TARGET),
+    "build_unsubscribe_sv_percent_body": lambda: build_unsubscribe_sv_percent_body(
+        TARGET
+    ),
+    "build_venue_preset_recall_body": lambda: build_venue_preset_recall_body(3),
+    "build_param_preset_recall_body": lambda: build_param_preset_recall_body(3),
+    "build_set_string_sv_body": lambda: build_set_string_sv_body(TARGET, "a" * 32),
+    "compiled_target_encode": lambda: compile_target(TARGET).encode(
+        DiCommand.SET_SV, -100000
+    ),
+}
+
+Result = dict[str, float | str | bool]
+
+
+def _timing(func: Callable[[], object], number: int) -> Result:
+    best = min(timeit.repeat(func, number=number, repeat=7)) / number
+    return {"value": best * 1e6, "unit": "us", "higher_is_better": False}
+
+
+def _rate(count: int, elapsed: float) -> Result:
+    return {"value": count / elapsed, "unit": "msgs/s", "higher_is_better": True}
+
+
+def _latency(samples: list[float], quantile: float) -> Result:
+    ordered = sorted(samples)
+    value = ordered[min(int(len(ordered) * quantile), len(ordered) - 1)]
+    return {"value": value * 1e6, "unit": "us", "higher_is_better": False}
+
+
+def bench_codec(quick: bool) -> dict[str, Result]:
+    results = {}
+    for name, body in BODIES.items():
+        frame = DirectInjectCodec.encode(body)
+        number = 200 if len(body) > 100 else 20000
+        if quick:
+            number //= 20
+        results[f"codec.encode.{name}"] = _timing(
+            lambda body=body: DirectInjectCodec.encode(body), number
+        )
+        results[f"codec.decode.{name}"] = _timing(
+            lambda frame=frame: DirectInjectCodec.decode(frame), number
+        )
+    return results
+
+
+def bench_builders(quick: bool) -> dict[str, Result]:
+    number = 1000 if quick else 20000
+    return {
+        f"builders.{name}": _timing(func, number) for name, func in BUILDERS.items()
+    }
+
+
+def bench_meters(quick: bool) -> dict[str, Result]:
+    meters = [
+        DiTarget(node=1, virtual_device=3, object_id=0x000200 + index, state_variable=0)
+        for index in range(2000)
+    ]
+    bank = MeterBank()
+    for target in meters:
+        bank.track(target)
+    bodies = [build_set_sv_body(target, -100000) for target in meters]
+    number = 5 if quick else 50
+    start = time.perf_counter()
+    for _ in range(number):
+        bank.ingest(bodies)
+    return {
+        "meters.ingest": _rate(number * len(bodies), time.perf_counter() - start),
+        "meters.peaks": _timing(bank.peaks, number),
+    }
+
+
+def bench_scaling(quick: bool) -> dict[str, Result]:
+    raws = list(range(-300000, 100000, 40))
+    frequencies = [20.0 + index for index in range(10000)]
+    number = 2 if quick else 20
+    return {
+        "scaling.raw_to_gain_many": _timing(
+            lambda: scaling.raw_to_gain_many(raws), number
+        ),
+        "scaling.frequency_to_raw_many": _timing(
+            lambda: scaling.frequency_to_raw_many(frequencies), number
+        ),
+    }
+
+
+def bench_scene(quick: bool) -> dict[str, Result]:
+    targets = [
+        DiTarget(node=1, virtual_device=3, object_id=index, state_variable=0)
+        for index in range(4096)
+    ]
+    known = dict.fromkeys(targets, 0)
+    # A cue that moves one parameter in ten.
+    scene = Scene(
+        {target: int(index % 10 == 0) for index, target in enumerate(targets)}
+    )
+    number = 5 if quick else 50
+    return {
+        "scene.diff": _timing(lambda: scene.diff(known), number),
+        "scene.diff_bodies": _timing(lambda: scene.diff(known).bodies(), number),
+    }
+
+
+def bench_capture(quick: bool) -> dict[str, Result]:
+    count = 2000 if quick else 20000
+    frame = DirectInjectCodec.encode(build_set_sv_body(TARGET, -100000))
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.dicap"
+        started = time.perf_counter()
+        with WireCapture(path) as capture:
+            for _ in range(count):
+                capture.record_send(frame)
+        recorded = _rate(count, time.perf_counter() - started)
+        started = time.perf_counter()
+        with CaptureReader(path) as reader:
+            indexed = _rate(count, time.perf_counter() - started)
+            replayed = asyncio.run(_replay_at_max_speed(reader))
+    return {
+        "capture.record": recorded,
+        "capture.index": indexed,
+        "capture.replay_max": replayed,
+    }
+
+
+async def _replay_at_max_speed(reader: CaptureReader) -> Result:
+    async with DeviceSimulator(port=0) as simulator:
+        host, port = simulator.address
+        stats = await replay_capture(reader, host, port=port, speed=None, settle=5.0)
+    return _rate(stats.acks, stats.elapsed)
+
+
+def _encode_snapshot(targets: list[DiTarget], value: int) -> int:
+    size = 0
+    for target in targets:
+        size += len(compile_target(target).encode(DiCommand.SET_SV, value))
+    return size
+
+
+def bench_threads(quick: bool) -> dict[str, Result]:
+    # Encoding a large snapshot split across threads only scales with the core
+    # count on free-threaded builds; with the GIL the rates stay roughly flat.
+    targets = [
+        DiTarget(node=1, virtual_device=3, object_id=index, state_variable=0)
+        for index in range(4096)
+    ]
+    rounds = 5 if quick else 50
+    _encode_snapshot(targets, 0)
+    results = {}
+    for threads in (1, 2, 4):
+        chunks = [targets[index::threads] for index in range(threads)]
+        with ThreadPoolExecutor(threads) as executor:
+            start = time.perf_counter()
+            for value in range(rounds):
+                list(executor.map(_encode_snapshot, chunks, [value] * threads))
+            elapsed = time.perf_counter() - start
+        results[f"threads.encode.{threads}"] = _rate(rounds * len(targets), elapsed)
+    return results
+
+
+async def _bench_async_client(
+    host: str,
+    port: int,
+    rounds: int,
+    batch: int,
+    client_class: type[AsyncDirectInjectClient] = AsyncDirectInjectClient,
+    prefix: str = "async_client",
+) -> dict[str, Result]:
+    body = BODIES["set_sv"]
+    results = {}
+    async with client_class(
+        host, port=port, expect_ack=True, background_reader=True, ack_window=64
+    ) as client:
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await client.send_body(body)
+            samples.append(time.perf_counter() - start)
+        results[f"{prefix}.round_trip.p50"] = _latency(samples, 0.5)
+        results[f"{prefix}.round_trip.p99"] = _latency(samples, 0.99)
+
+        start = time.perf_counter()
+        await client.send_many([body] * batch)
+        results[f"{prefix}.send_many"] = _rate(batch, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        futures = [await client.send_body_pipelined(body) for _ in range(batch)]
+        await asyncio.gather(*futures)
+        results[f"{prefix}.pipelined"] = _rate(batch, time.perf_counter() - start)
+    return results
+
+
+def _send_repeatedly(client: DirectInjectClient, body: bytes, count: int) -> None:
+    for _ in range(count):
+        client.send_body(body)
+
+
+def _bench_sync_client(
+    host: str, port: int, rounds: int, batch: int
+) -> dict[str, Result]:
+    body = BODIES["set_sv"]
+    results = {}
+    with DirectInjectClient(host, port=port, expect_ack=True, ack_window=64) as client:
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            client.send_body(body)
+            samples.append(time.perf_counter() - start)
+        results["sync_client.round_trip.p50"] = _latency(samples, 0.5)
+        results["sync_client.round_trip.p99"] = _latency(samples, 0.99)
+
+        start = time.perf_counter()
+        client.send_many([body] * batch)
+        results["sync_client.send_many"] = _rate(batch, time.perf_counter() - start)
+    for count in (1, 4):
+        with DirectInjectClient(
+            host, port=port, expect_ack=True, ack_window=64, background_reader=True
+        ) as client:
+            per_thread = batch // count
+            threads = [
+                threading.Thread(
+                    target=_send_repeatedly, args=(client, body, per_thread)
+                )
+                for _ in range(count)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results[f"sync_client.threaded.{count}"] = _rate(
+                count * per_thread, time.perf_counter() - start
+            )
+    return results
+
+
+def _bench_engine(host: str, port: int, batch: int) -> dict[str, Result]:
+    body = BODIES["set_sv"]
+    with DirectInjectEngine(expect_ack=True) as engine:
+        devices = [engine.add_device(host, port) for _ in range(4)]
+        engine.run(lambda: all(device.connected for device in devices))
+        per_device = batch // 4
+        start = time.perf_counter()
+        # Each device acknowledges in order, so its last future finishes last.
+        last = [
+            [device.send_body(body) for _ in range(per_device)][-1]
+            for device in devices
+        ]
+        engine.run(lambda: all(future.done() for future in last))
+        elapsed = time.perf_counter() - start
+    return {"engine.four_devices": _rate(4 * per_device, elapsed)}
+
+
+async def _receive_notifications(
+    client_class: type[AsyncDirectInjectClient], host: str, port: int, count: int
+) -> float:
+    received = asyncio.get_running_loop().create_future()
+    seen = 0
+
+    def handler(notification: object) -> None:
+        nonlocal seen
+        seen += 1
+        if seen == count:
+            received.set_result(None)
+
+    start = time.perf_counter()
+    async with client_class(host, port=port, background_reader=True) as client:
+        client.add_handler(None, handler)
+        await received
+    return time.perf_counter() - start
+
+
+async def _bench_notifications(count: int) -> dict[str, Result]:
+    payload = DirectInjectCodec.encode(BODIES["set_sv"]) * count
+
+    async def blast(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.write(payload)
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(blast, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    results = {}
+    async with server:
+        for prefix, client_class in (
+            ("async_client", AsyncDirectInjectClient),
+            ("protocol_client", AsyncDirectInjectProtocolClient),
+        ):
+            elapsed = await _receive_notifications(client_class, host, port, count)
+            results[f"{prefix}.notifications"] = _rate(count, elapsed)
+    return results
+
+
+def bench_clients(quick: bool) -> dict[str, Result]:
+    rounds, batch = (200, 2000) if quick else (2000, 20000)
+    loop = asyncio.new_event_loop()
+    simulator = DeviceSimulator(port=0)
+    loop.run_until_complete(simulator.start())
+    host, port = simulator.address
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        results = _bench_sync_client(host, port, rounds, batch)
+        results.update(_bench_engine(host, port, batch))
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+    results.update(
+        loop.run_until_complete(_bench_async_client(host, port, rounds, batch))
+    )
+    results.update(
+        loop.run_until_complete(
+            _bench_async_client(
+                host,
+                port,
+                rounds,
+                batch,
+                AsyncDirectInjectProtocolClient,
+                "protocol_client",
+            )
+        )
+    )
+    loop.run_until_complete(simulator.close())
+    results.update(loop.run_until_complete(_bench_notifications(batch * 5)))
+    loop.close()
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args(argv)
+    results: dict[str, Result] = {}
+    for bench in (
+        bench_codec,
+        bench_builders,
+        bench_meters,
+        bench_scaling,
+        bench_scene,
+        bench_capture,
+        bench_threads,
+        bench_clients,
+    ):
+        results.update(bench(args.quick))
+    for name, result in results.items():
+        print(f"{name:<48}{result['value']:>14.3f} {result['unit']}")
+    report = {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "gil": sys._is_gil_enabled(),
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
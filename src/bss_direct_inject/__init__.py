@@ -1,14 +1,26 @@
 from .async_client import AsyncDirectInjectClient
+from .capture import CaptureDirection, CaptureReader, CaptureRecord, WireCapture
 from .client import DirectInjectClient, DirectInjectError, DirectInjectNakError
+from .coalesce import AsyncUpdateCoalescer, UpdateCoalescer
+from .engine import DirectInjectEngine, EngineDevice, EngineTimer
+from .meters import MeterBank, MeterRing
+from .metrics import ClientMetrics
+from .mirror import SvMirror, SvSample
+from .pacing import AdaptivePacer
+from .pool import AsyncDirectInjectPool
 from .protocol import (
     ACK,
+    BODY_LAYOUTS,
     ESC,
     ETX,
     NAK,
     STX,
+    CompiledTarget,
     DiCommand,
+    DiNotification,
     DirectInjectCodec,
     DiTarget,
+    FrameDecoder,
     build_bump_sv_percent_body,
     build_param_preset_recall_body,
     build_set_string_sv_body,
@@ -19,7 +31,17 @@ from .protocol import (
     build_unsubscribe_sv_body,
     build_unsubscribe_sv_percent_body,
     build_venue_preset_recall_body,
+    check_value,
+    compile_target,
+    pack_body_into,
+    parse_sv_notification_body,
 )
+from .protocol_client import AsyncDirectInjectProtocolClient
+from .reconnect import ReconnectPolicy
+from .replay import ReplayStats, replay_capture
+from .scene import Scene, SceneChange, SceneDiff, apply_diff, apply_diff_async
+from .simulator import DeviceSimulator
+from .subscriptions import AsyncSubscriptionManager, ManagedSubscription
 
 __all__ = [
     "ACK",
@@ -27,13 +49,44 @@ __all__ = [
     "ETX",
     "NAK",
     "STX",
+    "BODY_LAYOUTS",
+    "CaptureDirection",
+    "CaptureReader",
+    "CaptureRecord",
+    "ClientMetrics",
+    "CompiledTarget",
     "DiCommand",
+    "DiNotification",
     "DiTarget",
+    "AdaptivePacer",
     "AsyncDirectInjectClient",
+    "AsyncDirectInjectPool",
+    "AsyncDirectInjectProtocolClient",
+    "AsyncSubscriptionManager",
+    "AsyncUpdateCoalescer",
+    "DeviceSimulator",
     "DirectInjectClient",
     "DirectInjectCodec",
+    "DirectInjectEngine",
     "DirectInjectError",
     "DirectInjectNakError",
+    "EngineDevice",
+    "EngineTimer",
+    "FrameDecoder",
+    "ManagedSubscription",
+    "MeterBank",
+    "MeterRing",
+    "ReconnectPolicy",
+    "ReplayStats",
+    "Scene",
+    "SceneChange",
+    "SceneDiff",
+    "SvMirror",
+    "SvSample",
+    "UpdateCoalescer",
+    "WireCapture",
+    "apply_diff",
+    "apply_diff_async",
     "build_bump_sv_percent_body",
     "build_param_preset_recall_body",
     "build_set_string_sv_body",
@@ -44,4 +97,9 @@ __all__ = [
     "build_unsubscribe_sv_body",
     "build_unsubscribe_sv_percent_body",
     "build_venue_preset_recall_body",
+    "check_value",
+    "compile_target",
+    "pack_body_into",
+    "replay_capture",
+    "parse_sv_notification_body",
 ]
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Deadline:
+    expires_at: float
+
+    @classmethod
+    def after(cls, timeout: float) -> Deadline:
+        return cls(time.monotonic() + timeout)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def wait_time(self) -> float | None:
+        # The bound for one blocking wait: None waits forever, and an expired
+        # deadline raises instead of turning into a non-blocking call.
+        if self.expires_at == math.inf:
+            return None
+        remaining = self.remaining()
+        if remaining <= 0:
+            msg = "timed out"
+            raise TimeoutError(msg)
+        return remaining
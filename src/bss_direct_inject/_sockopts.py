@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import socket
+from typing import Protocol
+
+# Linux calls it TCP_CORK; the BSDs (including macOS) expose the same idea as
+# TCP_NOPUSH.
+_CORK_OPTION: int | None = getattr(
+    socket, "TCP_CORK", getattr(socket, "TCP_NOPUSH", None)
+)
+
+
+class _SupportsSetsockopt(Protocol):
+    def setsockopt(self, level: int, optname: int, value: int, /) -> None: ...
+
+
+def set_nodelay(sock: _SupportsSetsockopt, enabled: bool) -> None:
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(enabled))
+
+
+def set_cork(sock: _SupportsSetsockopt, enabled: bool) -> bool:
+    if _CORK_OPTION is None:
+        return False
+    sock.setsockopt(socket.IPPROTO_TCP, _CORK_OPTION, int(enabled))
+    return True
@@ -1,27 +1,64 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import time
-from dataclasses import dataclass
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Protocol, TypeVar
 
+from ._deadline import Deadline
+from ._sockopts import set_cork, set_nodelay
+from .capture import WireCapture
+from .metrics import ClientMetrics
+from .pacing import AdaptivePacer
 from .protocol import (
     ACK,
-    ETX,
     NAK,
     STX,
+    DiCommand,
+    DiNotification,
     DirectInjectCodec,
     DiTarget,
-    build_bump_sv_percent_body,
+    FrameDecoder,
     build_param_preset_recall_body,
     build_set_string_sv_body,
-    build_set_sv_body,
-    build_set_sv_percent_body,
-    build_subscribe_sv_body,
-    build_subscribe_sv_percent_body,
-    build_unsubscribe_sv_body,
-    build_unsubscribe_sv_percent_body,
     build_venue_preset_recall_body,
+    compile_target,
+    is_sv_notification_body,
+    parse_sv_notification_body,
 )
+from .reconnect import (
+    ReconnectPolicy,
+    SubscriptionKey,
+    safe_to_resend,
+    subscription_frames,
+)
+
+T = TypeVar("T")
+
+NotificationHandler = Callable[[DiNotification], object]
+
+_RECV_SIZE = 65536
+# Devices reply within a second of receiving a message.
+_LATE_REPLY_GRACE = 1.0
+
+
+class _Writer(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+    def writelines(self, data: Iterable[bytes]) -> None: ...
+
+    async def drain(self) -> None: ...
+
+    def close(self) -> None: ...
+
+    async def wait_closed(self) -> None: ...
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any: ...
 
 
 class AsyncDirectInjectError(RuntimeError):
@@ -38,27 +75,90 @@ class AsyncDirectInjectClient:
     port: int = 1023
     timeout: float = 1.0
     expect_ack: bool = False
+    background_reader: bool = False
+    ack_window: int = 1
+    tcp_nodelay: bool = True
+    reconnect: ReconnectPolicy | None = None
+    metrics: ClientMetrics | None = None
+    pacer: AdaptivePacer | None = None
+    capture: WireCapture | None = None
 
     _reader: asyncio.StreamReader | None = None
-    _writer: asyncio.StreamWriter | None = None
+    _writer: _Writer | None = None
+    _decoder: FrameDecoder = field(default_factory=FrameDecoder)
+    _frames: deque[bytes] = field(default_factory=deque)
+    _reader_task: asyncio.Task[None] | None = None
+    _pending_acks: deque[asyncio.Future[bool]] = field(default_factory=deque)
+    _ack_slots: asyncio.Semaphore | None = None
+    _handlers: dict[DiTarget | None, list[NotificationHandler]] = field(
+        default_factory=dict
+    )
+    _subscriptions: dict[SubscriptionKey, int] = field(default_factory=dict)
+    _outage_frames: deque[bytes] = field(default_factory=deque)
+    _reconnect_task: asyncio.Task[None] | None = None
+    _late_replies: int = 0
+    _late_until: float = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    @property
+    def subscriptions(self) -> dict[SubscriptionKey, int]:
+        return dict(self._subscriptions)
 
     async def connect(self) -> None:
         if self._reader is not None or self._writer is not None:
             return
+        await self._open()
+
+    async def _open(self) -> None:
         reader, writer = await asyncio.wait_for(
             asyncio.open_connection(self.host, self.port),
             timeout=self.timeout,
         )
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            set_nodelay(sock, self.tcp_nodelay)
         self._reader = reader
         self._writer = writer
+        if self.background_reader:
+            self._ack_slots = asyncio.Semaphore(max(1, self.ack_window))
+            self._reader_task = asyncio.create_task(self._read_loop(reader))
 
     async def close(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            try:
+                await self._reconnect_task
+            except asyncio.CancelledError:
+                pass
+            self._reconnect_task = None
+        self._outage_frames.clear()
+        self._subscriptions.clear()
+        await self._drop_connection()
+
+    async def _drop_connection(self) -> None:
         if self._writer is None:
             return
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+            self._ack_slots = None
         self._writer.close()
-        await self._writer.wait_closed()
+        try:
+            await self._writer.wait_closed()
+        except OSError:
+            pass
         self._reader = None
         self._writer = None
+        self._decoder.reset()
+        self._frames.clear()
+        self._late_replies = 0
 
     async def __aenter__(self) -> AsyncDirectInjectClient:
         await self.connect()
@@ -68,39 +168,270 @@ class AsyncDirectInjectClient:
         await self.close()
 
     async def send_body(self, body: bytes, expect_ack: bool | None = None) -> bool:
+        return await self.send_frame(DirectInjectCodec.encode(body), expect_ack)
+
+    async def send_frame(self, frame: bytes, expect_ack: bool | None = None) -> bool:
         if expect_ack is None:
             expect_ack = self.expect_ack
+        if self.reconnect is None:
+            return await self._send_frame(frame, expect_ack)
+        return await self._send_resilient(
+            [frame], expect_ack, lambda: self._send_frame(frame, expect_ack), False
+        )
+
+    async def _send_frame(self, frame: bytes, expect_ack: bool) -> bool:
         writer = self._require_writer()
-        frame = DirectInjectCodec.encode(body)
+        if self._reader_task is None:
+            if self._late_replies:
+                await self._discard_late_replies()
+            await self._pace(1)
+            writer.write(frame)
+            if self.metrics is not None:
+                self.metrics.record_send(frame)
+            if self.capture is not None:
+                self.capture.record_send(frame)
+            await writer.drain()
+            if not expect_ack:
+                return True
+            return await self._read_ack()
+        if not expect_ack:
+            await self._pace(1)
+            writer.write(frame)
+            if self.metrics is not None:
+                self.metrics.record_send(frame)
+            if self.capture is not None:
+                self.capture.record_send(frame)
+            await writer.drain()
+            return True
+        return await (await self._send_frame_pipelined(frame))
+
+    async def send_body_pipelined(self, body: bytes) -> asyncio.Future[bool]:
+        return await self._send_frame_pipelined(DirectInjectCodec.encode(body))
+
+    async def _send_frame_pipelined(self, frame: bytes) -> asyncio.Future[bool]:
+        slots = self._ack_slots
+        if self._reader_task is None or slots is None:
+            msg = "Pipelined sends require background_reader=True."
+            raise AsyncDirectInjectError(msg)
+        writer = self._require_writer()
+        # Pace before taking a slot, so a send cancelled while it waits on the
+        # pacer cannot hold a slot that no future will ever release.
+        await self._pace(1)
+        await slots.acquire()
+        future = self._track_ack()
+        future.add_done_callback(lambda _: slots.release())
         writer.write(frame)
+        if self.metrics is not None:
+            self.metrics.record_send(frame)
+        if self.capture is not None:
+            self.capture.record_send(frame)
         await writer.drain()
+        return future
+
+    async def _pace(self, count: int) -> None:
+        if self.pacer is not None and (delay := self.pacer.reserve(count)) > 0:
+            await asyncio.sleep(delay)
+
+    async def flush_acks(self) -> None:
+        pending = [future for future in self._pending_acks if not future.done()]
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def send_many(
+        self, bodies: Iterable[bytes], expect_ack: bool | None = None
+    ) -> list[bool]:
+        if expect_ack is None:
+            expect_ack = self.expect_ack
+        frames = [DirectInjectCodec.encode(body) for body in bodies]
+        if not frames:
+            return []
+        if self.reconnect is None:
+            return await self._send_frames(frames, expect_ack)
+        return await self._send_resilient(
+            frames,
+            expect_ack,
+            lambda: self._send_frames(frames, expect_ack),
+            [False] * len(frames),
+        )
+
+    async def _send_frames(self, frames: list[bytes], expect_ack: bool) -> list[bool]:
+        writer = self._require_writer()
+        await self._pace(len(frames))
+        if self.metrics is not None:
+            self.metrics.record_sends(frames)
+        if self.capture is not None:
+            self.capture.record_sends(frames)
         if not expect_ack:
-            return True
-        return await self._read_ack()
+            writer.writelines(frames)
+            await writer.drain()
+            return [True] * len(frames)
+        if self._reader_task is None:
+            if self._late_replies:
+                await self._discard_late_replies()
+            writer.writelines(frames)
+            await writer.drain()
+            outcomes: list[bool | BaseException] = []
+            for index in range(len(frames)):
+                try:
+                    outcomes.append(await self._read_ack())
+                except AsyncDirectInjectNakError as exc:
+                    outcomes.append(exc)
+                except BaseException as exc:
+                    # _read_ack accounted for its own reply; the replies to the
+                    # rest of the batch are still to come and must be skipped.
+                    timed_out = not isinstance(exc, asyncio.CancelledError)
+                    for _ in range(len(frames) - index - 1):
+                        self._expect_late_reply(timed_out)
+                    raise
+        else:
+            futures = [self._track_ack() for _ in frames]
+            writer.writelines(frames)
+            await writer.drain()
+            outcomes = await asyncio.gather(*futures, return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        return [True] * len(frames)
+
+    async def _send_resilient(
+        self,
+        frames: list[bytes],
+        expect_ack: bool,
+        operation: Callable[[], Awaitable[T]],
+        buffered: T,
+    ) -> T:
+        if self._reconnect_task is not None:
+            self._buffer_frames(frames, expect_ack)
+            return buffered
+        try:
+            return await operation()
+        except (OSError, AsyncDirectInjectError) as exc:
+            lost = isinstance(exc, OSError) or self._at_eof()
+            if not lost:
+                raise
+            self._begin_outage()
+            if not safe_to_resend(frames):
+                # The device may already have applied it, so a resend could
+                # apply a bump twice.
+                msg = "Connection lost while sending a bump; it was not resent."
+                raise AsyncDirectInjectError(msg) from exc
+            self._buffer_frames(frames, expect_ack)
+            return buffered
+
+    def _buffer_frames(self, frames: list[bytes], expect_ack: bool) -> None:
+        if expect_ack:
+            msg = "Device is unreachable; acknowledged sends are not buffered."
+            raise AsyncDirectInjectError(msg)
+        limit = (self.reconnect or ReconnectPolicy()).buffer_size
+        if len(self._outage_frames) + len(frames) > limit:
+            msg = "Outage buffer is full."
+            raise AsyncDirectInjectError(msg)
+        self._outage_frames.extend(frames)
+
+    def _begin_outage(self) -> None:
+        if self._reconnect_task is None:
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        delays = (self.reconnect or ReconnectPolicy()).delays()
+        await self._drop_connection()
+        while True:
+            try:
+                await self._open()
+                break
+            except OSError:
+                delay = next(delays, None)
+                if delay is None:
+                    self._outage_frames.clear()
+                    self._reconnect_task = None
+                    return
+                await asyncio.sleep(delay)
+        if self.metrics is not None:
+            self.metrics.record_reconnect()
+        replay = subscription_frames(self._subscriptions)
+        try:
+            # Sends made while the replay's ACKs are read are buffered, so keep
+            # going until the buffer stays empty.
+            while replay or self._outage_frames:
+                replay.extend(self._outage_frames)
+                self._outage_frames.clear()
+                await self._replay(replay)
+                replay = []
+        except OSError:
+            self._reconnect_task = None
+            self._begin_outage()
+            return
+        self._reconnect_task = None
+
+    async def _replay(self, frames: list[bytes]) -> None:
+        writer = self._require_writer()
+        tracked = self.expect_ack and self._reader_task is not None
+        if tracked:
+            # Track the device's replies to the replay so they are not matched
+            # to later messages.
+            for _ in frames:
+                self._track_ack().add_done_callback(_retrieve_outcome)
+        writer.writelines(frames)
+        if self.metrics is not None:
+            self.metrics.record_sends(frames)
+        if self.capture is not None:
+            self.capture.record_sends(frames)
+        await writer.drain()
+        if self.expect_ack and not tracked:
+            for _ in frames:
+                with contextlib.suppress(AsyncDirectInjectError):
+                    await self._read_ack()
+
+    @asynccontextmanager
+    async def corked(self) -> AsyncIterator[None]:
+        writer = self._require_writer()
+        sock = writer.get_extra_info("socket")
+        corked = sock is not None and set_cork(sock, True)
+        try:
+            yield
+        finally:
+            if corked:
+                await writer.drain()
+                set_cork(sock, False)
 
     async def set_sv(self, target: DiTarget, data: int) -> bool:
-        return await self.send_body(build_set_sv_body(target, data))
+        return await self.send_frame(
+            compile_target(target).encode(DiCommand.SET_SV, data)
+        )
 
     async def subscribe_sv(self, target: DiTarget, rate_ms: int) -> bool:
-        return await self.send_body(build_subscribe_sv_body(target, rate_ms))
+        frame = compile_target(target).encode(DiCommand.SUBSCRIBE_SV, rate_ms)
+        self._subscriptions[(DiCommand.SUBSCRIBE_SV, target)] = rate_ms
+        return await self.send_frame(frame)
 
     async def unsubscribe_sv(self, target: DiTarget) -> bool:
-        return await self.send_body(build_unsubscribe_sv_body(target))
+        self._subscriptions.pop((DiCommand.SUBSCRIBE_SV, target), None)
+        return await self.send_frame(
+            compile_target(target).encode(DiCommand.UNSUBSCRIBE_SV, 0)
+        )
 
     async def set_sv_percent(self, target: DiTarget, percent_scaled: int) -> bool:
-        return await self.send_body(build_set_sv_percent_body(target, percent_scaled))
+        return await self.send_frame(
+            compile_target(target).encode(DiCommand.SET_SV_PERCENT, percent_scaled)
+        )
 
     async def subscribe_sv_percent(self, target: DiTarget, rate_ms: int) -> bool:
-        return await self.send_body(build_subscribe_sv_percent_body(target, rate_ms))
+        frame = compile_target(target).encode(DiCommand.SUBSCRIBE_SV_PERCENT, rate_ms)
+        self._subscriptions[(DiCommand.SUBSCRIBE_SV_PERCENT, target)] = rate_ms
+        return await self.send_frame(frame)
 
     async def unsubscribe_sv_percent(self, target: DiTarget) -> bool:
-        return await self.send_body(build_unsubscribe_sv_percent_body(target))
+        self._subscriptions.pop((DiCommand.SUBSCRIBE_SV_PERCENT, target), None)
+        return await self.send_frame(
+            compile_target(target).encode(DiCommand.UNSUBSCRIBE_SV_PERCENT, 0)
+        )
 
     async def bump_sv_percent(
         self, target: DiTarget, percent_scaled_delta: int
     ) -> bool:
-        return await self.send_body(
-            build_bump_sv_percent_body(target, percent_scaled_delta)
+        return await self.send_frame(
+            compile_target(target).encode(
+                DiCommand.BUMP_SV_PERCENT, percent_scaled_delta
+            )
         )
 
     async def venue_preset_recall(self, preset_number: int) -> bool:
@@ -112,9 +443,41 @@ class AsyncDirectInjectClient:
     async def set_string_sv(self, target: DiTarget, value: str) -> bool:
         return await self.send_body(build_set_string_sv_body(target, value))
 
-    async def read_body(self) -> bytes:
+    def add_handler(
+        self, target: DiTarget | None, handler: NotificationHandler
+    ) -> None:
+        self._handlers.setdefault(target, []).append(handler)
+
+    def remove_handler(
+        self, target: DiTarget | None, handler: NotificationHandler
+    ) -> None:
+        handlers = self._handlers.get(target)
+        if not handlers or handler not in handlers:
+            return
+        handlers.remove(handler)
+        if not handlers:
+            del self._handlers[target]
+
+    def notification_queue(
+        self, target: DiTarget | None, maxsize: int = 0
+    ) -> asyncio.Queue[DiNotification]:
+        queue: asyncio.Queue[DiNotification] = asyncio.Queue(maxsize)
+
+        def put_latest(notification: DiNotification) -> None:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(notification)
+
+        self.add_handler(target, put_latest)
+        return queue
+
+    async def read_body(self, timeout: float | None = None) -> bytes:
+        if self._reader_task is not None:
+            msg = "read_body is unavailable while the background reader is running."
+            raise AsyncDirectInjectError(msg)
         reader = self._require_reader()
-        frame = await self._read_frame(reader)
+        deadline = Deadline.after(self.timeout if timeout is None else timeout)
+        frame = await asyncio.wait_for(self._read_frame(reader), deadline.wait_time())
         return DirectInjectCodec.decode(frame)
 
     def _require_reader(self) -> asyncio.StreamReader:
@@ -123,7 +486,7 @@ class AsyncDirectInjectClient:
             raise AsyncDirectInjectError(msg)
         return self._reader
 
-    def _require_writer(self) -> asyncio.StreamWriter:
+    def _require_writer(self) -> _Writer:
         if self._writer is None:
             msg = "Client is not connected."
             raise AsyncDirectInjectError(msg)
@@ -131,34 +494,228 @@ class AsyncDirectInjectClient:
 
     async def _read_ack(self) -> bool:
         reader = self._require_reader()
-        deadline = time.monotonic() + self.timeout
-        while time.monotonic() < deadline:
-            remaining = max(0.0, deadline - time.monotonic())
+        started = time.monotonic()
+        deadline = Deadline.after(self.timeout)
+        while True:
             try:
-                data = await asyncio.wait_for(reader.readexactly(1), timeout=remaining)
+                frame = await asyncio.wait_for(
+                    self._next_frame(reader), deadline.wait_time()
+                )
             except TimeoutError:
                 break
-            byte = data[0]
+            except asyncio.CancelledError:
+                # The reply is still on its way, so treat it like a timed-out
+                # one rather than matching it to the next message.
+                self._expect_late_reply(timed_out=False)
+                raise
+            byte = frame[0]
+            if byte == ACK or byte == NAK:
+                _record_outcome(
+                    self.metrics, self.pacer, byte == ACK, time.monotonic() - started
+                )
             if byte == ACK:
                 return True
             if byte == NAK:
                 msg = "Device returned NAK."
                 raise AsyncDirectInjectNakError(msg)
-            if byte == STX:
-                frame = await self._read_frame(reader, prefix=data)
-                _ = DirectInjectCodec.decode(frame)
+            _ = DirectInjectCodec.decode(frame)
+        self._expect_late_reply()
         msg = "Timed out waiting for ACK/NAK."
         raise AsyncDirectInjectError(msg)
 
-    async def _read_frame(
-        self, reader: asyncio.StreamReader, prefix: bytes = b""
-    ) -> bytes:
-        buffer = bytearray(prefix)
-        while True:
-            if buffer and buffer[0] != STX:
-                buffer.pop(0)
+    def _expect_late_reply(self, timed_out: bool = True) -> None:
+        # A reply may still arrive for a timed-out message. With the background
+        # reader it is dropped if nothing is pending; otherwise buffered replies
+        # are discarded before the next send so they cannot be matched to it.
+        self._late_replies += 1
+        self._late_until = time.monotonic() + max(self.timeout, _LATE_REPLY_GRACE)
+        if not timed_out:
+            return
+        if self.pacer is not None:
+            self.pacer.record_timeout()
+        if self.metrics is not None:
+            self.metrics.record_timeout()
+
+    async def _discard_late_replies(self) -> None:
+        if time.monotonic() > self._late_until:
+            self._late_replies = 0
+            return
+        reader = self._require_reader()
+        try:
+            while True:
+                async with asyncio.timeout(0):
+                    chunk = await reader.read(_RECV_SIZE)
+                if not chunk:
+                    break
+                if self.capture is not None:
+                    self.capture.record_received(chunk)
+                self._frames.extend(self._decoder.feed(chunk))
+        except TimeoutError:
+            pass
+        kept: deque[bytes] = deque()
+        for frame in self._frames:
+            if frame[0] != STX and self._late_replies:
+                self._late_replies -= 1
                 continue
-            chunk = await reader.readexactly(1)
-            buffer.extend(chunk)
-            if buffer[-1] == ETX:
-                return bytes(buffer)
+            kept.append(frame)
+        self._frames = kept
+
+    def _expire_ack(self, future: asyncio.Future[bool]) -> None:
+        # Expired futures leave the queue so a reply that never comes cannot
+        # swallow the next message's ACK. A late reply is ambiguous: if other
+        # messages are pending it is matched to the oldest one.
+        if future.done():
+            return
+        try:
+            self._pending_acks.remove(future)
+        except ValueError:
+            pass
+        future.set_exception(AsyncDirectInjectError("Timed out waiting for ACK/NAK."))
+        self._expect_late_reply()
+
+    def _track_ack(self) -> asyncio.Future[bool]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[bool] = loop.create_future()
+        timer = loop.call_later(self.timeout, self._expire_ack, future)
+        future.add_done_callback(lambda _: timer.cancel())
+        if self.metrics is not None or self.pacer is not None:
+            future.add_done_callback(
+                partial(_record_reply, self.metrics, self.pacer, time.monotonic())
+            )
+        self._pending_acks.append(future)
+        return future
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        error = AsyncDirectInjectError("Client closed.")
+        lost = False
+        try:
+            while True:
+                chunk = await reader.read(_RECV_SIZE)
+                if not chunk:
+                    error = AsyncDirectInjectError("Connection closed by device.")
+                    lost = True
+                    return
+                if self.metrics is not None:
+                    self.metrics.record_received(len(chunk))
+                if self.capture is not None:
+                    self.capture.record_received(chunk)
+                for frame in self._decoder.feed(chunk):
+                    self._dispatch_frame(frame)
+        except OSError as exc:
+            error = AsyncDirectInjectError(f"Connection lost: {exc}")
+            lost = True
+        finally:
+            self._finish_reading(error, lost)
+
+    def _finish_reading(self, error: AsyncDirectInjectError, lost: bool) -> None:
+        while self._pending_acks:
+            future = self._pending_acks.popleft()
+            if not future.done():
+                future.set_exception(error)
+        if lost and self.reconnect is not None:
+            self._begin_outage()
+
+    def _at_eof(self) -> bool:
+        return self._reader is not None and self._reader.at_eof()
+
+    def _dispatch_frame(self, frame: bytes) -> None:
+        byte = frame[0]
+        if byte == ACK or byte == NAK:
+            self._dispatch_reply(byte)
+            return
+        try:
+            body = DirectInjectCodec.decode(frame)
+        except ValueError as exc:
+            self._report_malformed(exc)
+            return
+        self._dispatch_body(body)
+
+    def _dispatch_reply(self, byte: int) -> None:
+        if not self._pending_acks:
+            self._late_replies = max(0, self._late_replies - 1)
+            return
+        future = self._pending_acks.popleft()
+        if future.done():
+            return
+        if byte == ACK:
+            future.set_result(True)
+        else:
+            future.set_exception(AsyncDirectInjectNakError("Device returned NAK."))
+
+    def _report_malformed(self, exc: ValueError) -> None:
+        self._report_error("Dropped malformed Direct Inject frame.", exc)
+
+    def _dispatch_body(self, body: bytes | memoryview) -> None:
+        if not is_sv_notification_body(body):
+            return
+        if self.metrics is not None:
+            self.metrics.record_notification(body[0])
+        notification = parse_sv_notification_body(body)
+        for key in (notification.target, None):
+            for handler in tuple(self._handlers.get(key, ())):
+                try:
+                    handler(notification)
+                except Exception as exc:
+                    self._report_error("Notification handler raised.", exc)
+
+    def _report_error(self, message: str, exc: BaseException) -> None:
+        asyncio.get_running_loop().call_exception_handler(
+            {"message": message, "exception": exc, "client": self}
+        )
+
+    async def _read_frame(self, reader: asyncio.StreamReader) -> bytes:
+        while True:
+            frame = await self._next_frame(reader)
+            if frame[0] == STX:
+                return frame
+
+    async def _next_frame(self, reader: asyncio.StreamReader) -> bytes:
+        while not self._frames:
+            chunk = await reader.read(_RECV_SIZE)
+            if not chunk:
+                msg = "Connection closed by device."
+                raise AsyncDirectInjectError(msg)
+            if self.metrics is not None:
+                self.metrics.record_received(len(chunk))
+            if self.capture is not None:
+                self.capture.record_received(chunk)
+            self._frames.extend(self._decoder.feed(chunk))
+        return self._frames.popleft()
+
+
+def _retrieve_outcome(future: asyncio.Future[bool]) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+def _record_reply(
+    metrics: ClientMetrics | None,
+    pacer: AdaptivePacer | None,
+    sent_at: float,
+    future: asyncio.Future[bool],
+) -> None:
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is None:
+        _record_outcome(metrics, pacer, True, time.monotonic() - sent_at)
+    elif isinstance(exc, AsyncDirectInjectNakError):
+        _record_outcome(metrics, pacer, False, time.monotonic() - sent_at)
+
+
+def _record_outcome(
+    metrics: ClientMetrics | None,
+    pacer: AdaptivePacer | None,
+    acked: bool,
+    latency: float,
+) -> None:
+    if pacer is not None:
+        if acked:
+            pacer.record_ack(latency)
+        else:
+            pacer.record_nak()
+    if metrics is not None:
+        if acked:
+            metrics.record_ack(latency)
+        else:
+            metrics.record_nak(latency)
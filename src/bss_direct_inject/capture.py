@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import BinaryIO
+
+MAGIC = b"BSSDICAP"
+VERSION = 1
+
+# Magic, version, reserved, wall-clock start in ns since the epoch.
+_HEADER = struct.Struct("<8sHHq")
+# Nanoseconds since the start, direction, payload length.
+_RECORD = struct.Struct("<qBI")
+
+
+class CaptureDirection(IntEnum):
+    SENT = 0
+    RECEIVED = 1
+
+
+@dataclass(frozen=True)
+class CaptureRecord:
+    timestamp: float
+    direction: CaptureDirection
+    data: bytes
+
+
+@dataclass
+class WireCapture:
+    path: str | os.PathLike[str]
+    buffering: int = 65536
+
+    records: int = field(default=0, init=False)
+
+    _file: BinaryIO | None = field(default=None, init=False, repr=False)
+    _origin_ns: int = field(default=0, init=False, repr=False)
+    _last_ns: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        file = open(self.path, "a+b", buffering=self.buffering)
+        try:
+            if file.seek(0, os.SEEK_END) == 0:
+                started_ns = time.time_ns()
+                file.write(_HEADER.pack(MAGIC, VERSION, 0, started_ns))
+                file.flush()
+            else:
+                started_ns, self._last_ns, self.records = _resume(file)
+        except BaseException:
+            file.close()
+            raise
+        # Appended records keep counting from the original start, and never run
+        # backwards even if the wall clock has been stepped since.
+        self._origin_ns = time.monotonic_ns() - max(
+            time.time_ns() - started_ns, self._last_ns
+        )
+        self._file = file
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def record_send(self, frame: bytes) -> None:
+        self._record(CaptureDirection.SENT, (frame,))
+
+    def record_sends(self, frames: Iterable[bytes]) -> None:
+        self._record(CaptureDirection.SENT, frames)
+
+    def record_received(self, chunk: bytes | memoryview) -> None:
+        self._record(CaptureDirection.RECEIVED, (chunk,))
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            file, self._file = self._file, None
+        if file is not None:
+            file.close()
+
+    def __enter__(self) -> WireCapture:
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def _record(
+        self, direction: CaptureDirection, payloads: Iterable[bytes | memoryview]
+    ) -> None:
+        with self._lock:
+            file = self._file
+            if file is None:
+                return
+            timestamp = max(time.monotonic_ns() - self._origin_ns, self._last_ns)
+            self._last_ns = timestamp
+            for payload in payloads:
+                file.write(_RECORD.pack(timestamp, direction, len(payload)))
+                file.write(payload)
+                self.records += 1
+
+
+@dataclass
+class CaptureReader:
+    path: str | os.PathLike[str]
+
+    started_at: float = field(default=0.0, init=False)
+
+    _file: BinaryIO | None = field(default=None, init=False, repr=False)
+    _map: mmap.mmap | None = field(default=None, init=False, repr=False)
+    # The time index: one timestamp and file offset per record, in file order.
+    _times: array[int] = field(default_factory=lambda: array("q"), init=False)
+    _offsets: array[int] = field(default_factory=lambda: array("q"), init=False)
+
+    def __post_init__(self) -> None:
+        file = open(self.path, "rb")
+        try:
+            started_ns = _read_header(file)
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            file.close()
+            raise
+        self._file = file
+        self.started_at = started_ns / 1e9
+        _index(self._map, self._times, self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> CaptureRecord:
+        data = self._require_map()
+        offset = self._offsets[index]
+        timestamp, direction, length = _RECORD.unpack_from(data, offset)
+        start = offset + _RECORD.size
+        return CaptureRecord(
+            timestamp / 1e9, CaptureDirection(direction), data[start : start + length]
+        )
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        return self.between()
+
+    @property
+    def duration(self) -> float:
+        if not self._times:
+            return 0.0
+        return (self._times[-1] - self._times[0]) / 1e9
+
+    def index_at(self, timestamp: float) -> int:
+        return bisect_left(self._times, round(timestamp * 1e9))
+
+    def between(
+        self,
+        start: float = 0.0,
+        end: float | None = None,
+        direction: CaptureDirection | None = None,
+    ) -> Iterator[CaptureRecord]:
+        stop = len(self) if end is None else self.index_at(end)
+        for index in range(self.index_at(start), stop):
+            record = self[index]
+            if direction is None or record.direction == direction:
+                yield record
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> CaptureReader:
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def _require_map(self) -> mmap.mmap:
+        if self._map is None:
+            msg = "Capture is closed."
+            raise ValueError(msg)
+        return self._map
+
+
+def _read_header(file: BinaryIO) -> int:
+    file.seek(0)
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        msg = "Not a Direct Inject capture."
+        raise ValueError(msg)
+    magic, version, _, started_ns = _HEADER.unpack(header)
+    if magic != MAGIC:
+        msg = "Not a Direct Inject capture."
+        raise ValueError(msg)
+    if version != VERSION:
+        msg = f"Unsupported capture version {version}."
+        raise ValueError(msg)
+    return started_ns
+
+
+def _index(data: mmap.mmap, times: array[int], offsets: array[int]) -> int:
+    # Only record headers are read, so indexing touches a small part of the map.
+    # Returns where the last complete record ends; anything after it was torn.
+    offset = _HEADER.size
+    size = len(data)
+    while offset + _RECORD.size <= size:
+        timestamp, _, length = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + length
+        if end > size:
+            break
+        times.append(timestamp)
+        offsets.append(offset)
+        offset = end
+    return offset
+
+
+def _resume(file: BinaryIO) -> tuple[int, int, int]:
+    started_ns = _read_header(file)
+    times: array[int] = array("q")
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        end = _index(data, times, array("q"))
+    # Drop a record torn by a crash so new records stay readable.
+    file.truncate(end)
+    file.seek(end)
+    return started_ns, times[-1] if times else 0, len(times)
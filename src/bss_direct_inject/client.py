@@ -1,27 +1,56 @@
 from __future__ import annotations
 
+import contextlib
+import logging
+import queue
+import selectors
 import socket
+import threading
 import time
-from dataclasses import dataclass
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TypeVar
 
+from ._deadline import Deadline
+from ._sockopts import set_cork, set_nodelay
+from .capture import WireCapture
+from .metrics import ClientMetrics
+from .pacing import AdaptivePacer
 from .protocol import (
     ACK,
-    ETX,
     NAK,
     STX,
+    DiCommand,
+    DiNotification,
     DirectInjectCodec,
     DiTarget,
-    build_bump_sv_percent_body,
+    FrameDecoder,
     build_param_preset_recall_body,
     build_set_string_sv_body,
-    build_set_sv_body,
-    build_set_sv_percent_body,
-    build_subscribe_sv_body,
-    build_subscribe_sv_percent_body,
-    build_unsubscribe_sv_body,
-    build_unsubscribe_sv_percent_body,
     build_venue_preset_recall_body,
+    compile_target,
+    is_sv_notification_body,
+    parse_sv_notification_body,
 )
+from .reconnect import (
+    ReconnectPolicy,
+    SubscriptionKey,
+    safe_to_resend,
+    subscription_frames,
+)
+
+_RECV_SIZE = 65536
+# Devices reply within a second of receiving a message.
+_LATE_REPLY_GRACE = 1.0
+
+T = TypeVar("T")
+
+NotificationHandler = Callable[[DiNotification], object]
+
+_logger = logging.getLogger(__name__)
 
 
 class DirectInjectError(RuntimeError):
@@ -38,21 +67,95 @@ class DirectInjectClient:
     port: int = 1023
     timeout: float = 1.0
     expect_ack: bool = False
+    ack_window: int = 1
+    tcp_nodelay: bool = True
+    reconnect: ReconnectPolicy | None = None
+    metrics: ClientMetrics | None = None
+    background_reader: bool = False
+    pacer: AdaptivePacer | None = None
+    capture: WireCapture | None = None
 
     _socket: socket.socket | None = None
+    _decoder: FrameDecoder = field(default_factory=FrameDecoder)
+    _frames: deque[bytes] = field(default_factory=deque)
+    _in_flight: deque[tuple[Future[bool], float]] = field(default_factory=deque)
+    _subscriptions: dict[SubscriptionKey, int] = field(default_factory=dict)
+    _outage_frames: deque[bytes] = field(default_factory=deque)
+    _backoff: Iterator[float] | None = None
+    _next_attempt: float = 0.0
+    _late_replies: int = 0
+    _late_until: float = 0.0
+    # Handler tuples are replaced, never mutated, so the reader needs no lock.
+    _handlers: dict[DiTarget | None, tuple[NotificationHandler, ...]] = field(
+        default_factory=dict
+    )
+    _handler_lock: threading.Lock = field(default_factory=threading.Lock)
+    _reader_thread: threading.Thread | None = None
+    _reader_error: DirectInjectError | None = None
+    _ack_slots: threading.Semaphore | None = None
+    # Writes and the in-flight queue have separate locks so a sendall blocked on
+    # a full send buffer never stops the reader from draining replies.
+    _write_lock: threading.Lock = field(default_factory=threading.Lock)
+    _ack_lock: threading.Lock = field(default_factory=threading.Lock)
+    _reconnect_lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    @property
+    def subscriptions(self) -> dict[SubscriptionKey, int]:
+        return dict(self._subscriptions)
 
     def connect(self) -> None:
         if self._socket is not None:
             return
         sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
         sock.settimeout(self.timeout)
+        set_nodelay(sock, self.tcp_nodelay)
         self._socket = sock
+        if self.background_reader:
+            self._reader_error = None
+            self._ack_slots = threading.Semaphore(max(1, self.ack_window))
+            self._reader_thread = threading.Thread(
+                target=self._read_loop,
+                args=(sock,),
+                name=f"direct-inject-reader-{self.host}:{self.port}",
+                daemon=True,
+            )
+            self._reader_thread.start()
 
     def close(self) -> None:
-        if self._socket is None:
+        self._backoff = None
+        self._outage_frames.clear()
+        self._subscriptions.clear()
+        self._drop_connection()
+
+    def _drop_connection(self) -> None:
+        sock = self._socket
+        if sock is None:
             return
-        self._socket.close()
+        self._fail_in_flight(DirectInjectError("Client closed."))
+        thread = self._reader_thread
+        if thread is not None:
+            with contextlib.suppress(OSError):
+                sock.shutdown(socket.SHUT_RDWR)
+            if thread is not threading.current_thread():
+                thread.join()
+            self._reader_thread = None
+        sock.close()
         self._socket = None
+        self._decoder.reset()
+        self._frames.clear()
+        self._late_replies = 0
+
+    def _fail_in_flight(self, error: DirectInjectError) -> None:
+        with self._ack_lock:
+            failed = [future for future, _ in self._in_flight]
+            self._in_flight.clear()
+        for future in failed:
+            if not future.done():
+                future.set_exception(error)
 
     def __enter__(self) -> DirectInjectClient:
         self.connect()
@@ -62,35 +165,256 @@ class DirectInjectClient:
         self.close()
 
     def send_body(self, body: bytes, expect_ack: bool | None = None) -> bool:
+        return self.send_frame(DirectInjectCodec.encode(body), expect_ack)
+
+    def send_frame(self, frame: bytes, expect_ack: bool | None = None) -> bool:
         if expect_ack is None:
             expect_ack = self.expect_ack
+        if self.reconnect is None:
+            return self._send_frame(frame, expect_ack)
+        return self._send_resilient(
+            [frame], expect_ack, lambda: self._send_frame(frame, expect_ack), False
+        )
+
+    def _send_frame(self, frame: bytes, expect_ack: bool) -> bool:
+        if self._reader_thread is not None:
+            if not expect_ack:
+                self._send_threaded([frame], False)
+                return True
+            return self._send_threaded([frame], True, windowed=True)[0].result()
+        if expect_ack and self._in_flight:
+            future = self._send_frame_pipelined(frame)
+            self._pump_acks(future.done)
+            return future.result()
         sock = self._require_socket()
-        frame = DirectInjectCodec.encode(body)
+        if self._late_replies:
+            self._discard_late_replies(sock)
+        self._pace(1)
         sock.sendall(frame)
+        if self.metrics is not None:
+            self.metrics.record_send(frame)
+        if self.capture is not None:
+            self.capture.record_send(frame)
         if not expect_ack:
             return True
         return self._read_ack()
 
+    def send_body_pipelined(self, body: bytes) -> Future[bool]:
+        return self._send_frame_pipelined(DirectInjectCodec.encode(body))
+
+    def _send_frame_pipelined(self, frame: bytes) -> Future[bool]:
+        if self._reader_thread is not None:
+            return self._send_threaded([frame], True, windowed=True)[0]
+        sock = self._require_socket()
+        window = max(1, self.ack_window)
+        self._pump_acks(lambda: len(self._in_flight) < window)
+        if self._late_replies and not self._in_flight:
+            self._discard_late_replies(sock)
+        future: Future[bool] = Future()
+        self._pace(1)
+        sock.sendall(frame)
+        if self.metrics is not None:
+            self.metrics.record_send(frame)
+        if self.capture is not None:
+            self.capture.record_send(frame)
+        self._in_flight.append((future, time.monotonic() + self.timeout))
+        return future
+
+    def flush_acks(self) -> None:
+        if self._reader_thread is not None:
+            with self._ack_lock:
+                pending = [future for future, _ in self._in_flight]
+            wait(pending)
+            return
+        self._pump_acks(lambda: not self._in_flight)
+
+    def send_many(
+        self, bodies: Iterable[bytes], expect_ack: bool | None = None
+    ) -> list[bool]:
+        if expect_ack is None:
+            expect_ack = self.expect_ack
+        frames = [DirectInjectCodec.encode(body) for body in bodies]
+        if not frames:
+            return []
+        if self.reconnect is None:
+            return self._send_frames(frames, expect_ack)
+        return self._send_resilient(
+            frames,
+            expect_ack,
+            lambda: self._send_frames(frames, expect_ack),
+            [False] * len(frames),
+        )
+
+    def _send_frames(self, frames: list[bytes], expect_ack: bool) -> list[bool]:
+        if self._reader_thread is not None:
+            futures = self._send_threaded(frames, expect_ack)
+            wait(futures)
+            for future in futures:
+                if (exc := future.exception()) is not None:
+                    raise exc
+            return [True] * len(frames)
+        sock = self._require_socket()
+        if self._late_replies and not self._in_flight:
+            self._discard_late_replies(sock)
+        self._pace(len(frames))
+        sock.sendall(b"".join(frames))
+        if self.metrics is not None:
+            self.metrics.record_sends(frames)
+        if self.capture is not None:
+            self.capture.record_sends(frames)
+        if not expect_ack:
+            return [True] * len(frames)
+        deadline = time.monotonic() + self.timeout
+        futures: list[Future[bool]] = []
+        for _ in frames:
+            future: Future[bool] = Future()
+            self._in_flight.append((future, deadline))
+            futures.append(future)
+        self._pump_acks(futures[-1].done)
+        return [future.result() for future in futures]
+
+    def reconnect_now(self) -> None:
+        policy = self.reconnect or ReconnectPolicy()
+        if self._backoff is None:
+            self._drop_connection()
+            self._backoff = policy.delays()
+        self._next_attempt = 0.0
+        while not self._resume():
+            time.sleep(max(0.0, self._next_attempt - time.monotonic()))
+
+    def _send_resilient(
+        self,
+        frames: list[bytes],
+        expect_ack: bool,
+        operation: Callable[[], T],
+        buffered: T,
+    ) -> T:
+        if self._backoff is not None:
+            with self._reconnect_lock:
+                resumed = self._resume()
+            if not resumed:
+                self._buffer_frames(frames, expect_ack)
+                return buffered
+        sock = self._socket
+        try:
+            return operation()
+        except TimeoutError:
+            raise
+        except OSError as exc:
+            with self._reconnect_lock:
+                # Another thread may already have replaced the connection.
+                if self._socket is sock:
+                    self._drop_connection()
+                    self._backoff = (self.reconnect or ReconnectPolicy()).delays()
+                    self._next_attempt = 0.0
+                resumed = self._resume()
+            if not safe_to_resend(frames):
+                # The device may already have applied it, so a resend could
+                # apply a bump twice.
+                msg = "Connection lost while sending a bump; it was not resent."
+                raise DirectInjectError(msg) from exc
+            if not resumed:
+                self._buffer_frames(frames, expect_ack)
+                return buffered
+            return operation()
+
+    def _resume(self) -> bool:
+        backoff = self._backoff
+        if backoff is None:
+            return self._socket is not None
+        now = time.monotonic()
+        if now < self._next_attempt:
+            return False
+        try:
+            self.connect()
+            replay = subscription_frames(self._subscriptions) + list(
+                self._outage_frames
+            )
+            if replay and self._reader_thread is not None:
+                self._send_threaded(replay, self.expect_ack)
+            elif replay:
+                self._require_socket().sendall(b"".join(replay))
+                if self.metrics is not None:
+                    self.metrics.record_sends(replay)
+                if self.capture is not None:
+                    self.capture.record_sends(replay)
+                if self.expect_ack:
+                    # Track the device's replies to the replay so they are not
+                    # matched to later messages.
+                    deadline = time.monotonic() + self.timeout
+                    self._in_flight.extend((Future(), deadline) for _ in replay)
+        except OSError as exc:
+            self._drop_connection()
+            delay = next(backoff, None)
+            if delay is None:
+                self._backoff = None
+                self._outage_frames.clear()
+                msg = "Gave up reconnecting to device."
+                raise DirectInjectError(msg) from exc
+            self._next_attempt = now + delay
+            return False
+        self._backoff = None
+        self._outage_frames.clear()
+        if self.metrics is not None:
+            self.metrics.record_reconnect()
+        return True
+
+    def _buffer_frames(self, frames: list[bytes], expect_ack: bool) -> None:
+        if expect_ack:
+            msg = "Device is unreachable; acknowledged sends are not buffered."
+            raise DirectInjectError(msg)
+        limit = (self.reconnect or ReconnectPolicy()).buffer_size
+        if len(self._outage_frames) + len(frames) > limit:
+            msg = "Outage buffer is full."
+            raise DirectInjectError(msg)
+        self._outage_frames.extend(frames)
+
+    @contextmanager
+    def corked(self) -> Iterator[None]:
+        sock = self._require_socket()
+        corked = set_cork(sock, True)
+        try:
+            yield
+        finally:
+            if corked:
+                set_cork(sock, False)
+
     def set_sv(self, target: DiTarget, data: int) -> bool:
-        return self.send_body(build_set_sv_body(target, data))
+        return self.send_frame(compile_target(target).encode(DiCommand.SET_SV, data))
 
     def subscribe_sv(self, target: DiTarget, rate_ms: int) -> bool:
-        return self.send_body(build_subscribe_sv_body(target, rate_ms))
+        frame = compile_target(target).encode(DiCommand.SUBSCRIBE_SV, rate_ms)
+        self._subscriptions[(DiCommand.SUBSCRIBE_SV, target)] = rate_ms
+        return self.send_frame(frame)
 
     def unsubscribe_sv(self, target: DiTarget) -> bool:
-        return self.send_body(build_unsubscribe_sv_body(target))
+        self._subscriptions.pop((DiCommand.SUBSCRIBE_SV, target), None)
+        return self.send_frame(
+            compile_target(target).encode(DiCommand.UNSUBSCRIBE_SV, 0)
+        )
 
     def set_sv_percent(self, target: DiTarget, percent_scaled: int) -> bool:
-        return self.send_body(build_set_sv_percent_body(target, percent_scaled))
+        return self.send_frame(
+            compile_target(target).encode(DiCommand.SET_SV_PERCENT, percent_scaled)
+        )
 
     def subscribe_sv_percent(self, target: DiTarget, rate_ms: int) -> bool:
-        return self.send_body(build_subscribe_sv_percent_body(target, rate_ms))
+        frame = compile_target(target).encode(DiCommand.SUBSCRIBE_SV_PERCENT, rate_ms)
+        self._subscriptions[(DiCommand.SUBSCRIBE_SV_PERCENT, target)] = rate_ms
+        return self.send_frame(frame)
 
     def unsubscribe_sv_percent(self, target: DiTarget) -> bool:
-        return self.send_body(build_unsubscribe_sv_percent_body(target))
+        self._subscriptions.pop((DiCommand.SUBSCRIBE_SV_PERCENT, target), None)
+        return self.send_frame(
+            compile_target(target).encode(DiCommand.UNSUBSCRIBE_SV_PERCENT, 0)
+        )
 
     def bump_sv_percent(self, target: DiTarget, percent_scaled_delta: int) -> bool:
-        return self.send_body(build_bump_sv_percent_body(target, percent_scaled_delta))
+        return self.send_frame(
+            compile_target(target).encode(
+                DiCommand.BUMP_SV_PERCENT, percent_scaled_delta
+            )
+        )
 
     def venue_preset_recall(self, preset_number: int) -> bool:
         return self.send_body(build_venue_preset_recall_body(preset_number))
@@ -101,10 +425,53 @@ class DirectInjectClient:
     def set_string_sv(self, target: DiTarget, value: str) -> bool:
         return self.send_body(build_set_string_sv_body(target, value))
 
-    def read_body(self) -> bytes:
+    def add_handler(
+        self, target: DiTarget | None, handler: NotificationHandler
+    ) -> None:
+        with self._handler_lock:
+            self._handlers[target] = (*self._handlers.get(target, ()), handler)
+
+    def remove_handler(
+        self, target: DiTarget | None, handler: NotificationHandler
+    ) -> None:
+        with self._handler_lock:
+            handlers = list(self._handlers.get(target, ()))
+            if handler not in handlers:
+                return
+            handlers.remove(handler)
+            if handlers:
+                self._handlers[target] = tuple(handlers)
+            else:
+                del self._handlers[target]
+
+    def notification_queue(
+        self, target: DiTarget | None, maxsize: int = 0
+    ) -> queue.Queue[DiNotification]:
+        notifications: queue.Queue[DiNotification] = queue.Queue(maxsize)
+
+        def put_latest(notification: DiNotification) -> None:
+            while True:
+                try:
+                    notifications.put_nowait(notification)
+                    return
+                except queue.Full:
+                    with contextlib.suppress(queue.Empty):
+                        notifications.get_nowait()
+
+        self.add_handler(target, put_latest)
+        return notifications
+
+    def read_body(self, timeout: float | None = None) -> bytes:
+        if self._reader_thread is not None:
+            msg = "read_body is unavailable while the background reader is running."
+            raise DirectInjectError(msg)
         sock = self._require_socket()
-        frame = self._read_frame(sock)
-        return DirectInjectCodec.decode(frame)
+        deadline = Deadline.after(self.timeout if timeout is None else timeout)
+        frame = self._read_frame(sock, deadline)
+        body = DirectInjectCodec.decode(frame)
+        if self.metrics is not None and is_sv_notification_body(body):
+            self.metrics.record_notification(body[0])
+        return body
 
     def _require_socket(self) -> socket.socket:
         if self._socket is None:
@@ -114,32 +481,256 @@ class DirectInjectClient:
 
     def _read_ack(self) -> bool:
         sock = self._require_socket()
-        deadline = time.monotonic() + self.timeout
-        while time.monotonic() < deadline:
-            data = sock.recv(1)
-            if not data:
+        started = time.monotonic()
+        deadline = Deadline.after(self.timeout)
+        while True:
+            try:
+                frame = self._next_frame(sock, deadline)
+            except TimeoutError:
+                break
+            if frame is None:
                 continue
-            byte = data[0]
+            byte = frame[0]
+            if byte == ACK or byte == NAK:
+                self._record_reply(byte, started)
             if byte == ACK:
                 return True
             if byte == NAK:
                 msg = "Device returned NAK."
                 raise DirectInjectNakError(msg)
-            if byte == STX:
-                frame = self._read_frame(sock, prefix=data)
-                _ = DirectInjectCodec.decode(frame)
+            _ = DirectInjectCodec.decode(frame)
+        self._expect_late_reply()
         msg = "Timed out waiting for ACK/NAK."
         raise DirectInjectError(msg)
 
-    def _read_frame(self, sock: socket.socket, prefix: bytes = b"") -> bytes:
-        buffer = bytearray(prefix)
-        while True:
-            if buffer and buffer[0] != STX:
-                buffer.pop(0)
+    def _expect_late_reply(self) -> None:
+        # A reply may still arrive for a timed-out message. Replies that turn up
+        # while nothing is in flight are discarded before the next send so they
+        # cannot be matched to it.
+        self._late_replies += 1
+        self._late_until = time.monotonic() + max(self.timeout, _LATE_REPLY_GRACE)
+        if self.pacer is not None:
+            self.pacer.record_timeout()
+        if self.metrics is not None:
+            self.metrics.record_timeout()
+
+    def _discard_late_replies(self, sock: socket.socket) -> None:
+        if time.monotonic() > self._late_until:
+            self._late_replies = 0
+            return
+        sock.settimeout(0.0)
+        try:
+            while chunk := sock.recv(_RECV_SIZE):
+                if self.capture is not None:
+                    self.capture.record_received(chunk)
+                self._frames.extend(self._decoder.feed(chunk))
+        except (BlockingIOError, InterruptedError):
+            pass
+        finally:
+            sock.settimeout(self.timeout)
+        kept: deque[bytes] = deque()
+        for frame in self._frames:
+            if frame[0] != STX and self._late_replies:
+                self._late_replies -= 1
                 continue
-            chunk = sock.recv(1)
-            if not chunk:
+            kept.append(frame)
+        self._frames = kept
+
+    def _pump_acks(self, done: Callable[[], bool]) -> None:
+        sock = self._require_socket()
+        while not done():
+            if not self._in_flight:
+                return
+            future, deadline = self._in_flight[0]
+            if deadline <= time.monotonic():
+                # Expired entries are dropped so a reply that never comes cannot
+                # swallow the next message's ACK. A late reply is ambiguous: if
+                # other messages are in flight it is matched to the oldest one.
+                self._in_flight.popleft()
+                future.set_exception(
+                    DirectInjectError("Timed out waiting for ACK/NAK.")
+                )
+                self._expect_late_reply()
+                continue
+            try:
+                frame = self._next_frame(sock, Deadline(deadline))
+            except TimeoutError:
+                continue
+            if frame is None:
+                continue
+            byte = frame[0]
+            if byte == ACK or byte == NAK:
+                resolved, resolved_deadline = self._in_flight.popleft()
+                self._record_reply(byte, resolved_deadline - self.timeout)
+                if byte == ACK:
+                    resolved.set_result(True)
+                else:
+                    resolved.set_exception(DirectInjectNakError("Device returned NAK."))
                 continue
-            buffer.extend(chunk)
-            if buffer[-1] == ETX:
-                return bytes(buffer)
+            _ = DirectInjectCodec.decode(frame)
+
+    def _record_reply(self, byte: int, sent_at: float) -> None:
+        latency = time.monotonic() - sent_at
+        if self.pacer is not None:
+            if byte == ACK:
+                self.pacer.record_ack(latency)
+            else:
+                self.pacer.record_nak()
+        if self.metrics is None:
+            return
+        if byte == ACK:
+            self.metrics.record_ack(latency)
+        else:
+            self.metrics.record_nak(latency)
+
+    def _pace(self, count: int) -> None:
+        if self.pacer is not None and (delay := self.pacer.reserve(count)) > 0:
+            time.sleep(delay)
+
+    def _read_frame(
+        self, sock: socket.socket, deadline: Deadline | None = None
+    ) -> bytes:
+        while True:
+            frame = self._next_frame(sock, deadline)
+            if frame is not None and frame[0] == STX:
+                return frame
+
+    def _next_frame(
+        self, sock: socket.socket, deadline: Deadline | None = None
+    ) -> bytes | None:
+        if not self._frames:
+            if deadline is None:
+                chunk = sock.recv(_RECV_SIZE)
+            else:
+                # The socket timeout makes recv a poll() bounded by what is left
+                # of the operation's deadline, rather than a fresh timeout.
+                sock.settimeout(deadline.wait_time())
+                try:
+                    chunk = sock.recv(_RECV_SIZE)
+                finally:
+                    sock.settimeout(self.timeout)
+            if not chunk:
+                msg = "Connection closed by device."
+                raise ConnectionResetError(msg)
+            if self.metrics is not None:
+                self.metrics.record_received(len(chunk))
+            if self.capture is not None:
+                self.capture.record_received(chunk)
+            self._frames.extend(self._decoder.feed(chunk))
+            if not self._frames:
+                return None
+        return self._frames.popleft()
+
+    def _send_threaded(
+        self, frames: list[bytes], expect_ack: bool, windowed: bool = False
+    ) -> list[Future[bool]]:
+        sock = self._require_socket()
+        if self._reader_error is not None:
+            raise ConnectionResetError(str(self._reader_error))
+        self._pace(len(frames))
+        slots = self._ack_slots if expect_ack and windowed else None
+        if slots is not None:
+            slots.acquire()
+        futures: list[Future[bool]] = []
+        try:
+            with self._write_lock:
+                if expect_ack:
+                    deadline = time.monotonic() + self.timeout
+                    for _ in frames:
+                        future: Future[bool] = Future()
+                        future.set_running_or_notify_cancel()
+                        futures.append(future)
+                    with self._ack_lock:
+                        self._in_flight.extend((future, deadline) for future in futures)
+                sock.sendall(frames[0] if len(frames) == 1 else b"".join(frames))
+        except BaseException:
+            if slots is not None:
+                slots.release()
+            with self._ack_lock:
+                sent = set(futures)
+                self._in_flight = deque(
+                    entry for entry in self._in_flight if entry[0] not in sent
+                )
+            raise
+        if slots is not None:
+            futures[0].add_done_callback(lambda _: slots.release())
+        if self.metrics is not None:
+            self.metrics.record_sends(frames)
+        if self.capture is not None:
+            self.capture.record_sends(frames)
+        return futures
+
+    def _read_loop(self, sock: socket.socket) -> None:
+        decoder = FrameDecoder()
+        error = DirectInjectError("Client closed.")
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(sock, selectors.EVENT_READ)
+                while True:
+                    if not selector.select(self._expire_acks()):
+                        continue
+                    chunk = sock.recv(_RECV_SIZE)
+                    if not chunk:
+                        error = DirectInjectError("Connection closed by device.")
+                        return
+                    if self.metrics is not None:
+                        self.metrics.record_received(len(chunk))
+                    if self.capture is not None:
+                        self.capture.record_received(chunk)
+                    for frame in decoder.feed(chunk):
+                        self._dispatch_frame(frame)
+        except (OSError, ValueError) as exc:
+            error = DirectInjectError(f"Connection lost: {exc}")
+        finally:
+            self._reader_error = error
+            self._fail_in_flight(error)
+
+    def _expire_acks(self) -> float:
+        now = time.monotonic()
+        expired: list[Future[bool]] = []
+        wait_for = self.timeout
+        with self._ack_lock:
+            while self._in_flight:
+                future, deadline = self._in_flight[0]
+                if deadline > now:
+                    wait_for = min(deadline - now, wait_for)
+                    break
+                # Expired entries leave the queue so a reply that never comes
+                # cannot swallow the next message's ACK.
+                self._in_flight.popleft()
+                expired.append(future)
+                self._expect_late_reply()
+        for future in expired:
+            future.set_exception(DirectInjectError("Timed out waiting for ACK/NAK."))
+        return wait_for
+
+    def _dispatch_frame(self, frame: bytes) -> None:
+        byte = frame[0]
+        if byte == ACK or byte == NAK:
+            with self._ack_lock:
+                if not self._in_flight:
+                    self._late_replies = max(0, self._late_replies - 1)
+                    return
+                future, deadline = self._in_flight.popleft()
+            self._record_reply(byte, deadline - self.timeout)
+            if byte == ACK:
+                future.set_result(True)
+            else:
+                future.set_exception(DirectInjectNakError("Device returned NAK."))
+            return
+        try:
+            body = DirectInjectCodec.decode(frame)
+        except ValueError:
+            _logger.warning("Dropped malformed Direct Inject frame.")
+            return
+        if not is_sv_notification_body(body):
+            return
+        if self.metrics is not None:
+            self.metrics.record_notification(body[0])
+        notification = parse_sv_notification_body(body)
+        for key in (notification.target, None):
+            for handler in self._handlers.get(key, ()):
+                try:
+                    handler(notification)
+                except Exception:
+                    _logger.exception("Notification handler raised.")
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from .protocol import (
+    DiCommand,
+    DiTarget,
+    build_bump_sv_percent_body,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+    check_value,
+)
+
+PERCENT_MAX = 100 * 65536
+
+_BUILDERS = {
+    DiCommand.SET_SV: build_set_sv_body,
+    DiCommand.SET_SV_PERCENT: build_set_sv_percent_body,
+    DiCommand.BUMP_SV_PERCENT: build_bump_sv_percent_body,
+}
+
+
+class _SendsMany(Protocol):
+    def send_many(self, bodies: list[bytes]) -> object: ...
+
+
+class _SendsManyAsync(Protocol):
+    async def send_many(self, bodies: list[bytes]) -> object: ...
+
+
+@dataclass
+class UpdateCoalescer:
+    rate_hz: float = 50.0
+
+    _pending: dict[tuple[DiCommand, DiTarget], int] = field(default_factory=dict)
+    _last_flush: float = float("-inf")
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def set_sv(self, target: DiTarget, data: int) -> None:
+        check_value(data, signed=True)
+        with self._lock:
+            self._pending.pop((DiCommand.SET_SV_PERCENT, target), None)
+            self._pending.pop((DiCommand.BUMP_SV_PERCENT, target), None)
+            self._pending[(DiCommand.SET_SV, target)] = data
+
+    def set_sv_percent(self, target: DiTarget, percent_scaled: int) -> None:
+        check_value(percent_scaled, signed=True)
+        with self._lock:
+            self._pending.pop((DiCommand.SET_SV, target), None)
+            self._pending.pop((DiCommand.BUMP_SV_PERCENT, target), None)
+            self._pending[(DiCommand.SET_SV_PERCENT, target)] = percent_scaled
+
+    def bump_sv_percent(self, target: DiTarget, percent_scaled_delta: int) -> None:
+        check_value(percent_scaled_delta, signed=True)
+        set_key = (DiCommand.SET_SV_PERCENT, target)
+        bump_key = (DiCommand.BUMP_SV_PERCENT, target)
+        with self._lock:
+            if set_key in self._pending:
+                # The device clamps to 0-100%, so folding the bump into a pending
+                # SET lands on the same value.
+                value = self._pending[set_key] + percent_scaled_delta
+                self._pending[set_key] = min(max(value, 0), PERCENT_MAX)
+                return
+            value = self._pending.get(bump_key, 0) + percent_scaled_delta
+            self._pending[bump_key] = min(max(value, -PERCENT_MAX), PERCENT_MAX)
+
+    def drain(self) -> list[bytes]:
+        # Swap the dict under the lock and build bodies outside it, so producer
+        # threads are never blocked behind encoding.
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [
+            _BUILDERS[command](target, value)
+            for (command, target), value in pending.items()
+        ]
+
+    def flush(self, client: _SendsMany) -> int:
+        self._last_flush = time.monotonic()
+        bodies = self.drain()
+        if bodies:
+            client.send_many(bodies)
+        return len(bodies)
+
+    def poll(self, client: _SendsMany) -> int:
+        if time.monotonic() - self._last_flush < 1.0 / self.rate_hz:
+            return 0
+        return self.flush(client)
+
+
+@dataclass
+class AsyncUpdateCoalescer:
+    client: _SendsManyAsync
+    rate_hz: float = 50.0
+
+    _coalescer: UpdateCoalescer = field(default_factory=UpdateCoalescer)
+    _task: asyncio.Task[None] | None = None
+    _wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def __len__(self) -> int:
+        return len(self._coalescer)
+
+    def set_sv(self, target: DiTarget, data: int) -> None:
+        self._coalescer.set_sv(target, data)
+        self._wakeup.set()
+
+    def set_sv_percent(self, target: DiTarget, percent_scaled: int) -> None:
+        self._coalescer.set_sv_percent(target, percent_scaled)
+        self._wakeup.set()
+
+    def bump_sv_percent(self, target: DiTarget, percent_scaled_delta: int) -> None:
+        self._coalescer.bump_sv_percent(target, percent_scaled_delta)
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def flush(self) -> int:
+        bodies = self._coalescer.drain()
+        if bodies:
+            await self.client.send_many(bodies)
+        return len(bodies)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def __aenter__(self) -> AsyncUpdateCoalescer:
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
+
+    async def _run(self) -> None:
+        interval = 1.0 / self.rate_hz
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as exc:
+                asyncio.get_running_loop().call_exception_handler(
+                    {
+                        "message": "Coalesced flush failed.",
+                        "exception": exc,
+                        "coalescer": self,
+                    }
+                )
+            await asyncio.sleep(interval)
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import contextlib
+import errno
+import heapq
+import itertools
+import logging
+import os
+import selectors
+import socket
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import TypeVar
+
+from ._sockopts import set_nodelay
+from .client import DirectInjectError, DirectInjectNakError, NotificationHandler
+from .metrics import ClientMetrics
+from .protocol import (
+    ACK,
+    NAK,
+    DiCommand,
+    DirectInjectCodec,
+    DiTarget,
+    FrameDecoder,
+    compile_target,
+    is_sv_notification_body,
+    parse_sv_notification_body,
+)
+
+_RECV_SIZE = 65536
+_CONNECTING = frozenset({0, errno.EINPROGRESS, errno.EWOULDBLOCK})
+
+T = TypeVar("T")
+
+CloseHandler = Callable[["EngineDevice", DirectInjectError], object]
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class EngineTimer:
+    deadline: float
+    callback: Callable[[], object]
+    cancelled: bool = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+@dataclass(eq=False)
+class EngineDevice:
+    engine: DirectInjectEngine
+    host: str
+    port: int = 1023
+    timeout: float = 1.0
+    expect_ack: bool = False
+    tcp_nodelay: bool = True
+    on_close: CloseHandler | None = None
+
+    error: DirectInjectError | None = None
+
+    _socket: socket.socket | None = None
+    _connected: bool = False
+    _decoder: FrameDecoder = field(default_factory=FrameDecoder)
+    _outgoing: bytearray = field(default_factory=bytearray)
+    _in_flight: deque[tuple[Future[bool], float]] = field(default_factory=deque)
+    _ack_timer: EngineTimer | None = None
+    _connect_timer: EngineTimer | None = None
+    _handlers: dict[DiTarget | None, list[NotificationHandler]] = field(
+        default_factory=dict
+    )
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    @property
+    def closed(self) -> bool:
+        return self._socket is None
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._outgoing)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def send_body(self, body: bytes, expect_ack: bool | None = None) -> Future[bool]:
+        return self.send_frame(DirectInjectCodec.encode(body), expect_ack)
+
+    def send_frame(self, frame: bytes, expect_ack: bool | None = None) -> Future[bool]:
+        if self._socket is None:
+            msg = "Device is not connected."
+            raise DirectInjectError(msg)
+        if expect_ack is None:
+            expect_ack = self.expect_ack
+        future: Future[bool] = Future()
+        future.set_running_or_notify_cancel()
+        if expect_ack:
+            # Deadlines are reset once the connection is up, so a slow connect
+            # does not eat into the ACK timeout.
+            self._in_flight.append((future, time.monotonic() + self.timeout))
+            self._arm_ack_timer()
+        else:
+            future.set_result(True)
+        if self.engine.metrics is not None:
+            self.engine.metrics.record_send(frame)
+        self._write(frame)
+        return future
+
+    def set_sv(self, target: DiTarget, data: int) -> Future[bool]:
+        return self.send_frame(compile_target(target).encode(DiCommand.SET_SV, data))
+
+    def set_sv_percent(self, target: DiTarget, percent_scaled: int) -> Future[bool]:
+        return self.send_frame(
+            compile_target(target).encode(DiCommand.SET_SV_PERCENT, percent_scaled)
+        )
+
+    def subscribe_sv(self, target: DiTarget, rate_ms: int) -> Future[bool]:
+        return self.send_frame(
+            compile_target(target).encode(DiCommand.SUBSCRIBE_SV, rate_ms)
+        )
+
+    def unsubscribe_sv(self, target: DiTarget) -> Future[bool]:
+        return self.send_frame(
+            compile_target(target).encode(DiCommand.UNSUBSCRIBE_SV, 0)
+        )
+
+    def add_handler(
+        self, target: DiTarget | None, handler: NotificationHandler
+    ) -> None:
+        self._handlers.setdefault(target, []).append(handler)
+
+    def remove_handler(
+        self, target: DiTarget | None, handler: NotificationHandler
+    ) -> None:
+        handlers = self._handlers.get(target)
+        if not handlers or handler not in handlers:
+            return
+        handlers.remove(handler)
+        if not handlers:
+            del self._handlers[target]
+
+    def close(self) -> None:
+        self._shutdown(DirectInjectError("Client closed."))
+
+    def _open(self) -> None:
+        family, kind, proto, _, address = socket.getaddrinfo(
+            self.host, self.port, type=socket.SOCK_STREAM
+        )[0]
+        sock = socket.socket(family, kind, proto)
+        sock.setblocking(False)
+        error = sock.connect_ex(address)
+        if error not in _CONNECTING:
+            sock.close()
+            raise OSError(error, os.strerror(error))
+        self._socket = sock
+        self.engine._register(self, selectors.EVENT_WRITE)
+        self._connect_timer = self.engine.call_later(
+            self.timeout, self._connect_timed_out
+        )
+
+    def _connect_timed_out(self) -> None:
+        self._connect_timer = None
+        self._lose(DirectInjectError("Timed out connecting to device."))
+
+    def _on_connected(self) -> None:
+        sock = self._socket
+        assert sock is not None
+        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            self._lose(DirectInjectError(f"Connect failed: {os.strerror(error)}"))
+            return
+        if self._connect_timer is not None:
+            self._connect_timer.cancel()
+            self._connect_timer = None
+        set_nodelay(sock, self.tcp_nodelay)
+        self._connected = True
+        deadline = time.monotonic() + self.timeout
+        self._in_flight = deque((future, deadline) for future, _ in self._in_flight)
+        self._arm_ack_timer()
+        self._flush()
+
+    def _write(self, data: bytes) -> None:
+        if self._connected and not self._outgoing:
+            try:
+                sent = self._require_socket().send(data)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError as exc:
+                self._lose(DirectInjectError(f"Connection lost: {exc}"))
+                return
+            if sent == len(data):
+                return
+            data = data[sent:]
+        first = not self._outgoing
+        self._outgoing += data
+        if first and self._connected:
+            self.engine._register(self, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def _flush(self) -> None:
+        sock = self._require_socket()
+        while self._outgoing:
+            try:
+                sent = sock.send(self._outgoing)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as exc:
+                self._lose(DirectInjectError(f"Connection lost: {exc}"))
+                return
+            del self._outgoing[:sent]
+        events = selectors.EVENT_READ
+        if self._outgoing:
+            events |= selectors.EVENT_WRITE
+        self.engine._register(self, events)
+
+    def _on_readable(self) -> None:
+        try:
+            chunk = self._require_socket().recv(_RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as exc:
+            self._lose(DirectInjectError(f"Connection lost: {exc}"))
+            return
+        if not chunk:
+            self._lose(DirectInjectError("Connection closed by device."))
+            return
+        metrics = self.engine.metrics
+        if metrics is not None:
+            metrics.record_received(len(chunk))
+        for frame in self._decoder.feed(chunk):
+            self._dispatch_frame(frame)
+            if self._socket is None:
+                return
+
+    def _dispatch_frame(self, frame: bytes) -> None:
+        metrics = self.engine.metrics
+        byte = frame[0]
+        if byte == ACK or byte == NAK:
+            if not self._in_flight:
+                # A reply for a message that already timed out.
+                return
+            future, deadline = self._in_flight.popleft()
+            if metrics is not None:
+                latency = time.monotonic() - (deadline - self.timeout)
+                if byte == ACK:
+                    metrics.record_ack(latency)
+                else:
+                    metrics.record_nak(latency)
+            if byte == ACK:
+                future.set_result(True)
+            else:
+                future.set_exception(DirectInjectNakError("Device returned NAK."))
+            return
+        try:
+            body = DirectInjectCodec.decode(frame)
+        except ValueError:
+            _logger.warning("Dropped malformed Direct Inject frame.")
+            return
+        if not is_sv_notification_body(body):
+            return
+        if metrics is not None:
+            metrics.record_notification(body[0])
+        notification = parse_sv_notification_body(body)
+        for key in (notification.target, None):
+            for handler in tuple(self._handlers.get(key, ())):
+                try:
+                    handler(notification)
+                except Exception:
+                    _logger.exception("Notification handler raised.")
+
+    def _arm_ack_timer(self) -> None:
+        if self._ack_timer is None and self._in_flight and self._connected:
+            self._ack_timer = self.engine.call_at(
+                self._in_flight[0][1], self._expire_acks
+            )
+
+    def _expire_acks(self) -> None:
+        self._ack_timer = None
+        now = time.monotonic()
+        metrics = self.engine.metrics
+        while self._in_flight and self._in_flight[0][1] <= now:
+            future, _ = self._in_flight.popleft()
+            if metrics is not None:
+                metrics.record_timeout()
+            future.set_exception(DirectInjectError("Timed out waiting for ACK/NAK."))
+        self._arm_ack_timer()
+
+    def _lose(self, error: DirectInjectError) -> None:
+        if self._socket is None:
+            return
+        self._shutdown(error)
+        if self.on_close is not None:
+            try:
+                self.on_close(self, error)
+            except Exception:
+                _logger.exception("Device close handler raised.")
+
+    def _shutdown(self, error: DirectInjectError) -> None:
+        sock = self._socket
+        if sock is None:
+            return
+        self.error = error
+        self.engine._unregister(self)
+        for timer in (self._ack_timer, self._connect_timer):
+            if timer is not None:
+                timer.cancel()
+        self._ack_timer = self._connect_timer = None
+        sock.close()
+        self._socket = None
+        self._connected = False
+        self._outgoing.clear()
+        self._decoder.reset()
+        failed = [future for future, _ in self._in_flight]
+        self._in_flight.clear()
+        for future in failed:
+            future.set_exception(error)
+
+    def _require_socket(self) -> socket.socket:
+        if self._socket is None:
+            msg = "Device is not connected."
+            raise DirectInjectError(msg)
+        return self._socket
+
+
+@dataclass
+class DirectInjectEngine:
+    timeout: float = 1.0
+    expect_ack: bool = False
+    tcp_nodelay: bool = True
+    metrics: ClientMetrics | None = None
+
+    _selector: selectors.BaseSelector = field(default_factory=selectors.DefaultSelector)
+    _devices: list[EngineDevice] = field(default_factory=list)
+    _timers: list[tuple[float, int, EngineTimer]] = field(default_factory=list)
+    _sequence: itertools.count[int] = field(default_factory=itertools.count)
+    _stopping: bool = False
+
+    @property
+    def devices(self) -> list[EngineDevice]:
+        return list(self._devices)
+
+    def add_device(
+        self,
+        host: str,
+        port: int = 1023,
+        *,
+        timeout: float | None = None,
+        expect_ack: bool | None = None,
+        on_close: CloseHandler | None = None,
+    ) -> EngineDevice:
+        device = EngineDevice(
+            self,
+            host,
+            port=port,
+            timeout=self.timeout if timeout is None else timeout,
+            expect_ack=self.expect_ack if expect_ack is None else expect_ack,
+            tcp_nodelay=self.tcp_nodelay,
+            on_close=on_close,
+        )
+        device._open()
+        self._devices.append(device)
+        return device
+
+    def call_at(self, deadline: float, callback: Callable[[], object]) -> EngineTimer:
+        timer = EngineTimer(deadline, callback)
+        heapq.heappush(self._timers, (deadline, next(self._sequence), timer))
+        return timer
+
+    def call_later(self, delay: float, callback: Callable[[], object]) -> EngineTimer:
+        return self.call_at(time.monotonic() + delay, callback)
+
+    def run_once(self, timeout: float | None = None) -> None:
+        wait_for = timeout
+        timers = self._timers
+        while timers and timers[0][2].cancelled:
+            heapq.heappop(timers)
+        if timers:
+            until_next = max(0.0, timers[0][0] - time.monotonic())
+            wait_for = until_next if wait_for is None else min(wait_for, until_next)
+        if self._selector.get_map():
+            events = self._selector.select(wait_for)
+        else:
+            # Nothing to watch, and select() cannot wait on an empty set everywhere.
+            if wait_for is not None:
+                time.sleep(wait_for)
+            events = []
+        for key, mask in events:
+            device: EngineDevice = key.data
+            if device.closed:
+                continue
+            if not device.connected:
+                device._on_connected()
+                continue
+            if mask & selectors.EVENT_WRITE:
+                device._flush()
+            if mask & selectors.EVENT_READ and not device.closed:
+                device._on_readable()
+        self._run_timers()
+
+    def run(
+        self, until: Callable[[], bool] | None = None, timeout: float | None = None
+    ) -> None:
+        self._stopping = False
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stopping and (until is None or not until()):
+            if not self._devices and not self._timers:
+                return
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    msg = "Engine run timed out."
+                    raise TimeoutError(msg)
+            self.run_once(remaining)
+
+    def run_until_complete(self, future: Future[T], timeout: float | None = None) -> T:
+        self.run(future.done, timeout)
+        return future.result(0)
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def close(self) -> None:
+        for device in list(self._devices):
+            device.close()
+        self._timers.clear()
+        self._selector.close()
+
+    def __enter__(self) -> DirectInjectEngine:
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def _run_timers(self) -> None:
+        now = time.monotonic()
+        timers = self._timers
+        while timers and timers[0][0] <= now:
+            _, _, timer = heapq.heappop(timers)
+            if timer.cancelled:
+                continue
+            try:
+                timer.callback()
+            except Exception:
+                _logger.exception("Engine timer callback raised.")
+
+    def _register(self, device: EngineDevice, events: int) -> None:
+        sock = device._require_socket()
+        try:
+            key = self._selector.get_key(sock)
+        except KeyError:
+            self._selector.register(sock, events, device)
+            return
+        if key.events != events:
+            self._selector.modify(sock, events, device)
+
+    def _unregister(self, device: EngineDevice) -> None:
+        sock = device._socket
+        if sock is not None:
+            with contextlib.suppress(KeyError, ValueError):
+                self._selector.unregister(sock)
+        with contextlib.suppress(ValueError):
+            self._devices.remove(device)
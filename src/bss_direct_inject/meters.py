@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import math
+import time
+from array import array
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from itertools import chain, repeat
+from operator import truediv
+
+from .mirror import _HasHandlers
+from .protocol import DiCommand, DiNotification, DiTarget
+from .scaling import raw_to_gain, raw_to_gain_many
+
+
+@dataclass(eq=False)
+class MeterRing:
+    capacity: int = 64
+
+    written: int = 0
+    updated_at: float | None = None
+
+    _values: array[int] = field(init=False)
+    _view: memoryview = field(init=False)
+
+    def __post_init__(self) -> None:
+        if self.capacity < 1:
+            msg = "capacity must be at least 1."
+            raise ValueError(msg)
+        self._values = array("i", bytes(4 * self.capacity))
+        self._view = memoryview(self._values)
+
+    def __len__(self) -> int:
+        return min(self.written, self.capacity)
+
+    def append(self, raw: int, now: float) -> None:
+        self._values[self.written % self.capacity] = raw
+        self.written += 1
+        self.updated_at = now
+
+    def latest(self) -> int | None:
+        if not self.written:
+            return None
+        return self._values[(self.written - 1) % self.capacity]
+
+    def views(self, window: int | None = None) -> tuple[memoryview, memoryview]:
+        count = len(self)
+        if window is not None:
+            count = min(max(window, 0), count)
+        end = self.written % self.capacity
+        start = end - count
+        if start >= 0 or count == 0:
+            return self._view[max(start, 0) : max(start, 0) + count], self._view[:0]
+        return self._view[start:], self._view[:end]
+
+
+@dataclass
+class MeterBank:
+    capacity: int = 64
+    clock: Callable[[], float] = time.monotonic
+
+    _rings: dict[DiTarget, MeterRing] = field(default_factory=dict)
+    _by_key: dict[bytes, MeterRing] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def __contains__(self, target: object) -> bool:
+        return target in self._rings
+
+    def track(self, target: DiTarget) -> MeterRing:
+        ring = self._rings.get(target)
+        if ring is None:
+            ring = self._rings[target] = MeterRing(self.capacity)
+            self._by_key[target.to_bytes()] = ring
+        return ring
+
+    def untrack(self, target: DiTarget) -> None:
+        if self._rings.pop(target, None) is not None:
+            del self._by_key[target.to_bytes()]
+
+    def targets(self) -> list[DiTarget]:
+        return list(self._rings)
+
+    def ingest(self, bodies: Iterable[bytes]) -> int:
+        now = self.clock()
+        rings = self._by_key
+        accepted = 0
+        for body in bodies:
+            if len(body) != 13 or body[0] != DiCommand.SET_SV:
+                continue
+            ring = rings.get(body[1:9])
+            if ring is None:
+                continue
+            ring.append(int.from_bytes(body[9:13], "big", signed=True), now)
+            accepted += 1
+        return accepted
+
+    def update(self, notification: DiNotification) -> None:
+        if notification.command != DiCommand.SET_SV:
+            return
+        ring = self._rings.get(notification.target)
+        if ring is not None:
+            ring.append(notification.value, self.clock())
+
+    def attach(self, client: _HasHandlers) -> None:
+        for target in self._rings:
+            client.add_handler(target, self.update)
+
+    def detach(self, client: _HasHandlers) -> None:
+        for target in self._rings:
+            client.remove_handler(target, self.update)
+
+    def history(
+        self, target: DiTarget, window: int | None = None
+    ) -> tuple[memoryview, memoryview]:
+        return self._rings[target].views(window)
+
+    def latest(self, target: DiTarget) -> int | None:
+        return self._rings[target].latest()
+
+    def latest_db(self, target: DiTarget) -> float | None:
+        raw = self.latest(target)
+        return None if raw is None else raw_to_gain(raw)
+
+    def peak(self, target: DiTarget, window: int | None = None) -> float | None:
+        # The gain law is monotonic, so the loudest raw value is the loudest dB.
+        raw = max(chain(*self.history(target, window)), default=None)
+        return None if raw is None else raw_to_gain(raw)
+
+    def rms(self, target: DiTarget, window: int | None = None) -> float | None:
+        older, newer = self.history(target, window)
+        count = len(older) + len(newer)
+        if not count:
+            return None
+        gains = raw_to_gain_many(chain(older, newer))
+        power = math.fsum(map(math.pow, repeat(10.0), map(truediv, gains, repeat(10))))
+        return 10 * math.log10(power / count)
+
+    def peaks(self, window: int | None = None) -> dict[DiTarget, float]:
+        return {
+            target: peak
+            for target in self._rings
+            if (peak := self.peak(target, window)) is not None
+        }
+
+    def rms_all(self, window: int | None = None) -> dict[DiTarget, float]:
+        return {
+            target: rms
+            for target in self._rings
+            if (rms := self.rms(target, window)) is not None
+        }
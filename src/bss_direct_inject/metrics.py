@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from .protocol import DiCommand
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _command_name(command: int) -> str:
+    try:
+        return DiCommand(command).name
+    except ValueError:
+        return f"0x{command:02X}"
+
+
+@dataclass
+class ClientMetrics:
+    latency_buckets: tuple[float, ...] = LATENCY_BUCKETS
+
+    sends: dict[int, int] = field(default_factory=dict)
+    notifications: dict[int, int] = field(default_factory=dict)
+    bytes_out: int = 0
+    bytes_in: int = 0
+    acks: int = 0
+    naks: int = 0
+    timeouts: int = 0
+    reconnects: int = 0
+    latency_sum: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+    _latency_counts: list[int] = field(default_factory=list)
+    # Reader and sender threads record into one instance in background-reader mode.
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        self._latency_counts = [0] * (len(self.latency_buckets) + 1)
+
+    def record_send(self, frame: bytes) -> None:
+        command = frame[1]
+        with self._lock:
+            self.sends[command] = self.sends.get(command, 0) + 1
+            self.bytes_out += len(frame)
+
+    def record_sends(self, frames: Iterable[bytes]) -> None:
+        sends = self.sends
+        with self._lock:
+            for frame in frames:
+                command = frame[1]
+                sends[command] = sends.get(command, 0) + 1
+                self.bytes_out += len(frame)
+
+    def record_received(self, size: int) -> None:
+        with self._lock:
+            self.bytes_in += size
+
+    def record_ack(self, latency: float) -> None:
+        with self._lock:
+            self.acks += 1
+            self._record_latency(latency)
+
+    def record_nak(self, latency: float) -> None:
+        with self._lock:
+            self.naks += 1
+            self._record_latency(latency)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_reconnect(self) -> None:
+        with self._lock:
+            self.reconnects += 1
+
+    def record_notification(self, command: int) -> None:
+        with self._lock:
+            self.notifications[command] = self.notifications.get(command, 0) + 1
+
+    def latency_histogram(self) -> list[tuple[float, int]]:
+        with self._lock:
+            return self._latency_histogram()
+
+    def to_dict(self) -> dict[str, object]:
+        with self._lock:
+            return self._to_dict()
+
+    def to_prometheus(self, prefix: str = "bss_direct_inject") -> str:
+        with self._lock:
+            return self._to_prometheus(prefix)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sends.clear()
+            self.notifications.clear()
+            self.bytes_out = self.bytes_in = 0
+            self.acks = self.naks = self.timeouts = self.reconnects = 0
+            self.latency_sum = 0.0
+            self.started_at = time.monotonic()
+            self._latency_counts = [0] * (len(self.latency_buckets) + 1)
+
+    def _latency_histogram(self) -> list[tuple[float, int]]:
+        cumulative = []
+        total = 0
+        for bound, count in zip(
+            (*self.latency_buckets, float("inf")), self._latency_counts, strict=True
+        ):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def _to_dict(self) -> dict[str, object]:
+        uptime = time.monotonic() - self.started_at
+        notifications = sum(self.notifications.values())
+        return {
+            "uptime": uptime,
+            "sends": {_command_name(cmd): n for cmd, n in self.sends.items()},
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "acks": self.acks,
+            "naks": self.naks,
+            "timeouts": self.timeouts,
+            "reconnects": self.reconnects,
+            "ack_latency": {
+                "count": self.acks + self.naks,
+                "sum": self.latency_sum,
+                "buckets": self._latency_histogram(),
+            },
+            "notifications": {
+                _command_name(cmd): n for cmd, n in self.notifications.items()
+            },
+            "notifications_per_second": notifications / uptime if uptime else 0.0,
+        }
+
+    def _to_prometheus(self, prefix: str) -> str:
+        lines = [f"# TYPE {prefix}_sends_total counter"]
+        for command, count in self.sends.items():
+            lines.append(
+                f'{prefix}_sends_total{{command="{_command_name(command)}"}} {count}'
+            )
+        for name, value in (
+            ("bytes_out_total", self.bytes_out),
+            ("bytes_in_total", self.bytes_in),
+            ("acks_total", self.acks),
+            ("naks_total", self.naks),
+            ("ack_timeouts_total", self.timeouts),
+            ("reconnects_total", self.reconnects),
+        ):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {value}")
+        lines.append(f"# TYPE {prefix}_notifications_total counter")
+        for command, count in self.notifications.items():
+            lines.append(
+                f'{prefix}_notifications_total{{command="{_command_name(command)}"}} '
+                f"{count}"
+            )
+        lines.append(f"# TYPE {prefix}_ack_latency_seconds histogram")
+        for bound, count in self._latency_histogram():
+            label = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{prefix}_ack_latency_seconds_bucket{{le="{label}"}} {count}')
+        lines.append(f"{prefix}_ack_latency_seconds_sum {self.latency_sum}")
+        lines.append(f"{prefix}_ack_latency_seconds_count {self.acks + self.naks}")
+        return "\n".join(lines) + "\n"
+
+    def _record_latency(self, latency: float) -> None:
+        self.latency_sum += latency
+        self._latency_counts[bisect_left(self.latency_buckets, latency)] += 1
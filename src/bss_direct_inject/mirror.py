@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from .protocol import (
+    DiCommand,
+    DiNotification,
+    DiTarget,
+    is_sv_notification_body,
+    parse_sv_notification_body,
+)
+
+
+class _HasHandlers(Protocol):
+    def add_handler(
+        self, target: DiTarget | None, handler: Callable[[DiNotification], object]
+    ) -> None: ...
+
+    def remove_handler(
+        self, target: DiTarget | None, handler: Callable[[DiNotification], object]
+    ) -> None: ...
+
+
+@dataclass(frozen=True)
+class SvSample:
+    value: int
+    updated_at: float
+
+
+@dataclass
+class SvMirror:
+    ttl: float | None = None
+    clock: Callable[[], float] = time.monotonic
+
+    _values: dict[DiTarget, SvSample] = field(default_factory=dict)
+    _percents: dict[DiTarget, SvSample] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self._values.keys() | self._percents.keys())
+
+    def __contains__(self, target: object) -> bool:
+        return target in self._values or target in self._percents
+
+    def update(self, notification: DiNotification) -> None:
+        sample = SvSample(notification.value, self.clock())
+        if notification.command == DiCommand.SET_SV_PERCENT:
+            self._percents[notification.target] = sample
+        else:
+            self._values[notification.target] = sample
+
+    def update_body(self, body: bytes) -> bool:
+        if not is_sv_notification_body(body):
+            return False
+        self.update(parse_sv_notification_body(body))
+        return True
+
+    def get(self, target: DiTarget, default: int | None = None) -> int | None:
+        return self._fresh_value(self._values.get(target), default)
+
+    def get_percent(self, target: DiTarget, default: int | None = None) -> int | None:
+        return self._fresh_value(self._percents.get(target), default)
+
+    def sample(self, target: DiTarget) -> SvSample | None:
+        return self._values.get(target)
+
+    def percent_sample(self, target: DiTarget) -> SvSample | None:
+        return self._percents.get(target)
+
+    def age(self, target: DiTarget) -> float | None:
+        sample = self._latest(target)
+        if sample is None:
+            return None
+        return self.clock() - sample.updated_at
+
+    def is_stale(self, target: DiTarget) -> bool:
+        sample = self._latest(target)
+        return sample is None or self._expired(sample)
+
+    def stale_targets(self) -> list[DiTarget]:
+        return [target for target in self._targets() if self.is_stale(target)]
+
+    def forget(self, target: DiTarget) -> None:
+        self._values.pop(target, None)
+        self._percents.pop(target, None)
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._percents.clear()
+
+    def attach(self, client: _HasHandlers, target: DiTarget | None = None) -> None:
+        client.add_handler(target, self.update)
+
+    def detach(self, client: _HasHandlers, target: DiTarget | None = None) -> None:
+        client.remove_handler(target, self.update)
+
+    def _fresh_value(self, sample: SvSample | None, default: int | None) -> int | None:
+        if sample is None or self._expired(sample):
+            return default
+        return sample.value
+
+    def _expired(self, sample: SvSample) -> bool:
+        return self.ttl is not None and self.clock() - sample.updated_at > self.ttl
+
+    def _latest(self, target: DiTarget) -> SvSample | None:
+        value = self._values.get(target)
+        percent = self._percents.get(target)
+        if value is None or (
+            percent is not None and percent.updated_at > value.updated_at
+        ):
+            return percent
+        return value
+
+    def _targets(self) -> list[DiTarget]:
+        return list(dict.fromkeys([*self._values, *self._percents]))
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+
+@dataclass
+class AdaptivePacer:
+    rate: float = 200.0
+    min_rate: float = 10.0
+    max_rate: float = 10000.0
+    burst: float = 16.0
+    increase: float = 50.0
+    decrease: float = 0.5
+    target_latency: float = 0.05
+    base_window: float = 10.0
+    clock: Callable[[], float] = time.monotonic
+
+    backoffs: int = 0
+
+    _threshold: float = math.inf
+    _smoothed_rtt: float = 0.0
+    _min_rtt: float = math.inf
+    _previous_min_rtt: float = math.inf
+    _window_started: float = field(init=False)
+    _tokens: float = field(init=False)
+    _updated_at: float = field(init=False)
+    _hold_until: float = float("-inf")
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        if not 0 < self.min_rate <= self.max_rate:
+            msg = "Rates must satisfy 0 < min_rate <= max_rate."
+            raise ValueError(msg)
+        if not 0 < self.decrease < 1:
+            msg = "decrease must be between 0 and 1."
+            raise ValueError(msg)
+        self.rate = min(max(self.rate, self.min_rate), self.max_rate)
+        self._tokens = self.burst
+        self._updated_at = self._window_started = self.clock()
+
+    def reserve(self, count: int = 1) -> float:
+        # Tokens may go negative: a large batch is admitted at once and later
+        # callers wait until the debt has refilled.
+        with self._lock:
+            now = self.clock()
+            elapsed = now - self._updated_at
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+            self._tokens -= count
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    @property
+    def base_rtt(self) -> float:
+        return min(self._min_rtt, self._previous_min_rtt)
+
+    def record_ack(self, latency: float) -> None:
+        with self._lock:
+            self._observe(latency)
+            # Congestion shows as queueing delay on top of the link's own round
+            # trip, so the allowance is measured from the lowest recent RTT.
+            congested = latency > self.base_rtt + self.target_latency
+            if not congested:
+                if self.rate < self._threshold:
+                    # Slow start: one more message per second per ACK doubles
+                    # the rate every second until the first sign of congestion.
+                    self.rate += 1.0
+                else:
+                    self.rate += self.increase / self.rate
+                self.rate = min(self.rate, self.max_rate)
+                return
+        self._back_off(latency)
+
+    def record_nak(self) -> None:
+        self._back_off()
+
+    def record_timeout(self) -> None:
+        self._back_off()
+
+    def _observe(self, latency: float) -> None:
+        # The minimum is kept over two windows, so it follows a path that has
+        # really become slower instead of holding on to a stale best case.
+        now = self.clock()
+        if now - self._window_started >= self.base_window:
+            self._previous_min_rtt = self._min_rtt
+            self._min_rtt = math.inf
+            self._window_started = now
+        self._min_rtt = min(self._min_rtt, latency)
+        if self._smoothed_rtt:
+            self._smoothed_rtt += (latency - self._smoothed_rtt) / 8
+        else:
+            self._smoothed_rtt = latency
+
+    def _back_off(self, latency: float = 0.0) -> None:
+        with self._lock:
+            now = self.clock()
+            # Replies to messages sent at the old rate report the same overload
+            # and keep arriving for about a round trip, so only the first one
+            # within that time counts.
+            if now < self._hold_until:
+                return
+            self._hold_until = now + max(
+                latency, self._smoothed_rtt, self.target_latency
+            )
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._threshold = self.rate
+            self.backoffs += 1
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from .async_client import AsyncDirectInjectClient, AsyncDirectInjectError
+
+T = TypeVar("T")
+
+DeviceAddress = str | tuple[str, int]
+DeviceKey = tuple[str, int]
+
+
+@dataclass
+class _PooledDevice:
+    client: AsyncDirectInjectClient
+    slots: asyncio.Semaphore
+    connect_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    in_use: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class AsyncDirectInjectPool:
+    port: int = 1023
+    timeout: float = 1.0
+    expect_ack: bool = False
+    max_per_device: int = 1
+    max_total: int = 64
+    idle_timeout: float = 60.0
+    client_options: dict[str, Any] = field(default_factory=dict)
+
+    _devices: dict[DeviceKey, _PooledDevice] = field(default_factory=dict)
+    _total_slots: asyncio.Semaphore | None = None
+    _reaper_task: asyncio.Task[None] | None = None
+
+    def __post_init__(self) -> None:
+        if self.max_per_device > 1:
+            # Concurrent users of one connection must not share its reader.
+            if self.client_options.get("background_reader") is False:
+                msg = "max_per_device > 1 requires background_reader=True."
+                raise ValueError(msg)
+            self.client_options = {**self.client_options, "background_reader": True}
+
+    @property
+    def connected(self) -> list[DeviceKey]:
+        return [key for key, device in self._devices.items() if device.client.connected]
+
+    @asynccontextmanager
+    async def acquire(
+        self, device: DeviceAddress
+    ) -> AsyncIterator[AsyncDirectInjectClient]:
+        key = self._key(device)
+        pooled = self._devices.get(key)
+        if pooled is None:
+            pooled = _PooledDevice(
+                client=AsyncDirectInjectClient(
+                    key[0],
+                    port=key[1],
+                    timeout=self.timeout,
+                    expect_ack=self.expect_ack,
+                    **self.client_options,
+                ),
+                slots=asyncio.Semaphore(self.max_per_device),
+            )
+            self._devices[key] = pooled
+        if self._total_slots is None:
+            self._total_slots = asyncio.Semaphore(self.max_total)
+        self._start_reaper()
+        # Wait for the device before taking a global slot, so callers queued
+        # behind a busy device do not block idle ones.
+        async with pooled.slots, self._total_slots:
+            pooled.in_use += 1
+            try:
+                async with pooled.connect_lock:
+                    await pooled.client.connect()
+                yield pooled.client
+            except (OSError, AsyncDirectInjectError) as exc:
+                # Timeouts and NAKs leave the connection usable, and it may be
+                # shared, so only a lost one is dropped for the next user.
+                if _connection_lost(pooled.client, exc):
+                    await pooled.client.close()
+                raise
+            finally:
+                pooled.in_use -= 1
+                pooled.last_used = time.monotonic()
+
+    async def run(
+        self,
+        device: DeviceAddress,
+        operation: Callable[[AsyncDirectInjectClient], Awaitable[T]],
+    ) -> T:
+        async with self.acquire(device) as client:
+            return await operation(client)
+
+    async def fan_out(
+        self,
+        operation: Callable[[AsyncDirectInjectClient], Awaitable[T]],
+        devices: Iterable[DeviceAddress] | None = None,
+    ) -> dict[DeviceKey, T | BaseException]:
+        keys = (
+            list(self._devices)
+            if devices is None
+            else [self._key(device) for device in devices]
+        )
+        results = await asyncio.gather(
+            *(self.run(key, operation) for key in keys), return_exceptions=True
+        )
+        return dict(zip(keys, results, strict=True))
+
+    async def send_body_all(
+        self, body: bytes, devices: Iterable[DeviceAddress] | None = None
+    ) -> dict[DeviceKey, bool | BaseException]:
+        return await self.fan_out(lambda client: client.send_body(body), devices)
+
+    async def venue_preset_recall_all(
+        self, preset_number: int, devices: Iterable[DeviceAddress] | None = None
+    ) -> dict[DeviceKey, bool | BaseException]:
+        return await self.fan_out(
+            lambda client: client.venue_preset_recall(preset_number), devices
+        )
+
+    async def param_preset_recall_all(
+        self, preset_number: int, devices: Iterable[DeviceAddress] | None = None
+    ) -> dict[DeviceKey, bool | BaseException]:
+        return await self.fan_out(
+            lambda client: client.param_preset_recall(preset_number), devices
+        )
+
+    async def close_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        closed = 0
+        for device in list(self._devices.values()):
+            async with device.connect_lock:
+                # Checked under the lock: a caller that acquired the device in
+                # the meantime has bumped in_use and is waiting to connect.
+                if (
+                    device.in_use == 0
+                    and device.last_used <= cutoff
+                    and device.client.connected
+                ):
+                    await device.client.close()
+                    closed += 1
+        return closed
+
+    async def close(self) -> None:
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+        await asyncio.gather(
+            *(device.client.close() for device in self._devices.values())
+        )
+        self._devices.clear()
+
+    async def __aenter__(self) -> AsyncDirectInjectPool:
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
+
+    def _key(self, device: DeviceAddress) -> DeviceKey:
+        if isinstance(device, str):
+            return (device, self.port)
+        return device
+
+    def _start_reaper(self) -> None:
+        if self._reaper_task is None and self.idle_timeout > 0:
+            self._reaper_task = asyncio.create_task(self._reap_idle())
+
+    async def _reap_idle(self) -> None:
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2)
+            await self.close_idle()
+
+
+def _connection_lost(client: AsyncDirectInjectClient, exc: BaseException) -> bool:
+    if isinstance(exc, OSError) or not client.connected or client._at_eof():
+        return True
+    reader = client._reader_task
+    return reader is not None and reader.done()
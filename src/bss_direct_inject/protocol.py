@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+import struct
+from collections.abc import Callable
 from dataclasses import dataclass
 from enum import IntEnum
 
@@ -12,6 +13,28 @@ ESC = 0x1B
 
 SPECIAL_BYTES = {STX, ETX, ACK, NAK, ESC}
 
+_SPECIAL = bytes(sorted(SPECIAL_BYTES))
+_STX_BYTES = bytes([STX])
+_ETX_BYTES = bytes([ETX])
+_ESC_BYTES = bytes([ESC])
+# ESC must be replaced first so the escapes inserted afterwards are left alone.
+_ESCAPE_REPLACEMENTS = tuple(
+    (bytes([byte]), bytes([ESC, byte + 0x80]))
+    for byte in (ESC, *sorted(SPECIAL_BYTES - {ESC}))
+)
+# ESC is restored last so a restored ESC never pairs with the byte that follows it.
+_UNESCAPE_REPLACEMENTS = tuple(
+    (escaped, special) for special, escaped in reversed(_ESCAPE_REPLACEMENTS)
+)
+_ESCAPED_BYTE = tuple(
+    bytes([ESC, byte + 0x80]) if byte in SPECIAL_BYTES else bytes([byte])
+    for byte in range(256)
+)
+_UNESCAPED_BYTE = tuple(
+    bytes([byte - 0x80]) if byte >= 0x80 else None for byte in range(256)
+)
+_SHORT_CHECKSUM = 32
+
 
 class DiCommand(IntEnum):
     SET_SV = 0x88
@@ -26,6 +49,36 @@ class DiCommand(IntEnum):
     SET_STRING_SV = 0x91
 
 
+# Commands laid out as <command> <target> <32-bit value>, mapped to signedness.
+_VALUE_COMMANDS = {
+    DiCommand.SET_SV: True,
+    DiCommand.SUBSCRIBE_SV: False,
+    DiCommand.UNSUBSCRIBE_SV: False,
+    DiCommand.SET_SV_PERCENT: True,
+    DiCommand.SUBSCRIBE_SV_PERCENT: False,
+    DiCommand.UNSUBSCRIBE_SV_PERCENT: False,
+    DiCommand.BUMP_SV_PERCENT: True,
+}
+
+# The 24-bit object ID is packed as a high byte plus a low 16-bit word.
+_TARGET_LAYOUT = struct.Struct(">HBBHH")
+_VALUE_LAYOUTS = {
+    command: struct.Struct(">BHBBHH" + ("i" if signed else "I"))
+    for command, signed in _VALUE_COMMANDS.items()
+}
+_PRESET_LAYOUT = struct.Struct(">BI")
+_STRING_HEADER_LAYOUT = struct.Struct(">BHBBHHH")
+_I32_LAYOUT = struct.Struct(">i")
+_U32_LAYOUT = struct.Struct(">I")
+
+BODY_LAYOUTS: dict[DiCommand, struct.Struct] = {
+    **_VALUE_LAYOUTS,
+    DiCommand.VENUE_PRESET_RECALL: _PRESET_LAYOUT,
+    DiCommand.PARAM_PRESET_RECALL: _PRESET_LAYOUT,
+    DiCommand.SET_STRING_SV: _STRING_HEADER_LAYOUT,
+}
+
+
 @dataclass(frozen=True)
 class DiTarget:
     node: int
@@ -34,21 +87,37 @@ class DiTarget:
     state_variable: int
 
     def to_bytes(self) -> bytes:
-        return (
-            _pack_u16(self.node)
-            + _pack_u8(self.virtual_device)
-            + _pack_u24(self.object_id)
-            + _pack_u16(self.state_variable)
+        try:
+            return _TARGET_LAYOUT.pack(*_target_fields(self))
+        except struct.error:
+            _check_target(self)
+            raise
+
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview) -> DiTarget:
+        if len(data) != 8:
+            msg = "Target address must be exactly 8 bytes."
+            raise ValueError(msg)
+        return cls(
+            node=int.from_bytes(data[0:2], byteorder="big"),
+            virtual_device=data[2],
+            object_id=int.from_bytes(data[3:6], byteorder="big"),
+            state_variable=int.from_bytes(data[6:8], byteorder="big"),
         )
 
 
+@dataclass(frozen=True)
+class DiNotification:
+    command: DiCommand
+    target: DiTarget
+    value: int
+
+
 class DirectInjectCodec:
     @staticmethod
     def encode(body: bytes) -> bytes:
-        checksum = _checksum(body)
-        escaped_body = _escape_bytes(body)
-        escaped_checksum = _escape_bytes(bytes([checksum]))
-        return bytes([STX]) + escaped_body + escaped_checksum + bytes([ETX])
+        escaped_checksum = _ESCAPED_BYTE[_checksum(body)]
+        return b"".join((_STX_BYTES, _escape_bytes(body), escaped_checksum, _ETX_BYTES))
 
     @staticmethod
     def decode(frame: bytes) -> bytes:
@@ -66,50 +135,186 @@ class DirectInjectCodec:
         return body
 
 
+class CompiledTarget:
+    __slots__ = ("_prefixes", "target")
+
+    def __init__(self, target: DiTarget) -> None:
+        self.target = target
+        address = target.to_bytes()
+        self._prefixes: dict[int, tuple[bytes, int, bool]] = {}
+        for command, signed in _VALUE_COMMANDS.items():
+            header = bytes([command]) + address
+            prefix = _STX_BYTES + _escape_bytes(header)
+            self._prefixes[command] = (prefix, _checksum(header), signed)
+
+    def encode(self, command: DiCommand, value: int) -> bytes:
+        try:
+            prefix, checksum, signed = self._prefixes[command]
+        except KeyError:
+            msg = f"{command!r} does not take a target and a 32-bit value."
+            raise ValueError(msg) from None
+        try:
+            data = (_I32_LAYOUT if signed else _U32_LAYOUT).pack(value)
+        except struct.error:
+            check_value(value, signed)
+            raise
+        folded = value & 0xFFFFFFFF
+        folded ^= folded >> 16
+        folded ^= folded >> 8
+        checksum ^= folded & 0xFF
+        return b"".join(
+            (prefix, _escape_bytes(data), _ESCAPED_BYTE[checksum], _ETX_BYTES)
+        )
+
+
+def compile_target(target: DiTarget) -> CompiledTarget:
+    # A dict lookup takes no lock, whereas lru_cache serializes every caller on
+    # free-threaded builds. Threads that race on a miss keep the first template.
+    compiled = _COMPILED_TARGETS.get(target)
+    if compiled is None:
+        if len(_COMPILED_TARGETS) >= _COMPILED_TARGETS_SIZE:
+            _COMPILED_TARGETS.clear()
+        compiled = _COMPILED_TARGETS.setdefault(target, CompiledTarget(target))
+    return compiled
+
+
+_COMPILED_TARGETS_SIZE = 4096
+_COMPILED_TARGETS: dict[DiTarget, CompiledTarget] = {}
+
+
+class FrameDecoder:
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[bytes]:
+        buffer = self._buffer
+        buffer += data
+        frames: list[bytes] = []
+        start = 0
+        end = len(buffer)
+        while start < end:
+            byte = buffer[start]
+            if byte != STX:
+                if byte == ACK or byte == NAK:
+                    frames.append(_CONTROL_FRAMES[byte])
+                start += 1
+                continue
+            etx = buffer.find(ETX, start + 1)
+            if etx < 0:
+                break
+            # A second STX before the ETX means the earlier frame was truncated.
+            start = buffer.rfind(STX, start, etx)
+            frames.append(bytes(buffer[start : etx + 1]))
+            start = etx + 1
+        del buffer[:start]
+        return frames
+
+    def reset(self) -> None:
+        self._buffer.clear()
+
+
+_CONTROL_FRAMES = {ACK: bytes([ACK]), NAK: bytes([NAK])}
+
+
+def scan_frames(
+    buffer: bytearray,
+    end: int,
+    on_reply: Callable[[int], object],
+    on_body: Callable[[bytes | memoryview], object],
+    on_error: Callable[[ValueError], object],
+) -> int:
+    # Unescaped bodies are passed as views into buffer; they are only valid
+    # until on_body returns.
+    start = 0
+    with memoryview(buffer) as view:
+        while start < end:
+            byte = buffer[start]
+            if byte != STX:
+                if byte == ACK or byte == NAK:
+                    on_reply(byte)
+                start += 1
+                continue
+            etx = buffer.find(ETX, start + 1, end)
+            if etx < 0:
+                break
+            start = buffer.rfind(STX, start, etx)
+            if buffer.find(ESC, start + 1, etx) < 0:
+                data = view[start + 1 : etx]
+            else:
+                try:
+                    data = _unescape_bytes(buffer[start + 1 : etx])
+                except ValueError as exc:
+                    on_error(exc)
+                    start = etx + 1
+                    continue
+            if len(data) < 2:
+                on_error(ValueError("Frame is too short to contain a checksum."))
+            elif _checksum(data[:-1]) != data[-1]:
+                on_error(ValueError("Checksum does not match message body."))
+            else:
+                on_body(data[:-1])
+            start = etx + 1
+    return start
+
+
+def parse_sv_notification_body(body: bytes | memoryview) -> DiNotification:
+    if len(body) != 13 or body[0] not in _NOTIFICATION_COMMANDS:
+        msg = "Body is not a SET_SV or SET_SV_PERCENT message."
+        raise ValueError(msg)
+    command, node, virtual_device, object_hi, object_lo, sv, value = (
+        _NOTIFICATION_LAYOUT.unpack(body)
+    )
+    return DiNotification(
+        _NOTIFICATION_COMMANDS[command],
+        DiTarget(node, virtual_device, object_hi << 16 | object_lo, sv),
+        value,
+    )
+
+
+def is_sv_notification_body(body: bytes | memoryview) -> bool:
+    return len(body) == 13 and body[0] in _NOTIFICATION_COMMANDS
+
+
+_NOTIFICATION_COMMANDS = {
+    command: command for command in (DiCommand.SET_SV, DiCommand.SET_SV_PERCENT)
+}
+_NOTIFICATION_LAYOUT = _VALUE_LAYOUTS[DiCommand.SET_SV]
+
+
 def build_set_sv_body(target: DiTarget, data: int) -> bytes:
-    return bytes([DiCommand.SET_SV]) + target.to_bytes() + _pack_i32(data)
+    return _pack_value_body(DiCommand.SET_SV, target, data)
 
 
 def build_subscribe_sv_body(target: DiTarget, rate_ms: int) -> bytes:
-    return bytes([DiCommand.SUBSCRIBE_SV]) + target.to_bytes() + _pack_u32(rate_ms)
+    return _pack_value_body(DiCommand.SUBSCRIBE_SV, target, rate_ms)
 
 
 def build_unsubscribe_sv_body(target: DiTarget) -> bytes:
-    return bytes([DiCommand.UNSUBSCRIBE_SV]) + target.to_bytes() + _pack_u32(0)
+    return _pack_value_body(DiCommand.UNSUBSCRIBE_SV, target, 0)
 
 
 def build_set_sv_percent_body(target: DiTarget, percent_scaled: int) -> bytes:
-    return (
-        bytes([DiCommand.SET_SV_PERCENT])
-        + target.to_bytes()
-        + _pack_i32(percent_scaled)
-    )
+    return _pack_value_body(DiCommand.SET_SV_PERCENT, target, percent_scaled)
 
 
 def build_subscribe_sv_percent_body(target: DiTarget, rate_ms: int) -> bytes:
-    return (
-        bytes([DiCommand.SUBSCRIBE_SV_PERCENT]) + target.to_bytes() + _pack_u32(rate_ms)
-    )
+    return _pack_value_body(DiCommand.SUBSCRIBE_SV_PERCENT, target, rate_ms)
 
 
 def build_unsubscribe_sv_percent_body(target: DiTarget) -> bytes:
-    return bytes([DiCommand.UNSUBSCRIBE_SV_PERCENT]) + target.to_bytes() + _pack_u32(0)
+    return _pack_value_body(DiCommand.UNSUBSCRIBE_SV_PERCENT, target, 0)
 
 
 def build_bump_sv_percent_body(target: DiTarget, percent_scaled_delta: int) -> bytes:
-    return (
-        bytes([DiCommand.BUMP_SV_PERCENT])
-        + target.to_bytes()
-        + _pack_i32(percent_scaled_delta)
-    )
+    return _pack_value_body(DiCommand.BUMP_SV_PERCENT, target, percent_scaled_delta)
 
 
 def build_venue_preset_recall_body(preset_number: int) -> bytes:
-    return bytes([DiCommand.VENUE_PRESET_RECALL]) + _pack_u32(preset_number)
+    return _pack_preset_body(DiCommand.VENUE_PRESET_RECALL, preset_number)
 
 
 def build_param_preset_recall_body(preset_number: int) -> bytes:
-    return bytes([DiCommand.PARAM_PRESET_RECALL]) + _pack_u32(preset_number)
+    return _pack_preset_body(DiCommand.PARAM_PRESET_RECALL, preset_number)
 
 
 def build_set_string_sv_body(target: DiTarget, value: str) -> bytes:
@@ -117,76 +322,147 @@ def build_set_string_sv_body(target: DiTarget, value: str) -> bytes:
     if len(encoded) > 32:
         msg = "String SV values must be 32 ASCII characters or fewer."
         raise ValueError(msg)
-    length = len(encoded) + 1
-    data = _pack_u16(length) + encoded + b"\x00"
-    return bytes([DiCommand.SET_STRING_SV]) + target.to_bytes() + data
-
-
-def _escape_bytes(data: bytes) -> bytes:
-    escaped = bytearray()
-    for byte in data:
-        if byte in SPECIAL_BYTES:
-            escaped.append(ESC)
-            escaped.append(byte + 0x80)
-        else:
-            escaped.append(byte)
-    return bytes(escaped)
-
-
-def _unescape_bytes(data: bytes) -> bytes:
-    unescaped = bytearray()
-    i = 0
-    while i < len(data):
-        byte = data[i]
-        if byte == ESC:
-            if i + 1 >= len(data):
-                msg = "Escape byte at end of frame."
-                raise ValueError(msg)
-            unescaped.append(data[i + 1] - 0x80)
-            i += 2
-        else:
-            unescaped.append(byte)
-            i += 1
-    return bytes(unescaped)
-
-
-def _checksum(data: Iterable[int]) -> int:
-    value = 0
-    for byte in data:
-        value ^= byte
-    return value & 0xFF
-
-
-def _pack_u8(value: int) -> bytes:
-    if not 0 <= value <= 0xFF:
-        msg = "Value must fit in an unsigned 8-bit field."
+    try:
+        header = _STRING_HEADER_LAYOUT.pack(
+            DiCommand.SET_STRING_SV, *_target_fields(target), len(encoded) + 1
+        )
+    except struct.error:
+        _check_target(target)
+        raise
+    return b"".join((header, encoded, b"\x00"))
+
+
+def pack_body_into(
+    buffer: bytearray | memoryview,
+    offset: int,
+    command: DiCommand,
+    target: DiTarget | None,
+    value: int,
+) -> int:
+    layout = BODY_LAYOUTS[command]
+    if command in _VALUE_LAYOUTS:
+        if target is None:
+            msg = f"{command!r} requires a target."
+            raise ValueError(msg)
+        try:
+            layout.pack_into(buffer, offset, command, *_target_fields(target), value)
+        except struct.error:
+            _check_target(target)
+            check_value(value, _VALUE_COMMANDS[command])
+            raise
+    elif layout is _PRESET_LAYOUT:
+        try:
+            layout.pack_into(buffer, offset, command, value)
+        except struct.error:
+            check_value(value, signed=False)
+            raise
+    else:
+        msg = f"{command!r} has a variable-length body."
         raise ValueError(msg)
-    return value.to_bytes(1, byteorder="big", signed=False)
+    return offset + layout.size
 
 
-def _pack_u16(value: int) -> bytes:
-    if not 0 <= value <= 0xFFFF:
-        msg = "Value must fit in an unsigned 16-bit field."
-        raise ValueError(msg)
-    return value.to_bytes(2, byteorder="big", signed=False)
+def _pack_value_body(command: DiCommand, target: DiTarget, value: int) -> bytes:
+    try:
+        return _VALUE_LAYOUTS[command].pack(command, *_target_fields(target), value)
+    except struct.error:
+        _check_target(target)
+        check_value(value, _VALUE_COMMANDS[command])
+        raise
 
 
-def _pack_u24(value: int) -> bytes:
-    if not 0 <= value <= 0xFFFFFF:
-        msg = "Value must fit in an unsigned 24-bit field."
-        raise ValueError(msg)
-    return value.to_bytes(3, byteorder="big", signed=False)
+def _pack_preset_body(command: DiCommand, preset_number: int) -> bytes:
+    try:
+        return _PRESET_LAYOUT.pack(command, preset_number)
+    except struct.error:
+        check_value(preset_number, signed=False)
+        raise
 
 
-def _pack_u32(value: int) -> bytes:
-    if not 0 <= value <= 0xFFFFFFFF:
-        msg = "Value must fit in an unsigned 32-bit field."
-        raise ValueError(msg)
-    return value.to_bytes(4, byteorder="big", signed=False)
+def _target_fields(target: DiTarget) -> tuple[int, int, int, int, int]:
+    object_id = target.object_id
+    return (
+        target.node,
+        target.virtual_device,
+        object_id >> 16,
+        object_id & 0xFFFF,
+        target.state_variable,
+    )
 
 
-def _pack_i32(value: int) -> bytes:
-    if not -(2**31) <= value <= 2**31 - 1:
-        msg = "Value must fit in a signed 32-bit field."
+def _escape_bytes(data: bytes) -> bytes:
+    if len(data.translate(None, _SPECIAL)) == len(data):
+        return bytes(data)
+    for special, escaped in _ESCAPE_REPLACEMENTS:
+        data = data.replace(special, escaped)
+    return bytes(data)
+
+
+def _unescape_bytes(data: bytes | bytearray) -> bytes:
+    escapes = data.count(ESC)
+    if not escapes:
+        return bytes(data)
+    unescaped = data
+    for escaped, special in _UNESCAPE_REPLACEMENTS:
+        unescaped = unescaped.replace(escaped, special)
+    if len(unescaped) == len(data) - escapes:
+        return bytes(unescaped)
+    return _unescape_irregular(data)
+
+
+def _unescape_irregular(data: bytes | bytearray) -> bytes:
+    parts = data.split(_ESC_BYTES)
+    unescaped = [parts[0]]
+    last = len(parts) - 1
+    for index in range(1, len(parts)):
+        part = parts[index]
+        if not part:
+            if index == last:
+                msg = "Escape byte at end of frame."
+            else:
+                msg = "Escape byte followed by another escape byte."
+            raise ValueError(msg)
+        byte = _UNESCAPED_BYTE[part[0]]
+        if byte is None:
+            msg = "Escaped byte must be 0x80 or greater."
+            raise ValueError(msg)
+        unescaped.append(byte)
+        unescaped.append(part[1:])
+    return b"".join(unescaped)
+
+
+def _checksum(data: bytes | bytearray | memoryview) -> int:
+    if len(data) <= _SHORT_CHECKSUM:
+        # Folding a big int only pays off once the body is longer than a few words.
+        value = 0
+        for byte in data:
+            value ^= byte
+        return value
+    value = int.from_bytes(data)
+    width = len(data) * 8
+    while width > 8:
+        width = (width + 15) // 16 * 8
+        value = (value >> width) ^ (value & ((1 << width) - 1))
+    return value
+
+
+# struct reports range errors without naming the field, so failed packs are
+# re-checked with these to raise a descriptive ValueError instead.
+def _check_target(target: DiTarget) -> None:
+    _check_range(target.node, 0, 0xFFFF, "an unsigned 16-bit")
+    _check_range(target.virtual_device, 0, 0xFF, "an unsigned 8-bit")
+    _check_range(target.object_id, 0, 0xFFFFFF, "an unsigned 24-bit")
+    _check_range(target.state_variable, 0, 0xFFFF, "an unsigned 16-bit")
+
+
+def check_value(value: int, signed: bool) -> None:
+    if signed:
+        _check_range(value, -(2**31), 2**31 - 1, "a signed 32-bit")
+    else:
+        _check_range(value, 0, 0xFFFFFFFF, "an unsigned 32-bit")
+
+
+def _check_range(value: int, low: int, high: int, field: str) -> None:
+    if not low <= value <= high:
+        msg = f"Value must fit in {field} field."
         raise ValueError(msg)
-    return value.to_bytes(4, byteorder="big", signed=True)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from ._sockopts import set_nodelay
+from .async_client import AsyncDirectInjectClient, AsyncDirectInjectError
+from .capture import WireCapture
+from .metrics import ClientMetrics
+from .protocol import scan_frames
+
+_BUFFER_SIZE = 262144
+
+
+class _DirectInjectProtocol(asyncio.BufferedProtocol):
+    def __init__(
+        self,
+        on_reply: Callable[[int], object],
+        on_body: Callable[[bytes | memoryview], object],
+        on_error: Callable[[ValueError], object],
+        metrics: ClientMetrics | None,
+        capture: WireCapture | None,
+    ) -> None:
+        self._on_reply = on_reply
+        self._on_body = on_body
+        self._on_error = on_error
+        self._metrics = metrics
+        self._capture = capture
+        self._buffer = bytearray(_BUFFER_SIZE)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+        self._transport: asyncio.Transport | None = None
+        self._paused = False
+        self._drain_waiters: list[asyncio.Future[None]] = []
+        self._lost: asyncio.Future[Exception | None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self.eof = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self._transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._filled == len(self._buffer):
+            # A partial frame filled the buffer, so grow it instead of dropping it.
+            buffer = bytearray(2 * len(self._buffer))
+            buffer[: self._filled] = self._buffer
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        return self._view[self._filled :]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        if self._metrics is not None:
+            self._metrics.record_received(nbytes)
+        end = self._filled + nbytes
+        if self._capture is not None:
+            self._capture.record_received(self._view[self._filled : end])
+        start = scan_frames(
+            self._buffer, end, self._on_reply, self._on_body, self._on_error
+        )
+        remaining = end - start
+        if remaining and start:
+            self._view[:remaining] = self._view[start:end]
+        self._filled = remaining
+
+    def eof_received(self) -> bool:
+        self.eof = True
+        return False
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if not self._lost.done():
+            self._lost.set_result(exc)
+        error = exc or ConnectionResetError("Connection closed by device.")
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+        self._drain_waiters.clear()
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._drain_waiters.clear()
+
+    def write(self, data: bytes) -> None:
+        self._require_transport().write(data)
+
+    def writelines(self, data: Iterable[bytes]) -> None:
+        self._require_transport().writelines(data)
+
+    async def drain(self) -> None:
+        if self._require_transport().is_closing():
+            # Give connection_lost a chance to run first, as StreamWriter does.
+            await asyncio.sleep(0)
+        if self._lost.done():
+            msg = "Connection lost."
+            raise ConnectionResetError(msg)
+        if not self._paused:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await waiter
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+
+    async def wait_closed(self) -> None:
+        await asyncio.shield(self._lost)
+
+    async def wait_lost(self) -> Exception | None:
+        return await asyncio.shield(self._lost)
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        if self._transport is None:
+            return default
+        return self._transport.get_extra_info(name, default)
+
+    def _require_transport(self) -> asyncio.Transport:
+        if self._transport is None:
+            msg = "Client is not connected."
+            raise AsyncDirectInjectError(msg)
+        return self._transport
+
+
+@dataclass
+class AsyncDirectInjectProtocolClient(AsyncDirectInjectClient):
+    background_reader: bool = True
+
+    def __post_init__(self) -> None:
+        if not self.background_reader:
+            msg = "AsyncDirectInjectProtocolClient always reads in the background."
+            raise ValueError(msg)
+
+    async def connect(self) -> None:
+        if self._writer is not None:
+            return
+        await self._open()
+
+    async def _open(self) -> None:
+        loop = asyncio.get_running_loop()
+        transport, protocol = await asyncio.wait_for(
+            loop.create_connection(self._make_protocol, self.host, self.port),
+            timeout=self.timeout,
+        )
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            set_nodelay(sock, self.tcp_nodelay)
+        self._writer = protocol
+        self._ack_slots = asyncio.Semaphore(max(1, self.ack_window))
+        self._reader_task = asyncio.create_task(self._watch(protocol))
+
+    def _make_protocol(self) -> _DirectInjectProtocol:
+        return _DirectInjectProtocol(
+            self._dispatch_reply,
+            self._dispatch_body,
+            self._report_malformed,
+            self.metrics,
+            self.capture,
+        )
+
+    async def _watch(self, protocol: _DirectInjectProtocol) -> None:
+        error = AsyncDirectInjectError("Client closed.")
+        lost = False
+        try:
+            exc = await protocol.wait_lost()
+            lost = True
+            if exc is None:
+                error = AsyncDirectInjectError("Connection closed by device.")
+            else:
+                error = AsyncDirectInjectError(f"Connection lost: {exc}")
+        finally:
+            self._finish_reading(error, lost)
+
+    def _at_eof(self) -> bool:
+        writer = self._writer
+        return isinstance(writer, _DirectInjectProtocol) and writer.eof
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass
+
+from .protocol import DiCommand, DiTarget, compile_target
+
+SubscriptionKey = tuple[DiCommand, DiTarget]
+
+_NON_IDEMPOTENT = frozenset({DiCommand.BUMP_SV_PERCENT})
+
+
+@dataclass(frozen=True)
+class ReconnectPolicy:
+    initial_delay: float = 0.05
+    max_delay: float = 5.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    max_attempts: int | None = None
+    buffer_size: int = 1024
+
+    def delays(self) -> Iterator[float]:
+        delay = self.initial_delay
+        attempt = 0
+        while self.max_attempts is None or attempt < self.max_attempts:
+            yield delay * (1.0 - self.jitter * random.random())
+            delay = min(delay * self.multiplier, self.max_delay)
+            attempt += 1
+
+
+def subscription_frames(subscriptions: Mapping[SubscriptionKey, int]) -> list[bytes]:
+    return [
+        compile_target(target).encode(command, rate_ms)
+        for (command, target), rate_ms in subscriptions.items()
+    ]
+
+
+def safe_to_resend(frames: Iterable[bytes]) -> bool:
+    # The command byte follows STX and is never escaped.
+    return all(frame[1] not in _NON_IDEMPOTENT for frame in frames)
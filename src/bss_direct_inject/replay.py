@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+from dataclasses import dataclass
+
+from ._sockopts import set_nodelay
+from .capture import CaptureDirection, CaptureReader
+from .protocol import ACK, NAK, STX, FrameDecoder
+
+_RECV_SIZE = 65536
+# Frames written between drains when nothing is waiting on the clock.
+_BATCH = 256
+
+
+@dataclass
+class ReplayStats:
+    frames: int = 0
+    sent_bytes: int = 0
+    received_bytes: int = 0
+    acks: int = 0
+    naks: int = 0
+    notifications: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def replies(self) -> int:
+        return self.acks + self.naks
+
+    @property
+    def rate(self) -> float:
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+
+async def replay_capture(
+    capture: CaptureReader,
+    host: str,
+    port: int = 1023,
+    speed: float | None = 1.0,
+    start: float = 0.0,
+    end: float | None = None,
+    settle: float = 1.0,
+    timeout: float = 1.0,
+    tcp_nodelay: bool = True,
+) -> ReplayStats:
+    if speed is not None and speed <= 0:
+        msg = "speed must be positive, or None for as fast as possible."
+        raise ValueError(msg)
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout=timeout
+    )
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        set_nodelay(sock, tcp_nodelay)
+    stats = ReplayStats()
+    progress = asyncio.Event()
+    # Replies must be read even though nothing waits on them, or a busy device
+    # stops reading once its send buffer fills.
+    receiving = asyncio.create_task(_receive(reader, stats, progress))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        await _send(capture, writer, stats, speed, start, end)
+        deadline = loop.time() + settle
+        while stats.replies < stats.frames and not receiving.done():
+            progress.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(progress.wait(), remaining)
+    finally:
+        stats.elapsed = loop.time() - started
+        receiving.cancel()
+        writer.close()
+        with contextlib.suppress(OSError, asyncio.CancelledError):
+            await receiving
+        with contextlib.suppress(OSError):
+            await writer.wait_closed()
+    return stats
+
+
+async def _send(
+    capture: CaptureReader,
+    writer: asyncio.StreamWriter,
+    stats: ReplayStats,
+    speed: float | None,
+    start: float,
+    end: float | None,
+) -> None:
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first: float | None = None
+    pending: list[bytes] = []
+    for record in capture.between(start, end, CaptureDirection.SENT):
+        if speed is not None:
+            if first is None:
+                first = record.timestamp
+            delay = started + (record.timestamp - first) / speed - loop.time()
+            if delay > 0:
+                writer.writelines(pending)
+                pending.clear()
+                await writer.drain()
+                await asyncio.sleep(delay)
+        pending.append(record.data)
+        stats.frames += 1
+        stats.sent_bytes += len(record.data)
+        if len(pending) >= _BATCH:
+            writer.writelines(pending)
+            pending.clear()
+            await writer.drain()
+    writer.writelines(pending)
+    await writer.drain()
+
+
+async def _receive(
+    reader: asyncio.StreamReader, stats: ReplayStats, progress: asyncio.Event
+) -> None:
+    decoder = FrameDecoder()
+    while chunk := await reader.read(_RECV_SIZE):
+        stats.received_bytes += len(chunk)
+        for frame in decoder.feed(chunk):
+            if frame[0] == ACK:
+                stats.acks += 1
+            elif frame[0] == NAK:
+                stats.naks += 1
+            elif frame[0] == STX:
+                stats.notifications += 1
+        progress.set()
+    progress.set()
+
+
+def _speed(value: str) -> float | None:
+    if value == "max":
+        return None
+    return float(value)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay the frames sent in a Direct Inject capture."
+    )
+    parser.add_argument("capture")
+    parser.add_argument("host")
+    parser.add_argument("--port", type=int, default=1023)
+    parser.add_argument(
+        "--speed", type=_speed, default=1.0, help="a multiplier, or 'max'"
+    )
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--end", type=float, default=None)
+    parser.add_argument("--settle", type=float, default=1.0)
+    args = parser.parse_args(argv)
+    with CaptureReader(args.capture) as capture:
+        stats = asyncio.run(
+            replay_capture(
+                capture,
+                args.host,
+                port=args.port,
+                speed=args.speed,
+                start=args.start,
+                end=args.end,
+                settle=args.settle,
+            )
+        )
+    print(
+        f"{stats.frames} frames ({stats.sent_bytes} bytes) in {stats.elapsed:.3f}s, "
+        f"{stats.rate:.0f} frames/s; {stats.acks} ACK, {stats.naks} NAK, "
+        f"{stats.notifications} notifications"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import math
+from array import array
+from collections.abc import Iterable
+from itertools import repeat
+from operator import mul, truediv
+
+from .protocol import check_value
+
+PERCENT_SCALE = 65536
+SET_SV_PERCENT_SCALE = 100
+SCALAR_SCALE = 10000
+DELAY_SAMPLE_RATE = 96000
+FREQUENCY_SCALE = 1_000_000
+
+_GAIN_KNEE_DB = -10.0
+_GAIN_KNEE_RAW = -100000
+_GAIN_LOG_SCALE = 200000
+
+
+def percent_to_raw(percent: float) -> int:
+    return _to_raw(percent * PERCENT_SCALE)
+
+
+def raw_to_percent(raw: int) -> float:
+    return raw / PERCENT_SCALE
+
+
+def set_sv_percent_to_raw(percent: float) -> int:
+    return _to_raw(percent * SET_SV_PERCENT_SCALE)
+
+
+def raw_to_set_sv_percent(raw: int) -> float:
+    return raw / SET_SV_PERCENT_SCALE
+
+
+def scalar_to_raw(value: float) -> int:
+    return _to_raw(value * SCALAR_SCALE)
+
+
+def raw_to_scalar(raw: int) -> float:
+    return raw / SCALAR_SCALE
+
+
+def gain_to_raw(db: float) -> int:
+    if db >= _GAIN_KNEE_DB:
+        return _to_raw(db * SCALAR_SCALE)
+    return _to_raw(-math.log10(db / _GAIN_KNEE_DB) * _GAIN_LOG_SCALE + _GAIN_KNEE_RAW)
+
+
+def raw_to_gain(raw: int) -> float:
+    if raw >= _GAIN_KNEE_RAW:
+        return raw / SCALAR_SCALE
+    return _GAIN_KNEE_DB * 10 ** ((_GAIN_KNEE_RAW - raw) / _GAIN_LOG_SCALE)
+
+
+def delay_to_raw(ms: float) -> int:
+    return _to_raw(ms * DELAY_SAMPLE_RATE / 1000)
+
+
+def raw_to_delay(raw: int) -> float:
+    return raw * 1000 / DELAY_SAMPLE_RATE
+
+
+def frequency_to_raw(hz: float) -> int:
+    return _to_raw(math.log10(hz) * FREQUENCY_SCALE)
+
+
+def raw_to_frequency(raw: int) -> float:
+    return 10 ** (raw / FREQUENCY_SCALE)
+
+
+# The *_many variants keep the per-value work inside C-level map() chains where
+# the law allows it, and return compact arrays.
+
+
+def percent_to_raw_many(percents: Iterable[float]) -> array[int]:
+    return _raw_array(map(mul, percents, repeat(PERCENT_SCALE)))
+
+
+def raw_to_percent_many(raws: Iterable[int]) -> array[float]:
+    return array("d", map(truediv, raws, repeat(PERCENT_SCALE)))
+
+
+def set_sv_percent_to_raw_many(percents: Iterable[float]) -> array[int]:
+    return _raw_array(map(mul, percents, repeat(SET_SV_PERCENT_SCALE)))
+
+
+def raw_to_set_sv_percent_many(raws: Iterable[int]) -> array[float]:
+    return array("d", map(truediv, raws, repeat(SET_SV_PERCENT_SCALE)))
+
+
+def scalar_to_raw_many(values: Iterable[float]) -> array[int]:
+    return _raw_array(map(mul, values, repeat(SCALAR_SCALE)))
+
+
+def raw_to_scalar_many(raws: Iterable[int]) -> array[float]:
+    return array("d", map(truediv, raws, repeat(SCALAR_SCALE)))
+
+
+def gain_to_raw_many(dbs: Iterable[float]) -> array[int]:
+    return _raw_array(map(gain_to_raw, dbs))
+
+
+def raw_to_gain_many(raws: Iterable[int]) -> array[float]:
+    return array("d", map(raw_to_gain, raws))
+
+
+def delay_to_raw_many(ms: Iterable[float]) -> array[int]:
+    return _raw_array(map(mul, ms, repeat(DELAY_SAMPLE_RATE / 1000)))
+
+
+def raw_to_delay_many(raws: Iterable[int]) -> array[float]:
+    return array("d", map(mul, raws, repeat(1000 / DELAY_SAMPLE_RATE)))
+
+
+def frequency_to_raw_many(hz: Iterable[float]) -> array[int]:
+    return _raw_array(map(mul, map(math.log10, hz), repeat(FREQUENCY_SCALE)))
+
+
+def raw_to_frequency_many(raws: Iterable[int]) -> array[float]:
+    exponents = map(truediv, raws, repeat(FREQUENCY_SCALE))
+    return array("d", map(math.pow, repeat(10.0), exponents))
+
+
+def _to_raw(value: float) -> int:
+    try:
+        raw = round(value)
+    except OverflowError:
+        msg = "Value must fit in a signed 32-bit field."
+        raise ValueError(msg) from None
+    check_value(raw, signed=True)
+    return raw
+
+
+def _raw_array(values: Iterable[float]) -> array[int]:
+    try:
+        return array("i", map(round, values))
+    except OverflowError:
+        msg = "Value must fit in a signed 32-bit field."
+        raise ValueError(msg) from None
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Iterator, Mapping, MutableMapping
+from dataclasses import dataclass, field
+
+from .coalesce import _SendsMany, _SendsManyAsync
+from .mirror import SvMirror
+from .protocol import (
+    DiCommand,
+    DiNotification,
+    DiTarget,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+    check_value,
+)
+
+KnownState = SvMirror | Mapping[DiTarget, int]
+
+_BUILDERS = {
+    DiCommand.SET_SV: build_set_sv_body,
+    DiCommand.SET_SV_PERCENT: build_set_sv_percent_body,
+}
+
+
+@dataclass(frozen=True)
+class SceneChange:
+    target: DiTarget
+    value: int
+    previous: int | None
+
+
+@dataclass(frozen=True)
+class SceneDiff:
+    command: DiCommand = DiCommand.SET_SV
+    changes: tuple[SceneChange, ...] = ()
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def __iter__(self) -> Iterator[SceneChange]:
+        return iter(self.changes)
+
+    def bodies(self) -> list[bytes]:
+        build = _BUILDERS[self.command]
+        return [build(change.target, change.value) for change in self.changes]
+
+    def inverse(self) -> SceneDiff:
+        # Targets whose earlier value was unknown cannot be put back.
+        return SceneDiff(
+            self.command,
+            tuple(
+                SceneChange(change.target, change.previous, change.value)
+                for change in reversed(self.changes)
+                if change.previous is not None
+            ),
+        )
+
+
+@dataclass
+class Scene:
+    values: dict[DiTarget, int] = field(default_factory=dict)
+    command: DiCommand = DiCommand.SET_SV
+
+    def __post_init__(self) -> None:
+        if self.command not in _BUILDERS:
+            msg = "Scenes hold SET_SV or SET_SV_PERCENT values."
+            raise ValueError(msg)
+        for value in self.values.values():
+            check_value(value, signed=True)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def capture(
+        cls,
+        mirror: SvMirror,
+        targets: list[DiTarget],
+        command: DiCommand = DiCommand.SET_SV,
+    ) -> Scene:
+        scene = cls(command=command)
+        for target in targets:
+            value = _known_value(mirror, command, target)
+            if value is not None:
+                scene.values[target] = value
+        return scene
+
+    def diff(self, known: KnownState) -> SceneDiff:
+        changes = []
+        for target, value in self.values.items():
+            previous = _known_value(known, self.command, target)
+            if previous != value:
+                changes.append(SceneChange(target, value, previous))
+        return SceneDiff(self.command, tuple(changes))
+
+
+def apply_diff(
+    client: _SendsMany,
+    diff: SceneDiff,
+    known: KnownState | None = None,
+    batch_size: int = 64,
+    max_rate: float | None = None,
+) -> int:
+    sent = 0
+    started = time.monotonic()
+    for batch in _batches(diff, batch_size):
+        if max_rate is not None:
+            time.sleep(max(0.0, started + sent / max_rate - time.monotonic()))
+        client.send_many(batch.bodies())
+        _remember(known, batch)
+        sent += len(batch)
+    return sent
+
+
+async def apply_diff_async(
+    client: _SendsManyAsync,
+    diff: SceneDiff,
+    known: KnownState | None = None,
+    batch_size: int = 64,
+    max_rate: float | None = None,
+) -> int:
+    sent = 0
+    started = time.monotonic()
+    for batch in _batches(diff, batch_size):
+        if max_rate is not None:
+            await asyncio.sleep(max(0.0, started + sent / max_rate - time.monotonic()))
+        await client.send_many(batch.bodies())
+        _remember(known, batch)
+        sent += len(batch)
+    return sent
+
+
+def _batches(diff: SceneDiff, batch_size: int) -> Iterator[SceneDiff]:
+    if batch_size < 1:
+        msg = "batch_size must be at least 1."
+        raise ValueError(msg)
+    for start in range(0, len(diff.changes), batch_size):
+        yield SceneDiff(diff.command, diff.changes[start : start + batch_size])
+
+
+def _known_value(known: KnownState, command: DiCommand, target: DiTarget) -> int | None:
+    if isinstance(known, SvMirror):
+        if command == DiCommand.SET_SV_PERCENT:
+            return known.get_percent(target)
+        return known.get(target)
+    return known.get(target)
+
+
+def _remember(known: KnownState | None, batch: SceneDiff) -> None:
+    # Only sent batches are recorded, so a failed apply is resent by the next diff.
+    if isinstance(known, SvMirror):
+        for change in batch:
+            known.update(DiNotification(batch.command, change.target, change.value))
+    elif isinstance(known, MutableMapping):
+        for change in batch:
+            known[change.target] = change.value
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from .coalesce import PERCENT_MAX
+from .protocol import (
+    ACK,
+    BODY_LAYOUTS,
+    NAK,
+    DiCommand,
+    DirectInjectCodec,
+    DiTarget,
+    FrameDecoder,
+    compile_target,
+)
+
+_ACK_BYTES = bytes([ACK])
+_NAK_BYTES = bytes([NAK])
+
+_SUBSCRIBE_COMMANDS = {
+    DiCommand.SUBSCRIBE_SV: DiCommand.SET_SV,
+    DiCommand.SUBSCRIBE_SV_PERCENT: DiCommand.SET_SV_PERCENT,
+}
+_UNSUBSCRIBE_COMMANDS = {
+    DiCommand.UNSUBSCRIBE_SV: DiCommand.SET_SV,
+    DiCommand.UNSUBSCRIBE_SV_PERCENT: DiCommand.SET_SV_PERCENT,
+}
+
+StateKey = tuple[DiCommand, DiTarget]
+
+
+@dataclass
+class _Subscription:
+    rate_ms: int
+    sent: int | None = None
+
+
+@dataclass(eq=False)
+class _Session:
+    writer: asyncio.StreamWriter
+    subscriptions: dict[StateKey, _Subscription] = field(default_factory=dict)
+    tickers: dict[int, asyncio.Task[None]] = field(default_factory=dict)
+    reply_at: float = 0.0
+
+
+@dataclass
+class DeviceSimulator:
+    host: str = "127.0.0.1"
+    port: int = 1023
+    acknowledge: bool = True
+    latency: float = 0.0
+    jitter: float = 0.0
+    drop_rate: float = 0.0
+    meters: frozenset[DiTarget] = frozenset()
+    seed: int | None = None
+
+    received: int = field(default=0, init=False)
+    dropped: int = field(default=0, init=False)
+    naks: int = field(default=0, init=False)
+    notifications: int = field(default=0, init=False)
+
+    _server: asyncio.Server | None = None
+    _sessions: set[_Session] = field(default_factory=set)
+    _state: dict[StateKey, int] = field(default_factory=dict)
+    _random: random.Random = field(default_factory=random.Random)
+
+    def __post_init__(self) -> None:
+        if self.seed is not None:
+            self._random.seed(self.seed)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        if self._server is None:
+            msg = "Simulator is not running."
+            raise RuntimeError(msg)
+        return self._server.sockets[0].getsockname()[:2]
+
+    @property
+    def sessions(self) -> int:
+        return len(self._sessions)
+
+    async def start(self) -> None:
+        if self._server is None:
+            self._server = await asyncio.start_server(self._serve, self.host, self.port)
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for session in tuple(self._sessions):
+            session.writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def __aenter__(self) -> DeviceSimulator:
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
+
+    def get(self, target: DiTarget) -> int | None:
+        return self._state.get((DiCommand.SET_SV, target))
+
+    def get_percent(self, target: DiTarget) -> int | None:
+        return self._state.get((DiCommand.SET_SV_PERCENT, target))
+
+    def set_value(self, target: DiTarget, value: int) -> None:
+        self._state[(DiCommand.SET_SV, target)] = value
+
+    def set_percent(self, target: DiTarget, value: int) -> None:
+        self._state[(DiCommand.SET_SV_PERCENT, target)] = value
+
+    def load(self, values: Iterable[tuple[DiTarget, int]]) -> None:
+        for target, value in values:
+            self.set_value(target, value)
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        session = _Session(writer)
+        self._sessions.add(session)
+        decoder = FrameDecoder()
+        try:
+            while data := await reader.read(65536):
+                for frame in decoder.feed(data):
+                    self._handle_frame(session, frame)
+        except OSError:
+            pass
+        finally:
+            self._sessions.discard(session)
+            for ticker in session.tickers.values():
+                ticker.cancel()
+            writer.close()
+
+    def _handle_frame(self, session: _Session, frame: bytes) -> None:
+        if len(frame) == 1:
+            return
+        self.received += 1
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        try:
+            body = DirectInjectCodec.decode(frame)
+            self._apply(session, body)
+        except ValueError:
+            self.naks += 1
+            self._reply(session, _NAK_BYTES)
+            return
+        if self.acknowledge:
+            self._reply(session, _ACK_BYTES)
+
+    def _apply(self, session: _Session, body: bytes) -> None:
+        if not body:
+            msg = "Empty message."
+            raise ValueError(msg)
+        command = DiCommand(body[0])
+        layout = BODY_LAYOUTS[command]
+        if command == DiCommand.SET_STRING_SV:
+            if len(body) < layout.size:
+                msg = "String message is truncated."
+                raise ValueError(msg)
+            return
+        if len(body) != layout.size:
+            msg = f"{command.name} message must be {layout.size} bytes."
+            raise ValueError(msg)
+        if command in (DiCommand.VENUE_PRESET_RECALL, DiCommand.PARAM_PRESET_RECALL):
+            return
+        _, node, virtual_device, object_hi, object_lo, sv, value = layout.unpack(body)
+        target = DiTarget(node, virtual_device, object_hi << 16 | object_lo, sv)
+        if command in _SUBSCRIBE_COMMANDS:
+            self._subscribe(session, (_SUBSCRIBE_COMMANDS[command], target), value)
+        elif command in _UNSUBSCRIBE_COMMANDS:
+            session.subscriptions.pop((_UNSUBSCRIBE_COMMANDS[command], target), None)
+        elif command == DiCommand.BUMP_SV_PERCENT:
+            key = (DiCommand.SET_SV_PERCENT, target)
+            bumped = self._state.get(key, 0) + value
+            self._state[key] = min(max(bumped, 0), PERCENT_MAX)
+        else:
+            self._state[(command, target)] = value
+
+    def _subscribe(self, session: _Session, key: StateKey, rate_ms: int) -> None:
+        rate_ms = max(rate_ms, 1)
+        session.subscriptions[key] = _Subscription(rate_ms)
+        if rate_ms not in session.tickers:
+            session.tickers[rate_ms] = asyncio.create_task(self._tick(session, rate_ms))
+
+    async def _tick(self, session: _Session, rate_ms: int) -> None:
+        interval = rate_ms / 1000
+        while True:
+            frames = []
+            active = False
+            for (command, target), subscription in session.subscriptions.items():
+                if subscription.rate_ms != rate_ms:
+                    continue
+                active = True
+                value = self._state.get((command, target), 0)
+                if value == subscription.sent and target not in self.meters:
+                    continue
+                subscription.sent = value
+                frames.append(compile_target(target).encode(command, value))
+            if not active:
+                del session.tickers[rate_ms]
+                return
+            if frames:
+                self.notifications += len(frames)
+                session.writer.writelines(frames)
+                try:
+                    await session.writer.drain()
+                except OSError:
+                    return
+            await asyncio.sleep(interval)
+
+    def _reply(self, session: _Session, data: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        delay = self.latency
+        if self.jitter:
+            delay = max(delay + self._random.uniform(-self.jitter, self.jitter), 0.0)
+        now = loop.time()
+        if delay <= 0 and session.reply_at <= now:
+            session.writer.write(data)
+            return
+        # Replies leave in arrival order, because clients match ACKs FIFO.
+        session.reply_at = max(now + delay, session.reply_at)
+        loop.call_at(session.reply_at, _write_if_open, session.writer, data)
+
+
+def _write_if_open(writer: asyncio.StreamWriter, data: bytes) -> None:
+    if not writer.is_closing():
+        writer.write(data)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate a Direct Inject device.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1023)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--no-ack", dest="acknowledge", action="store_false")
+    args = parser.parse_args(argv)
+    simulator = DeviceSimulator(
+        host=args.host,
+        port=args.port,
+        acknowledge=args.acknowledge,
+        latency=args.latency,
+        jitter=args.jitter,
+        drop_rate=args.drop_rate,
+    )
+    try:
+        asyncio.run(simulator.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
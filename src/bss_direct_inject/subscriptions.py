@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from .async_client import NotificationHandler
+from .mirror import _HasHandlers
+from .protocol import DiCommand, DiNotification, DiTarget, check_value
+from .reconnect import SubscriptionKey
+
+_SUBSCRIBE_FOR = {
+    DiCommand.SET_SV: DiCommand.SUBSCRIBE_SV,
+    DiCommand.SET_SV_PERCENT: DiCommand.SUBSCRIBE_SV_PERCENT,
+}
+
+
+class _Subscribes(_HasHandlers, Protocol):
+    background_reader: bool
+
+    async def subscribe_sv(self, target: DiTarget, rate_ms: int) -> bool: ...
+
+    async def unsubscribe_sv(self, target: DiTarget) -> bool: ...
+
+    async def subscribe_sv_percent(self, target: DiTarget, rate_ms: int) -> bool: ...
+
+    async def unsubscribe_sv_percent(self, target: DiTarget) -> bool: ...
+
+
+@dataclass(eq=False)
+class ManagedSubscription:
+    manager: AsyncSubscriptionManager
+    target: DiTarget
+    rate_ms: int
+    percent: bool
+    handler: NotificationHandler
+
+    _next_at: float = float("-inf")
+    _pending: DiNotification | None = None
+    _timer: asyncio.TimerHandle | None = None
+
+    @property
+    def key(self) -> SubscriptionKey:
+        return _key(self.target, self.percent)
+
+    async def close(self) -> None:
+        await self.manager.unsubscribe(self)
+
+    async def __aenter__(self) -> ManagedSubscription:
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
+
+    def _offer(self, notification: DiNotification, device_rate_ms: int) -> None:
+        if self.rate_ms <= device_rate_ms:
+            self._deliver(notification)
+            return
+        # Slower consumers get at most one update per rate_ms. The newest value
+        # held back is delivered when the interval ends, so none is lost for good.
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if now >= self._next_at and self._timer is None:
+            self._advance(now)
+            self._deliver(notification)
+            return
+        self._pending = notification
+        if self._timer is None:
+            self._timer = loop.call_at(self._next_at, self._flush)
+
+    def _flush(self) -> None:
+        self._timer = None
+        notification, self._pending = self._pending, None
+        if notification is not None:
+            self._advance(asyncio.get_running_loop().time())
+            self._deliver(notification)
+
+    def _advance(self, now: float) -> None:
+        interval = self.rate_ms / 1000
+        self._next_at += interval
+        if self._next_at <= now:
+            self._next_at = now + interval
+
+    def _deliver(self, notification: DiNotification) -> None:
+        try:
+            self.handler(notification)
+        except Exception as exc:
+            asyncio.get_running_loop().call_exception_handler(
+                {
+                    "message": "Notification handler raised.",
+                    "exception": exc,
+                    "subscription": self,
+                }
+            )
+
+    def _cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
+
+
+@dataclass
+class AsyncSubscriptionManager:
+    client: _Subscribes
+
+    _consumers: dict[SubscriptionKey, list[ManagedSubscription]] = field(
+        default_factory=dict
+    )
+    _rates: dict[SubscriptionKey, int] = field(default_factory=dict)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def __post_init__(self) -> None:
+        if not self.client.background_reader:
+            msg = "Subscriptions are dispatched by the background reader."
+            raise ValueError(msg)
+
+    @property
+    def device_subscriptions(self) -> dict[SubscriptionKey, int]:
+        return dict(self._rates)
+
+    def consumers(self, target: DiTarget, percent: bool = False) -> int:
+        return len(self._consumers.get(_key(target, percent), ()))
+
+    async def subscribe(
+        self,
+        target: DiTarget,
+        rate_ms: int,
+        handler: NotificationHandler,
+        percent: bool = False,
+    ) -> ManagedSubscription:
+        check_value(rate_ms, signed=False)
+        subscription = ManagedSubscription(self, target, rate_ms, percent, handler)
+        key = subscription.key
+        async with self._lock:
+            if not self._watching(target):
+                self.client.add_handler(target, self._dispatch)
+            self._consumers.setdefault(key, []).append(subscription)
+            try:
+                await self._sync(key)
+            except BaseException:
+                self._remove(subscription)
+                raise
+        return subscription
+
+    async def unsubscribe(self, subscription: ManagedSubscription) -> None:
+        async with self._lock:
+            if not self._remove(subscription):
+                return
+            await self._sync(subscription.key)
+
+    async def close(self) -> None:
+        for subscriptions in list(self._consumers.values()):
+            for subscription in list(subscriptions):
+                await self.unsubscribe(subscription)
+
+    async def __aenter__(self) -> AsyncSubscriptionManager:
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
+
+    async def _sync(self, key: SubscriptionKey) -> None:
+        # Bring the device subscription in line with the fastest remaining
+        # consumer, or drop it when none are left.
+        command, target = key
+        consumers = self._consumers.get(key)
+        current = self._rates.get(key)
+        if not consumers:
+            if current is None:
+                return
+            del self._rates[key]
+            if command == DiCommand.SUBSCRIBE_SV_PERCENT:
+                await self.client.unsubscribe_sv_percent(target)
+            else:
+                await self.client.unsubscribe_sv(target)
+            return
+        wanted = min(consumer.rate_ms for consumer in consumers)
+        if wanted == current:
+            return
+        if command == DiCommand.SUBSCRIBE_SV_PERCENT:
+            await self.client.subscribe_sv_percent(target, wanted)
+        else:
+            await self.client.subscribe_sv(target, wanted)
+        self._rates[key] = wanted
+
+    def _remove(self, subscription: ManagedSubscription) -> bool:
+        consumers = self._consumers.get(subscription.key)
+        if not consumers or subscription not in consumers:
+            return False
+        consumers.remove(subscription)
+        subscription._cancel()
+        if not consumers:
+            del self._consumers[subscription.key]
+        if not self._watching(subscription.target):
+            self.client.remove_handler(subscription.target, self._dispatch)
+        return True
+
+    def _watching(self, target: DiTarget) -> bool:
+        return _key(target, False) in self._consumers or (
+            _key(target, True) in self._consumers
+        )
+
+    def _dispatch(self, notification: DiNotification) -> None:
+        key = (_SUBSCRIBE_FOR[notification.command], notification.target)
+        device_rate_ms = self._rates.get(key)
+        if device_rate_ms is None:
+            return
+        for subscription in tuple(self._consumers.get(key, ())):
+            subscription._offer(notification, device_rate_ms)
+
+
+def _key(target: DiTarget, percent: bool) -> SubscriptionKey:
+    command = DiCommand.SUBSCRIBE_SV_PERCENT if percent else DiCommand.SUBSCRIBE_SV
+    return (command, target)
@@ -4,9 +4,21 @@ import pytest
 
 from bss_direct_inject.async_client import (
     AsyncDirectInjectClient,
+    AsyncDirectInjectError,
     AsyncDirectInjectNakError,
 )
-from bss_direct_inject.protocol import ACK, NAK, DirectInjectCodec, DiTarget
+from bss_direct_inject.protocol import (
+    ACK,
+    NAK,
+    DiCommand,
+    DiNotification,
+    DirectInjectCodec,
+    DiTarget,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+)
+from bss_direct_inject.reconnect import ReconnectPolicy
+from bss_direct_inject.simulator import DeviceSimulator
 
 
 async def _run_server(handler):
@@ -81,3 +93,276 @@ async def test_read_body() -> None:
     async with server:
         async with AsyncDirectInjectClient(host, port=port) as client:
             assert await client.read_body() == body
+
+
+@pytest.mark.asyncio
+async def test_background_reader_routes_notifications_and_acks() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    other = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0001
+    )
+
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        _ = await _read_frame(reader)
+        writer.write(DirectInjectCodec.encode(build_set_sv_body(target, -100000)))
+        writer.write(DirectInjectCodec.encode(build_set_sv_percent_body(other, 7)))
+        writer.write(bytes([ACK]))
+        await writer.drain()
+        await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+    server, host, port = await _run_server(handler)
+    async with server:
+        async with AsyncDirectInjectClient(
+            host, port=port, expect_ack=True, background_reader=True
+        ) as client:
+            seen: list[DiNotification] = []
+            client.add_handler(target, seen.append)
+            queue = client.notification_queue(None)
+            assert await client.subscribe_sv(target, rate_ms=0) is True
+            first = await asyncio.wait_for(queue.get(), timeout=1)
+            second = await asyncio.wait_for(queue.get(), timeout=1)
+            assert seen == [first]
+            assert first.command == DiCommand.SET_SV
+            assert first.value == -100000
+            assert second.command == DiCommand.SET_SV_PERCENT
+            assert second.target == other
+            with pytest.raises(AsyncDirectInjectError):
+                await client.read_body()
+
+
+@pytest.mark.asyncio
+async def test_background_reader_fails_pending_ack_on_disconnect() -> None:
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        _ = await _read_frame(reader)
+        writer.close()
+        await writer.wait_closed()
+
+    server, host, port = await _run_server(handler)
+    async with server:
+        async with AsyncDirectInjectClient(
+            host, port=port, expect_ack=True, background_reader=True
+        ) as client:
+            with pytest.raises(AsyncDirectInjectError, match="closed"):
+                await client.send_body(b"\x88\x00")
+
+
+@pytest.mark.asyncio
+async def test_pipelined_sends_share_one_round_trip() -> None:
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        for _ in range(3):
+            _ = await _read_frame(reader)
+        writer.write(bytes([ACK, NAK, ACK]))
+        await writer.drain()
+        await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+    server, host, port = await _run_server(handler)
+    async with server:
+        async with AsyncDirectInjectClient(
+            host, port=port, background_reader=True, ack_window=3
+        ) as client:
+            futures = [await client.send_body_pipelined(b"\x88\x00") for _ in range(3)]
+            await client.flush_acks()
+            assert futures[0].result() is True
+            with pytest.raises(AsyncDirectInjectNakError):
+                futures[1].result()
+            assert futures[2].result() is True
+
+
+@pytest.mark.asyncio
+async def test_pipelined_send_requires_background_reader() -> None:
+    client = AsyncDirectInjectClient("127.0.0.1")
+    with pytest.raises(AsyncDirectInjectError, match="background_reader"):
+        await client.send_body_pipelined(b"\x88\x00")
+
+
+@pytest.mark.parametrize("background_reader", [False, True])
+@pytest.mark.asyncio
+async def test_send_many_acks_every_frame(background_reader: bool) -> None:
+    received: list[bytes] = []
+
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        for _ in range(3):
+            received.append(DirectInjectCodec.decode(await _read_frame(reader)))
+        writer.write(bytes([ACK, ACK, ACK]))
+        await writer.drain()
+        await reader.read()
+        writer.close()
+        await writer.wait_closed()
+
+    bodies = [b"\x88\x00", b"\x88\x01", b"\x88\x02"]
+    server, host, port = await _run_server(handler)
+    async with server:
+        async with AsyncDirectInjectClient(
+            host, port=port, expect_ack=True, background_reader=background_reader
+        ) as client:
+            assert await client.send_many(bodies) == [True, True, True]
+    assert received == bodies
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_subscriptions_and_buffered_frames() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    connections = 0
+    replayed: asyncio.Queue[bytes] = asyncio.Queue()
+
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        nonlocal connections
+        connections += 1
+        if connections == 1:
+            await _read_frame(reader)
+            writer.close()
+            await writer.wait_closed()
+            return
+        for _ in range(2):
+            await replayed.put(await _read_frame(reader))
+        writer.close()
+        await writer.wait_closed()
+
+    server, host, port = await _run_server(handler)
+    async with server:
+        client = AsyncDirectInjectClient(
+            host,
+            port=port,
+            background_reader=True,
+            reconnect=ReconnectPolicy(initial_delay=0.01),
+        )
+        async with client:
+            await client.subscribe_sv(target, rate_ms=50)
+            for _ in range(100):
+                if connections == 2 and client._reconnect_task is None:
+                    break
+                await asyncio.sleep(0.01)
+            assert client.connected
+            assert await client.set_sv(target, data=7) is True
+            frames = [
+                await asyncio.wait_for(replayed.get(), timeout=1.0) for _ in range(2)
+            ]
+            assert DirectInjectCodec.decode(frames[0])[0] == DiCommand.SUBSCRIBE_SV
+            assert frames[1] == DirectInjectCodec.encode(build_set_sv_body(target, 7))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("background_reader", [False, True])
+async def test_dropped_reply_does_not_poison_later_acks(
+    background_reader: bool,
+) -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    async with DeviceSimulator(port=0, drop_rate=1.0) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host,
+            port=port,
+            timeout=0.05,
+            expect_ack=True,
+            background_reader=background_reader,
+        ) as client:
+            with pytest.raises(AsyncDirectInjectError, match="Timed out"):
+                await client.set_sv(target, data=1)
+            simulator.drop_rate = 0.0
+            for value in range(3):
+                assert await client.set_sv(target, data=value) is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("background_reader", [False, True])
+async def test_late_reply_is_not_matched_to_next_send(background_reader: bool) -> None:
+    async with DeviceSimulator(port=0, latency=0.1) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host,
+            port=port,
+            timeout=0.05,
+            expect_ack=True,
+            background_reader=background_reader,
+        ) as client:
+            with pytest.raises(AsyncDirectInjectError, match="Timed out"):
+                await client.send_body(bytes([0x88]) + bytes(12))
+            await asyncio.sleep(0.1)
+            simulator.latency = 0.0
+            with pytest.raises(AsyncDirectInjectNakError):
+                await client.send_body(b"\x42\x00")
+
+
+@pytest.mark.asyncio
+async def test_timed_out_batch_does_not_leave_late_acks_behind() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    async with DeviceSimulator(port=0, latency=0.1) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host, port=port, timeout=0.05, expect_ack=True
+        ) as client:
+            with pytest.raises(AsyncDirectInjectError, match="Timed out"):
+                await client.send_many([build_set_sv_body(target, 1)] * 5)
+            await asyncio.sleep(0.1)
+            simulator.latency = 0.0
+            for _ in range(3):
+                with pytest.raises(AsyncDirectInjectNakError):
+                    await client.send_body(b"\x42\x00")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_ack_wait_is_not_matched_to_next_send() -> None:
+    async with DeviceSimulator(port=0, latency=0.05) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host, port=port, timeout=1.0, expect_ack=True
+        ) as client:
+            with pytest.raises(TimeoutError):
+                await asyncio.wait_for(
+                    client.send_body(bytes([0x88]) + bytes(12)), timeout=0.01
+                )
+            await asyncio.sleep(0.1)
+            simulator.latency = 0.0
+            with pytest.raises(AsyncDirectInjectNakError):
+                await client.send_body(b"\x42\x00")
+            with pytest.raises(TimeoutError):
+                await client.read_body(timeout=0.01)
+
+
+@pytest.mark.asyncio
+async def test_replayed_subscription_acks_are_not_matched_to_later_sends() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    simulator = DeviceSimulator(port=0)
+    await simulator.start()
+    host, port = simulator.address
+    async with AsyncDirectInjectClient(
+        host,
+        port=port,
+        expect_ack=True,
+        background_reader=True,
+        reconnect=ReconnectPolicy(initial_delay=0.01),
+    ) as client:
+        assert await client.subscribe_sv(target, rate_ms=1000) is True
+        await simulator.close()
+        async with DeviceSimulator(port=port):
+            for _ in range(200):
+                if client.connected and client._reconnect_task is None:
+                    break
+                await asyncio.sleep(0.01)
+            with pytest.raises(AsyncDirectInjectNakError):
+                await client.send_body(b"\x00")
+            assert await client.set_sv(target, data=1) is True
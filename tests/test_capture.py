@@ -0,0 +1,129 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from bss_direct_inject.async_client import AsyncDirectInjectClient
+from bss_direct_inject.capture import CaptureDirection, CaptureReader, WireCapture
+from bss_direct_inject.client import DirectInjectClient
+from bss_direct_inject.protocol import (
+    ACK,
+    DirectInjectCodec,
+    DiTarget,
+    build_set_sv_body,
+)
+from bss_direct_inject.protocol_client import AsyncDirectInjectProtocolClient
+from bss_direct_inject.replay import replay_capture
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGETS = [
+    DiTarget(node=1, virtual_device=3, object_id=0x000100 + index, state_variable=0)
+    for index in range(3)
+]
+
+
+class AckSocket:
+    def recv(self, size: int) -> bytes:
+        return bytes([ACK])
+
+    def sendall(self, data: bytes) -> None:
+        pass
+
+    def settimeout(self, timeout: float | None) -> None:
+        pass
+
+
+def test_records_round_trip_with_a_time_index(tmp_path: Path) -> None:
+    path = tmp_path / "show.dicap"
+    with WireCapture(path) as capture:
+        capture.record_send(b"\x02a\x03")
+        time.sleep(0.02)
+        capture.record_sends([b"\x02b\x03", b"\x02c\x03"])
+        capture.record_received(memoryview(b"\x06\x06"))
+    with CaptureReader(path) as reader:
+        assert len(reader) == 4
+        assert [record.data for record in reader] == [
+            b"\x02a\x03",
+            b"\x02b\x03",
+            b"\x02c\x03",
+            b"\x06\x06",
+        ]
+        assert reader[3].direction == CaptureDirection.RECEIVED
+        assert reader[0].timestamp < reader[1].timestamp == reader[2].timestamp
+        assert reader.duration >= 0.02
+        assert abs(reader.started_at - time.time()) < 60
+        later = list(reader.between(start=reader[1].timestamp))
+        assert [record.data for record in later][:1] == [b"\x02b\x03"]
+        sent = reader.between(direction=CaptureDirection.SENT, end=reader[1].timestamp)
+        assert [record.data for record in sent] == [b"\x02a\x03"]
+
+
+def test_appending_resumes_after_a_torn_record(tmp_path: Path) -> None:
+    path = tmp_path / "show.dicap"
+    with WireCapture(path) as capture:
+        capture.record_send(b"\x02a\x03")
+    with path.open("ab") as file:
+        file.write(b"\x00\x01")
+    with WireCapture(path) as capture:
+        assert capture.records == 1
+        capture.record_send(b"\x02b\x03")
+    with CaptureReader(path) as reader:
+        assert [record.data for record in reader] == [b"\x02a\x03", b"\x02b\x03"]
+        assert reader[0].timestamp <= reader[1].timestamp
+    (tmp_path / "other").write_bytes(b"not a capture")
+    with pytest.raises(ValueError):
+        CaptureReader(tmp_path / "other")
+
+
+def test_sync_client_captures_both_directions(tmp_path: Path) -> None:
+    path = tmp_path / "sync.dicap"
+    with WireCapture(path) as capture:
+        client = DirectInjectClient("127.0.0.1", expect_ack=True, capture=capture)
+        client._socket = AckSocket()  # type: ignore[assignment]
+        assert client.set_sv(TARGETS[0], data=5)
+    with CaptureReader(path) as reader:
+        assert [(record.direction, record.data) for record in reader] == [
+            (
+                CaptureDirection.SENT,
+                DirectInjectCodec.encode(build_set_sv_body(TARGETS[0], 5)),
+            ),
+            (CaptureDirection.RECEIVED, bytes([ACK])),
+        ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "client_type", [AsyncDirectInjectClient, AsyncDirectInjectProtocolClient]
+)
+async def test_capture_replays_against_a_stand_in_device(
+    tmp_path: Path, client_type: type[AsyncDirectInjectClient]
+) -> None:
+    path = tmp_path / "show.dicap"
+    with WireCapture(path) as capture:
+        async with DeviceSimulator(port=0) as simulator:
+            host, port = simulator.address
+            async with client_type(
+                host,
+                port=port,
+                expect_ack=True,
+                background_reader=True,
+                capture=capture,
+            ) as client:
+                for value, target in enumerate(TARGETS):
+                    await client.set_sv(target, data=value)
+                    await asyncio.sleep(0.02)
+    with CaptureReader(path) as reader:
+        directions = [record.direction for record in reader]
+        assert directions.count(CaptureDirection.SENT) == len(TARGETS)
+        assert directions.count(CaptureDirection.RECEIVED) >= 1
+        async with DeviceSimulator(port=0) as simulator:
+            host, port = simulator.address
+            stats = await replay_capture(reader, host, port=port, speed=2.0)
+            assert stats.frames == stats.acks == len(TARGETS)
+            assert stats.elapsed >= 0.015
+            assert [simulator.get(target) for target in TARGETS] == [0, 1, 2]
+            fast = await replay_capture(reader, host, port=port, speed=None)
+            assert fast.frames == fast.acks == len(TARGETS)
+        with pytest.raises(ValueError):
+            await replay_capture(reader, host, port=port, speed=0.0)
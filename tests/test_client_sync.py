@@ -1,4 +1,9 @@
+import asyncio
+import contextlib
 import socket
+import threading
+import time
+from collections.abc import Iterator
 from typing import cast
 
 import pytest
@@ -8,22 +13,38 @@ from bss_direct_inject.client import (
     DirectInjectError,
     DirectInjectNakError,
 )
-from bss_direct_inject.protocol import ACK, DirectInjectCodec
+from bss_direct_inject.protocol import (
+    ACK,
+    NAK,
+    DiCommand,
+    DirectInjectCodec,
+    DiTarget,
+    FrameDecoder,
+    build_set_sv_body,
+    build_subscribe_sv_body,
+)
+from bss_direct_inject.reconnect import ReconnectPolicy
+from bss_direct_inject.simulator import DeviceSimulator
 
 
 class FakeSocket:
     def __init__(self, data: bytes) -> None:
         self._buffer = bytearray(data)
+        self.writes: list[bytes] = []
 
     def recv(self, size: int) -> bytes:
         if not self._buffer:
-            return b""
+            raise TimeoutError("timed out")
         chunk = self._buffer[:size]
         del self._buffer[:size]
         return bytes(chunk)
 
     def sendall(self, data: bytes) -> None:
         self.sent = data
+        self.writes.append(data)
+
+    def setsockopt(self, level: int, option: int, value: int) -> None:
+        pass
 
     def settimeout(self, timeout: float) -> None:
         self.timeout = timeout
@@ -83,3 +104,324 @@ def test_read_body_decodes_frame() -> None:
     frame = DirectInjectCodec.encode(body)
     client._socket = FakeSocket(frame)  # type: ignore[assignment]
     assert client.read_body() == body
+
+
+def test_read_ack_keeps_frames_from_same_chunk() -> None:
+    client = DirectInjectClient("127.0.0.1")
+    body = b"\x88\x00"
+    frame = DirectInjectCodec.encode(body)
+    client._socket = FakeSocket(bytes([ACK]) + frame)  # type: ignore[assignment]
+    assert client._read_ack() is True
+    assert client.read_body() == body
+
+
+def test_pipelined_sends_resolve_in_fifo_order() -> None:
+    client = DirectInjectClient("127.0.0.1", ack_window=3)
+    client._socket = FakeSocket(bytes([ACK, 0x15, ACK]))  # type: ignore[assignment]
+    futures = [client.send_body_pipelined(b"\x88\x00") for _ in range(3)]
+    assert not any(future.done() for future in futures)
+    client.flush_acks()
+    assert futures[0].result() is True
+    with pytest.raises(DirectInjectNakError):
+        futures[1].result()
+    assert futures[2].result() is True
+
+
+def test_pipelined_send_times_out_per_message() -> None:
+    client = DirectInjectClient("127.0.0.1", timeout=0.01, ack_window=2)
+    client._socket = FakeSocket(b"")  # type: ignore[assignment]
+    future = client.send_body_pipelined(b"\x88\x00")
+    client.flush_acks()
+    with pytest.raises(DirectInjectError, match="Timed out"):
+        future.result()
+
+
+def test_send_many_coalesces_frames_into_one_write() -> None:
+    client = DirectInjectClient("127.0.0.1")
+    sock = FakeSocket(b"")
+    client._socket = sock  # type: ignore[assignment]
+    bodies = [b"\x88\x00", b"\x88\x01", b"\x88\x02"]
+    assert client.send_many(bodies, expect_ack=False) == [True, True, True]
+    assert sock.sent == b"".join(DirectInjectCodec.encode(body) for body in bodies)
+
+
+def test_send_many_reads_every_ack_before_raising_nak() -> None:
+    client = DirectInjectClient("127.0.0.1")
+    client._socket = FakeSocket(bytes([ACK, 0x15, ACK]))  # type: ignore[assignment]
+    with pytest.raises(DirectInjectNakError):
+        client.send_many([b"\x88\x00"] * 3, expect_ack=True)
+    assert not client._in_flight
+    assert not client._in_flight
+
+
+class DroppingSocket(FakeSocket):
+    def sendall(self, data: bytes) -> None:
+        raise ConnectionResetError("peer reset")
+
+
+def _connections(monkeypatch, *outcomes: FakeSocket | OSError) -> None:
+    pending = list(outcomes)
+
+    def create_connection(address, timeout):
+        outcome = pending.pop(0)
+        if isinstance(outcome, OSError):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(socket, "create_connection", create_connection)
+
+
+def test_reconnect_replays_subscriptions_and_buffered_frames(monkeypatch) -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    fresh = FakeSocket(b"")
+    _connections(monkeypatch, ConnectionRefusedError("refused"), fresh)
+    client = DirectInjectClient(
+        "127.0.0.1", reconnect=ReconnectPolicy(initial_delay=0.0, jitter=0.0)
+    )
+    client._socket = FakeSocket(b"")  # type: ignore[assignment]
+    client.subscribe_sv(target, rate_ms=50)
+    client._socket = DroppingSocket(b"")  # type: ignore[assignment]
+    assert client.set_sv(target, data=1) is False
+    assert not client.connected
+    assert client.set_sv(target, data=2) is True
+    assert fresh.writes == [
+        DirectInjectCodec.encode(build_subscribe_sv_body(target, 50))
+        + DirectInjectCodec.encode(build_set_sv_body(target, 1)),
+        DirectInjectCodec.encode(build_set_sv_body(target, 2)),
+    ]
+    assert client.subscriptions == {(DiCommand.SUBSCRIBE_SV, target): 50}
+
+
+def test_outage_buffer_is_bounded(monkeypatch) -> None:
+    _connections(monkeypatch, ConnectionRefusedError("refused"))
+    client = DirectInjectClient(
+        "127.0.0.1", reconnect=ReconnectPolicy(initial_delay=60.0, buffer_size=1)
+    )
+    client._socket = DroppingSocket(b"")  # type: ignore[assignment]
+    assert client.send_body(b"\x88\x00") is False
+    with pytest.raises(DirectInjectError, match="full"):
+        client.send_body(b"\x88\x01")
+    with pytest.raises(DirectInjectError, match="acknowledged"):
+        client.send_body(b"\x88\x02", expect_ack=True)
+
+
+def test_reconnect_gives_up_after_max_attempts(monkeypatch) -> None:
+    _connections(
+        monkeypatch, ConnectionRefusedError("refused"), ConnectionRefusedError("again")
+    )
+    client = DirectInjectClient(
+        "127.0.0.1",
+        reconnect=ReconnectPolicy(initial_delay=0.0, jitter=0.0, max_attempts=1),
+    )
+    with pytest.raises(DirectInjectError, match="Gave up"):
+        client.reconnect_now()
+
+
+class ReplyingDevice(threading.Thread):
+    def __init__(self, sock: socket.socket, replies: list[int | None]) -> None:
+        super().__init__(daemon=True)
+        self.sock = sock
+        self.replies = replies
+
+    def run(self) -> None:
+        decoder = FrameDecoder()
+        with contextlib.suppress(OSError):
+            while self.replies and (chunk := self.sock.recv(65536)):
+                for _ in decoder.feed(chunk):
+                    if not self.replies:
+                        return
+                    reply = self.replies.pop(0)
+                    if reply is not None:
+                        self.sock.sendall(bytes([reply]))
+
+
+def test_dropped_reply_does_not_poison_later_acks() -> None:
+    local, device = socket.socketpair()
+    local.settimeout(0.05)
+    ReplyingDevice(device, [None, ACK, ACK, ACK]).start()
+    client = DirectInjectClient("127.0.0.1", timeout=0.05, expect_ack=True)
+    client._socket = local
+    try:
+        with pytest.raises(DirectInjectError, match="Timed out"):
+            client.send_body(b"\x88\x00")
+        assert client.send_body(b"\x88\x01") is True
+        assert client.send_many([b"\x88\x02", b"\x88\x03"]) == [True, True]
+    finally:
+        client.close()
+        device.close()
+
+
+def test_late_reply_is_discarded_before_next_send() -> None:
+    local, device = socket.socketpair()
+    local.settimeout(0.05)
+    client = DirectInjectClient("127.0.0.1", timeout=0.05, expect_ack=True)
+    client._socket = local
+    try:
+        with pytest.raises(DirectInjectError, match="Timed out"):
+            client.send_body(b"\x88\x00")
+        device.sendall(bytes([ACK]))
+        ReplyingDevice(device, [None, NAK]).start()
+        with pytest.raises(DirectInjectNakError):
+            client.send_body(b"\x88\x01")
+    finally:
+        client.close()
+        device.close()
+
+
+class ClosedSocket(FakeSocket):
+    def recv(self, size: int) -> bytes:
+        return b""
+
+
+def test_device_eof_raises_instead_of_spinning() -> None:
+    client = DirectInjectClient("127.0.0.1", timeout=5.0)
+    client._socket = ClosedSocket(b"")  # type: ignore[assignment]
+    with pytest.raises(ConnectionResetError, match="closed by device"):
+        client.send_body(b"\x88\x00", expect_ack=True)
+
+
+class TricklingSocket(FakeSocket):
+    def recv(self, size: int) -> bytes:
+        time.sleep(0.01)
+        return bytes([ACK])
+
+
+def test_read_body_has_one_deadline_for_the_whole_read() -> None:
+    client = DirectInjectClient("127.0.0.1", timeout=5.0)
+    client._socket = TricklingSocket(b"")  # type: ignore[assignment]
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        client.read_body(timeout=0.05)
+    assert time.monotonic() - started < 1.0
+
+
+def test_bump_is_not_resent_after_connection_loss(monkeypatch) -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    fresh = FakeSocket(b"")
+    _connections(monkeypatch, fresh)
+    client = DirectInjectClient("127.0.0.1", reconnect=ReconnectPolicy())
+    client._socket = DroppingSocket(b"")  # type: ignore[assignment]
+    with pytest.raises(DirectInjectError, match="not resent"):
+        client.bump_sv_percent(target, 65536)
+    assert client.connected
+    assert fresh.writes == []
+    assert client.set_sv(target, data=1) is True
+
+
+@contextlib.contextmanager
+def _threaded_simulator(port: int = 0) -> Iterator[DeviceSimulator]:
+    loop = asyncio.new_event_loop()
+    simulator = DeviceSimulator(port=port)
+    loop.run_until_complete(simulator.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield simulator
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(simulator.close())
+        loop.close()
+
+
+def test_replayed_subscription_acks_are_not_matched_to_later_sends() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    with _threaded_simulator() as simulator:
+        host, port = simulator.address
+        client = DirectInjectClient(
+            host,
+            port=port,
+            expect_ack=True,
+            reconnect=ReconnectPolicy(initial_delay=0.01),
+        )
+        client.connect()
+        assert client.subscribe_sv(target, rate_ms=1000) is True
+    with _threaded_simulator(port):
+        with pytest.raises(DirectInjectNakError):
+            client.send_body(b"\x00")
+        assert client.set_sv(target, data=1) is True
+        client.close()
+
+
+def test_background_reader_shares_one_connection_between_threads() -> None:
+    targets = [
+        DiTarget(node=1, virtual_device=3, object_id=0x000100 + index, state_variable=0)
+        for index in range(8)
+    ]
+    with _threaded_simulator() as simulator:
+        host, port = simulator.address
+        with DirectInjectClient(
+            host, port=port, expect_ack=True, ack_window=4, background_reader=True
+        ) as client:
+
+            def worker(target: DiTarget) -> list[bool]:
+                return [client.set_sv(target, data=value) for value in range(50)]
+
+            threads = []
+            results: list[list[bool]] = []
+            for target in targets:
+                thread = threading.Thread(
+                    target=lambda target=target: results.append(worker(target))
+                )
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+            with pytest.raises(DirectInjectNakError):
+                client.send_body(b"\x00")
+            with pytest.raises(DirectInjectError, match="background"):
+                client.read_body()
+        assert results == [[True] * 50] * len(targets)
+        assert all(simulator.get(target) == 49 for target in targets)
+
+
+def test_background_reader_routes_notifications_and_expires_acks() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    with _threaded_simulator() as simulator:
+        host, port = simulator.address
+        simulator.set_value(target, 42)
+        with DirectInjectClient(
+            host, port=port, expect_ack=True, timeout=0.1, background_reader=True
+        ) as client:
+            updates = client.notification_queue(target, maxsize=1)
+            assert client.subscribe_sv(target, rate_ms=5) is True
+            assert updates.get(timeout=1.0).value == 42
+            simulator.drop_rate = 1.0
+            with pytest.raises(DirectInjectError, match="Timed out"):
+                client.set_sv(target, data=1)
+            simulator.drop_rate = 0.0
+            assert client.set_sv(target, data=2) is True
+            assert not client._in_flight
+
+
+def test_background_reader_reconnects_after_device_restart() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    with _threaded_simulator() as simulator:
+        host, port = simulator.address
+        client = DirectInjectClient(
+            host,
+            port=port,
+            expect_ack=True,
+            background_reader=True,
+            reconnect=ReconnectPolicy(initial_delay=0.01),
+        )
+        client.connect()
+        assert client.subscribe_sv(target, rate_ms=1000) is True
+    with _threaded_simulator(port):
+        for _ in range(100):
+            with contextlib.suppress(DirectInjectError):
+                if client.set_sv(target, data=1):
+                    break
+        assert client.set_sv(target, data=2) is True
+        assert client.subscriptions
+        client.close()
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+
+import pytest
+
+from bss_direct_inject.coalesce import (
+    PERCENT_MAX,
+    AsyncUpdateCoalescer,
+    UpdateCoalescer,
+)
+from bss_direct_inject.protocol import (
+    DiTarget,
+    build_bump_sv_percent_body,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+    parse_sv_notification_body,
+)
+
+FADER = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+OTHER = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000101, state_variable=0x0000
+)
+
+
+class RecordingClient:
+    def __init__(self) -> None:
+        self.batches: list[list[bytes]] = []
+
+    def send_many(self, bodies: list[bytes]) -> None:
+        self.batches.append(bodies)
+
+
+class AsyncRecordingClient:
+    def __init__(self) -> None:
+        self.batches: list[list[bytes]] = []
+
+    async def send_many(self, bodies: list[bytes]) -> None:
+        self.batches.append(bodies)
+
+
+def test_last_set_wins_per_target() -> None:
+    coalescer = UpdateCoalescer()
+    for value in range(10):
+        coalescer.set_sv(FADER, value)
+    coalescer.set_sv_percent(OTHER, 100)
+    assert coalescer.drain() == [
+        build_set_sv_body(FADER, 9),
+        build_set_sv_percent_body(OTHER, 100),
+    ]
+    assert len(coalescer) == 0
+
+
+def test_bumps_are_summed_and_folded_into_pending_set() -> None:
+    coalescer = UpdateCoalescer()
+    coalescer.bump_sv_percent(FADER, 65536)
+    coalescer.bump_sv_percent(FADER, -3 * 65536)
+    coalescer.set_sv_percent(OTHER, PERCENT_MAX - 65536)
+    coalescer.bump_sv_percent(OTHER, 2 * 65536)
+    assert coalescer.drain() == [
+        build_bump_sv_percent_body(FADER, -2 * 65536),
+        build_set_sv_percent_body(OTHER, PERCENT_MAX),
+    ]
+
+
+def test_set_discards_pending_bump_for_same_target() -> None:
+    coalescer = UpdateCoalescer()
+    coalescer.bump_sv_percent(FADER, 65536)
+    coalescer.set_sv_percent(FADER, 0)
+    assert coalescer.drain() == [build_set_sv_percent_body(FADER, 0)]
+
+
+def test_set_validates_value_range() -> None:
+    coalescer = UpdateCoalescer()
+    with pytest.raises(ValueError, match="32-bit"):
+        coalescer.set_sv(FADER, 2**31)
+
+
+def test_poll_respects_flush_rate() -> None:
+    client = RecordingClient()
+    coalescer = UpdateCoalescer(rate_hz=0.001)
+    coalescer.set_sv(FADER, 1)
+    assert coalescer.poll(client) == 1
+    coalescer.set_sv(FADER, 2)
+    assert coalescer.poll(client) == 0
+    assert client.batches == [[build_set_sv_body(FADER, 1)]]
+
+
+@pytest.mark.asyncio
+async def test_async_coalescer_sends_latest_state() -> None:
+    client = AsyncRecordingClient()
+    async with AsyncUpdateCoalescer(client, rate_hz=1000) as coalescer:
+        for value in range(100):
+            coalescer.set_sv_percent(FADER, value)
+        await asyncio.sleep(0.01)
+    assert client.batches == [[build_set_sv_percent_body(FADER, 99)]]
+
+
+@pytest.mark.asyncio
+async def test_async_coalescer_reports_send_errors_and_keeps_flushing() -> None:
+    class FlakyClient(AsyncRecordingClient):
+        async def send_many(self, bodies: list[bytes]) -> None:
+            if not self.batches:
+                self.batches.append([])
+                raise OSError("link down")
+            await super().send_many(bodies)
+
+    errors: list[dict] = []
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+    client = FlakyClient()
+    try:
+        async with AsyncUpdateCoalescer(client, rate_hz=1000) as coalescer:
+            coalescer.set_sv(FADER, 1)
+            await asyncio.sleep(0.01)
+            coalescer.set_sv(FADER, 2)
+            await asyncio.sleep(0.01)
+    finally:
+        loop.set_exception_handler(None)
+    assert [context["message"] for context in errors] == ["Coalesced flush failed."]
+    assert isinstance(errors[0]["exception"], OSError)
+    assert client.batches == [[], [build_set_sv_body(FADER, 2)]]
+
+
+def test_drain_while_other_threads_set_values() -> None:
+    coalescer = UpdateCoalescer()
+    targets = [
+        DiTarget(node=1, virtual_device=3, object_id=0x000200 + index, state_variable=0)
+        for index in range(4)
+    ]
+    drained: list[bytes] = []
+    done = threading.Event()
+
+    def produce(target: DiTarget) -> None:
+        for value in range(5000):
+            coalescer.set_sv(target, value)
+
+    def consume() -> None:
+        while not done.is_set():
+            drained.extend(coalescer.drain())
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    producers = [threading.Thread(target=produce, args=(t,)) for t in targets]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    done.set()
+    consumer.join()
+    drained.extend(coalescer.drain())
+    latest = {}
+    for body in drained:
+        notification = parse_sv_notification_body(body)
+        latest[notification.target] = notification.value
+    assert latest == dict.fromkeys(targets, 4999)
@@ -0,0 +1,124 @@
+import asyncio
+import socket
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pytest
+
+from bss_direct_inject.client import DirectInjectError, DirectInjectNakError
+from bss_direct_inject.engine import DirectInjectEngine, EngineDevice
+from bss_direct_inject.metrics import ClientMetrics
+from bss_direct_inject.protocol import DiNotification, DiTarget
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+
+
+@contextmanager
+def _threaded_simulators(*simulators: DeviceSimulator) -> Iterator[None]:
+    loop = asyncio.new_event_loop()
+    for simulator in simulators:
+        loop.run_until_complete(simulator.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        for simulator in simulators:
+            loop.run_until_complete(simulator.close())
+        loop.close()
+
+
+def test_one_thread_drives_acknowledged_sends_to_many_devices() -> None:
+    simulators = [DeviceSimulator(port=0) for _ in range(6)]
+    metrics = ClientMetrics()
+    with (
+        _threaded_simulators(*simulators),
+        DirectInjectEngine(expect_ack=True, metrics=metrics) as engine,
+    ):
+        devices = [engine.add_device(*simulator.address) for simulator in simulators]
+        # Sends made before the connection is up are queued behind it.
+        futures = [
+            device.set_sv(TARGET, data=index * 100 + value)
+            for index, device in enumerate(devices)
+            for value in range(20)
+        ]
+        nak = devices[0].send_body(b"\x00")
+        engine.run(lambda: all(future.done() for future in [*futures, nak]), 5.0)
+        assert all(future.result() for future in futures)
+        with pytest.raises(DirectInjectNakError):
+            nak.result()
+        assert all(device.connected for device in devices)
+    assert [simulator.get(TARGET) for simulator in simulators] == [
+        index * 100 + 19 for index in range(6)
+    ]
+    assert metrics.acks == 120
+    assert all(device.closed for device in devices)
+
+
+def test_notifications_reach_device_handlers() -> None:
+    simulator = DeviceSimulator(port=0, meters=frozenset({TARGET}))
+    simulator.set_value(TARGET, -50000)
+    received: list[DiNotification] = []
+    with _threaded_simulators(simulator), DirectInjectEngine() as engine:
+        device = engine.add_device(*simulator.address)
+        device.add_handler(TARGET, received.append)
+        device.subscribe_sv(TARGET, rate_ms=5)
+        engine.run(lambda: len(received) >= 3, 5.0)
+    assert {notification.value for notification in received} == {-50000}
+
+
+def test_ack_timeouts_and_timers_come_from_the_deadline_heap() -> None:
+    simulator = DeviceSimulator(port=0, drop_rate=1.0)
+    order: list[str] = []
+    with (
+        _threaded_simulators(simulator),
+        DirectInjectEngine(timeout=0.05, expect_ack=True) as engine,
+    ):
+        device = engine.add_device(*simulator.address)
+        engine.call_later(0.02, lambda: order.append("second"))
+        engine.call_later(0.01, lambda: order.append("first"))
+        engine.call_later(0.0, lambda: order.append("cancelled")).cancel()
+        future = device.set_sv(TARGET, data=1)
+        engine.run(future.done, 5.0)
+        with pytest.raises(DirectInjectError, match="Timed out"):
+            future.result()
+        assert device.connected
+        assert device.in_flight == 0
+    assert order == ["first", "second"]
+
+
+def test_lost_connections_fail_in_flight_sends_and_notify() -> None:
+    listener = socket.create_server(("127.0.0.1", 0))
+    closed: list[tuple[EngineDevice, DirectInjectError]] = []
+    with listener, DirectInjectEngine(timeout=5.0, expect_ack=True) as engine:
+        device = engine.add_device(
+            *listener.getsockname(),
+            on_close=lambda device, error: closed.append((device, error)),
+        )
+        engine.run(lambda: device.connected, 5.0)
+        future = device.set_sv(TARGET, data=1)
+        peer, _ = listener.accept()
+        engine.run(lambda: device.pending_bytes == 0, 5.0)
+        assert peer.recv(64)
+        peer.close()
+        engine.run(future.done, 5.0)
+    with pytest.raises(DirectInjectError, match="closed by device"):
+        future.result()
+    assert closed == [(device, device.error)]
+    assert engine.devices == []
+    with pytest.raises(DirectInjectError):
+        device.set_sv(TARGET, data=2)
+
+
+def test_run_until_complete_times_out() -> None:
+    with DirectInjectEngine() as engine:
+        engine.call_later(10.0, lambda: None)
+        with pytest.raises(TimeoutError):
+            engine.run_until_complete(Future(), timeout=0.01)
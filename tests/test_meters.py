@@ -0,0 +1,92 @@
+import asyncio
+import math
+
+import pytest
+
+from bss_direct_inject.async_client import AsyncDirectInjectClient
+from bss_direct_inject.meters import MeterBank, MeterRing
+from bss_direct_inject.protocol import (
+    DiCommand,
+    DiNotification,
+    DiTarget,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+)
+from bss_direct_inject.simulator import DeviceSimulator
+
+METER = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000200, state_variable=0x0000
+)
+OTHER = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000201, state_variable=0x0000
+)
+
+
+def test_ring_views_are_chronological_and_zero_copy() -> None:
+    ring = MeterRing(capacity=4)
+    assert ring.latest() is None
+    assert [list(view) for view in ring.views()] == [[], []]
+    for raw in range(1, 7):
+        ring.append(raw, 0.0)
+    older, newer = ring.views()
+    assert list(older) + list(newer) == [3, 4, 5, 6]
+    assert [list(view) for view in ring.views(3)] == [[4], [5, 6]]
+    assert ring.latest() == 6
+    assert len(ring) == 4
+    ring.append(7, 0.0)
+    assert older[0] == 7
+
+
+def test_ingest_batches_tracked_meter_bodies() -> None:
+    bank = MeterBank(capacity=8, clock=lambda: 5.0)
+    bank.track(METER)
+    bodies = [
+        build_set_sv_body(METER, -100000),
+        build_set_sv_body(OTHER, 0),
+        build_set_sv_percent_body(METER, 0),
+        b"\x06",
+        build_set_sv_body(METER, 0),
+    ]
+    assert bank.ingest(bodies) == 2
+    assert bank.latest(METER) == 0
+    assert bank.latest_db(METER) == 0.0
+    assert bank.track(METER).updated_at == 5.0
+    assert OTHER not in bank
+    bank.update(DiNotification(DiCommand.SET_SV, METER, 50000))
+    assert [list(view) for view in bank.history(METER)] == [[-100000, 0, 50000], []]
+
+
+def test_peak_and_rms_windows() -> None:
+    bank = MeterBank()
+    bank.track(METER)
+    bank.track(OTHER)
+    bank.ingest(build_set_sv_body(METER, raw) for raw in (-200000, 0, -100000))
+    assert bank.peak(METER) == 0.0
+    assert bank.peak(METER, window=1) == -10.0
+    assert bank.rms(METER, window=1) == pytest.approx(-10.0)
+    assert bank.rms(METER, window=2) == pytest.approx(10 * math.log10(1.1 / 2))
+    assert bank.peaks() == {METER: 0.0}
+    assert bank.rms(OTHER) is None
+    bank.untrack(OTHER)
+    assert bank.targets() == [METER]
+
+
+@pytest.mark.asyncio
+async def test_attach_fills_rings_from_simulator_meters() -> None:
+    bank = MeterBank()
+    bank.track(METER)
+    async with DeviceSimulator(port=0, meters=frozenset({METER})) as simulator:
+        simulator.set_value(METER, -60000)
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host, port=port, background_reader=True
+        ) as client:
+            bank.attach(client)
+            await client.subscribe_sv(METER, rate_ms=5)
+            for _ in range(100):
+                if len(bank.track(METER)) >= 3:
+                    break
+                await asyncio.sleep(0.01)
+            bank.detach(client)
+    assert len(bank.track(METER)) >= 3
+    assert bank.peak(METER) == -6.0
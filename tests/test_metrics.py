@@ -0,0 +1,116 @@
+import socket
+import threading
+
+import pytest
+
+from bss_direct_inject.async_client import (
+    AsyncDirectInjectClient,
+    AsyncDirectInjectNakError,
+)
+from bss_direct_inject.client import DirectInjectClient, DirectInjectError
+from bss_direct_inject.metrics import ClientMetrics
+from bss_direct_inject.protocol import (
+    ACK,
+    NAK,
+    DiCommand,
+    DirectInjectCodec,
+    DiTarget,
+    build_set_sv_body,
+)
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+
+
+def test_records_from_many_threads_are_not_lost() -> None:
+    metrics = ClientMetrics()
+    frame = DirectInjectCodec.encode(build_set_sv_body(TARGET, 0))
+
+    def record() -> None:
+        for _ in range(2000):
+            metrics.record_send(frame)
+            metrics.record_ack(0.001)
+            metrics.to_dict()
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.sends == {DiCommand.SET_SV: 8000}
+    assert metrics.bytes_out == 8000 * len(frame)
+    assert metrics.latency_histogram()[-1] == (float("inf"), 8000)
+
+
+def test_latency_histogram_is_cumulative() -> None:
+    metrics = ClientMetrics(latency_buckets=(0.001, 0.01))
+    metrics.record_ack(0.0005)
+    metrics.record_ack(0.001)
+    metrics.record_nak(0.005)
+    metrics.record_ack(2.0)
+    assert metrics.latency_histogram() == [(0.001, 2), (0.01, 3), (float("inf"), 4)]
+    assert metrics.to_dict()["ack_latency"]["count"] == 4
+
+
+def test_prometheus_export() -> None:
+    metrics = ClientMetrics(latency_buckets=(0.01,))
+    frame = DirectInjectCodec.encode(build_set_sv_body(TARGET, 1))
+    metrics.record_send(frame)
+    metrics.record_notification(DiCommand.SET_SV_PERCENT)
+    metrics.record_ack(0.002)
+    text = metrics.to_prometheus(prefix="di")
+    assert 'di_sends_total{command="SET_SV"} 1' in text
+    assert f"di_bytes_out_total {len(frame)}" in text
+    assert 'di_notifications_total{command="SET_SV_PERCENT"} 1' in text
+    assert 'di_ack_latency_seconds_bucket{le="0.01"} 1' in text
+    assert 'di_ack_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "di_ack_latency_seconds_count 1" in text
+    metrics.reset()
+    assert metrics.to_dict()["sends"] == {}
+
+
+def test_sync_client_records_sends_acks_and_timeouts() -> None:
+    metrics = ClientMetrics()
+    local, device = socket.socketpair()
+    client = DirectInjectClient(
+        "127.0.0.1", timeout=0.05, expect_ack=True, metrics=metrics
+    )
+    local.settimeout(0.05)
+    client._socket = local
+    try:
+        device.sendall(bytes([ACK, NAK]))
+        assert client.set_sv(TARGET, data=1) is True
+        with pytest.raises(DirectInjectError, match="NAK"):
+            client.set_sv_percent(TARGET, 0)
+        with pytest.raises(DirectInjectError, match="Timed out"):
+            client.set_sv(TARGET, data=2)
+    finally:
+        client.close()
+        device.close()
+    assert metrics.sends == {DiCommand.SET_SV: 2, DiCommand.SET_SV_PERCENT: 1}
+    assert (metrics.acks, metrics.naks, metrics.timeouts) == (1, 1, 1)
+    assert metrics.bytes_in == 2
+
+
+@pytest.mark.asyncio
+async def test_async_client_records_pipelined_acks() -> None:
+    metrics = ClientMetrics()
+    async with DeviceSimulator(port=0) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host,
+            port=port,
+            expect_ack=True,
+            background_reader=True,
+            ack_window=8,
+            metrics=metrics,
+        ) as client:
+            await client.send_many([build_set_sv_body(TARGET, n) for n in range(5)])
+            with pytest.raises(AsyncDirectInjectNakError):
+                await client.send_body(b"\x42\x00")
+    assert metrics.sends == {DiCommand.SET_SV: 5, 0x42: 1}
+    assert (metrics.acks, metrics.naks, metrics.timeouts) == (5, 1, 0)
+    assert metrics.bytes_in == 6
+    assert metrics.to_dict()["sends"] == {"SET_SV": 5, "0x42": 1}
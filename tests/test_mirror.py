@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from bss_direct_inject.async_client import AsyncDirectInjectClient
+from bss_direct_inject.mirror import SvMirror
+from bss_direct_inject.protocol import (
+    DiCommand,
+    DiNotification,
+    DirectInjectCodec,
+    DiTarget,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+)
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_returns_latest_value_per_command() -> None:
+    mirror = SvMirror()
+    mirror.update(DiNotification(DiCommand.SET_SV, TARGET, 10))
+    mirror.update(DiNotification(DiCommand.SET_SV, TARGET, -20))
+    mirror.update(DiNotification(DiCommand.SET_SV_PERCENT, TARGET, 65536))
+    assert mirror.get(TARGET) == -20
+    assert mirror.get_percent(TARGET) == 65536
+    assert TARGET in mirror
+    assert len(mirror) == 1
+    other = DiTarget(node=2, virtual_device=0, object_id=0, state_variable=0)
+    assert mirror.get(other) is None
+    assert mirror.get(other, default=0) == 0
+
+
+def test_update_body_ignores_non_notifications() -> None:
+    mirror = SvMirror()
+    assert mirror.update_body(build_set_sv_percent_body(TARGET, 5)) is True
+    assert mirror.update_body(b"\x06") is False
+    assert mirror.get_percent(TARGET) == 5
+    assert mirror.get(TARGET) is None
+
+
+def test_ttl_marks_values_stale() -> None:
+    clock = Clock()
+    mirror = SvMirror(ttl=1.0, clock=clock)
+    assert mirror.is_stale(TARGET)
+    mirror.update(DiNotification(DiCommand.SET_SV, TARGET, 3))
+    clock.now += 0.5
+    assert mirror.get(TARGET) == 3
+    assert mirror.age(TARGET) == pytest.approx(0.5)
+    assert not mirror.is_stale(TARGET)
+    clock.now += 1.0
+    assert mirror.get(TARGET) is None
+    assert mirror.sample(TARGET) is not None
+    assert mirror.sample(TARGET).value == 3
+    assert mirror.stale_targets() == [TARGET]
+    mirror.forget(TARGET)
+    assert TARGET not in mirror
+
+
+@pytest.mark.asyncio
+async def test_attach_follows_background_reader() -> None:
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        writer.write(DirectInjectCodec.encode(build_set_sv_body(TARGET, 42)))
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    mirror = SvMirror()
+    async with server:
+        async with AsyncDirectInjectClient(
+            host, port=port, background_reader=True
+        ) as client:
+            mirror.attach(client)
+            for _ in range(100):
+                if TARGET in mirror:
+                    break
+                await asyncio.sleep(0.01)
+            mirror.detach(client)
+            assert mirror.get(TARGET) == 42
+            assert client._handlers == {}
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+
+from bss_direct_inject.async_client import AsyncDirectInjectClient
+from bss_direct_inject.client import DirectInjectClient, DirectInjectNakError
+from bss_direct_inject.pacing import AdaptivePacer
+from bss_direct_inject.protocol import NAK, DiTarget, build_set_sv_body
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class NakSocket:
+    def recv(self, size: int) -> bytes:
+        return bytes([NAK])
+
+    def sendall(self, data: bytes) -> None:
+        pass
+
+    def settimeout(self, timeout: float | None) -> None:
+        pass
+
+
+def test_token_bucket_admits_a_burst_then_spaces_messages() -> None:
+    clock = FakeClock()
+    pacer = AdaptivePacer(rate=10.0, burst=2.0, clock=clock)
+    assert [pacer.reserve() for _ in range(4)] == pytest.approx([0, 0, 0.1, 0.2])
+    clock.now = 0.3
+    assert pacer.reserve() == 0.0
+    assert pacer.reserve(5) == pytest.approx(0.5)
+
+
+def test_rate_grows_on_fast_acks_and_halves_on_congestion() -> None:
+    clock = FakeClock()
+    pacer = AdaptivePacer(rate=100.0, increase=50.0, target_latency=0.05, clock=clock)
+    for _ in range(10):
+        pacer.record_ack(0.001)
+    assert pacer.rate == 110.0
+    pacer.record_nak()
+    pacer.record_timeout()
+    assert pacer.rate == 55.0
+    assert pacer.backoffs == 1
+    pacer.record_ack(0.001)
+    assert pacer.rate == pytest.approx(55.0 + 50.0 / 55.0)
+    clock.now = 1.0
+    pacer.record_ack(0.2)
+    assert pacer.rate == pytest.approx((55.0 + 50.0 / 55.0) / 2)
+    for _ in range(3):
+        clock.now += 1.0
+        pacer.record_nak()
+    assert pacer.rate == pacer.min_rate
+
+
+def test_one_slow_round_trip_backs_off_once() -> None:
+    clock = FakeClock()
+    pacer = AdaptivePacer(rate=1000.0, max_rate=1000.0, clock=clock)
+    for _ in range(10):
+        pacer.record_ack(0.01)
+    clock.now = 1.0
+    # Every message in flight during the slow round trip reports it.
+    for _ in range(30):
+        pacer.record_ack(0.3)
+        clock.now += 0.01
+    assert pacer.backoffs == 1
+    assert pacer.rate == 500.0
+
+
+def test_slow_link_is_not_mistaken_for_congestion() -> None:
+    clock = FakeClock()
+    pacer = AdaptivePacer(rate=100.0, target_latency=0.05, clock=clock)
+    for _ in range(100):
+        clock.now += 0.01
+        pacer.record_ack(0.06)
+    assert pacer.backoffs == 0
+    assert pacer.rate == 200.0
+    assert pacer.base_rtt == 0.06
+    clock.now += 25.0
+    pacer.record_ack(0.2)
+    pacer.record_ack(0.2)
+    assert pacer.backoffs == 1
+    clock.now += 25.0
+    pacer.record_ack(0.2)
+    assert pacer.base_rtt == 0.2
+    assert pacer.backoffs == 1
+
+
+def test_pacer_validates_its_bounds() -> None:
+    with pytest.raises(ValueError):
+        AdaptivePacer(min_rate=0.0)
+    with pytest.raises(ValueError):
+        AdaptivePacer(decrease=1.0)
+    assert AdaptivePacer(rate=1e9, max_rate=500.0).rate == 500.0
+
+
+def test_sync_client_backs_off_on_nak() -> None:
+    pacer = AdaptivePacer(rate=100.0)
+    client = DirectInjectClient("127.0.0.1", expect_ack=True, pacer=pacer)
+    client._socket = NakSocket()  # type: ignore[assignment]
+    with pytest.raises(DirectInjectNakError):
+        client.set_sv(TARGET, data=0)
+    assert pacer.rate == 50.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("background_reader", [False, True])
+async def test_async_client_paces_bulk_sends(background_reader: bool) -> None:
+    pacer = AdaptivePacer(rate=50.0, burst=1.0)
+    async with DeviceSimulator(port=0) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host,
+            port=port,
+            expect_ack=True,
+            background_reader=background_reader,
+            pacer=pacer,
+        ) as client:
+            await client.set_sv(TARGET, data=0)
+            started = time.monotonic()
+            await client.send_many([build_set_sv_body(TARGET, 1)] * 4)
+            assert time.monotonic() - started >= 0.07
+    assert pacer.rate == 55.0
+
+
+@pytest.mark.asyncio
+async def test_send_cancelled_while_pacing_does_not_leak_an_ack_slot() -> None:
+    async with DeviceSimulator(port=0) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host,
+            port=port,
+            expect_ack=True,
+            background_reader=True,
+            ack_window=2,
+            pacer=AdaptivePacer(rate=10.0, burst=0.0),
+        ) as client:
+            for _ in range(2):
+                with pytest.raises(TimeoutError):
+                    await asyncio.wait_for(client.set_sv(TARGET, data=0), 0.01)
+            client.pacer = None
+            assert await asyncio.wait_for(client.set_sv(TARGET, data=1), 1.0)
@@ -0,0 +1,197 @@
+import asyncio
+
+import pytest
+
+from bss_direct_inject.async_client import AsyncDirectInjectError
+from bss_direct_inject.pool import AsyncDirectInjectPool
+from bss_direct_inject.protocol import (
+    ACK,
+    DirectInjectCodec,
+    DiTarget,
+    build_venue_preset_recall_body,
+)
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    return await reader.readuntil(b"\x03")
+
+
+async def _start_device(received: list[bytes]) -> tuple[asyncio.Server, int]:
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                frame = await _read_frame(reader)
+                received.append(DirectInjectCodec.decode(frame))
+                writer.write(bytes([ACK]))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        writer.close()
+
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_recalls_preset_on_every_device() -> None:
+    received: list[list[bytes]] = [[], []]
+    first, first_port = await _start_device(received[0])
+    second, second_port = await _start_device(received[1])
+    devices = [("127.0.0.1", first_port), ("127.0.0.1", second_port)]
+    async with first, second, AsyncDirectInjectPool(expect_ack=True) as pool:
+        results = await pool.venue_preset_recall_all(4, devices)
+        assert results == {devices[0]: True, devices[1]: True}
+        assert sorted(pool.connected) == sorted(devices)
+        assert await pool.param_preset_recall_all(2) == {
+            devices[0]: True,
+            devices[1]: True,
+        }
+    assert received[0][0] == build_venue_preset_recall_body(4)
+    assert received[1][0] == build_venue_preset_recall_body(4)
+    assert len(received[0]) == len(received[1]) == 2
+
+
+@pytest.mark.asyncio
+async def test_fan_out_reports_failures_per_device() -> None:
+    received: list[bytes] = []
+    server, port = await _start_device(received)
+    probe = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+    unused_port = probe.sockets[0].getsockname()[1]
+    probe.close()
+    await probe.wait_closed()
+    async with server, AsyncDirectInjectPool(timeout=0.5) as pool:
+        results = await pool.venue_preset_recall_all(
+            1, [("127.0.0.1", port), ("127.0.0.1", unused_port)]
+        )
+    assert results[("127.0.0.1", port)] is True
+    assert isinstance(results[("127.0.0.1", unused_port)], OSError)
+
+
+@pytest.mark.asyncio
+async def test_per_device_cap_serializes_operations() -> None:
+    received: list[bytes] = []
+    server, port = await _start_device(received)
+    active = 0
+    peak = 0
+
+    async def operation(client) -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        await client.venue_preset_recall(1)
+        active -= 1
+
+    async with server, AsyncDirectInjectPool(max_per_device=1) as pool:
+        await asyncio.gather(
+            *(pool.run(("127.0.0.1", port), operation) for _ in range(4))
+        )
+    assert peak == 1
+    assert len(received) == 4
+
+
+@pytest.mark.asyncio
+async def test_close_idle_disconnects_unused_devices() -> None:
+    received: list[bytes] = []
+    server, port = await _start_device(received)
+    async with server, AsyncDirectInjectPool(idle_timeout=0.01) as pool:
+        await pool.run(
+            ("127.0.0.1", port), lambda client: client.venue_preset_recall(1)
+        )
+        await asyncio.sleep(0.05)
+        assert pool.connected == []
+        await pool.run(
+            ("127.0.0.1", port), lambda client: client.venue_preset_recall(2)
+        )
+        assert pool.connected == [("127.0.0.1", port)]
+
+
+@pytest.mark.asyncio
+async def test_queued_calls_on_busy_device_do_not_block_idle_devices() -> None:
+    received: list[bytes] = []
+    first, first_port = await _start_device(received)
+    second, second_port = await _start_device(received)
+    busy, idle = ("127.0.0.1", first_port), ("127.0.0.1", second_port)
+
+    async def slow(client) -> None:
+        await asyncio.sleep(0.2)
+
+    async def fast(client) -> None:
+        return None
+
+    async with first, second, AsyncDirectInjectPool(max_total=2) as pool:
+        queued = [asyncio.create_task(pool.run(busy, slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        started = asyncio.get_running_loop().time()
+        await pool.run(idle, fast)
+        assert asyncio.get_running_loop().time() - started < 0.1
+        await asyncio.gather(*queued)
+
+
+@pytest.mark.asyncio
+async def test_close_idle_skips_devices_acquired_while_closing() -> None:
+    received: list[bytes] = []
+    first, first_port = await _start_device(received)
+    second, second_port = await _start_device(received)
+    devices = [("127.0.0.1", first_port), ("127.0.0.1", second_port)]
+    async with first, second, AsyncDirectInjectPool(idle_timeout=0) as pool:
+        await pool.send_body_all(build_venue_preset_recall_body(1), devices)
+        closing = asyncio.create_task(pool.close_idle())
+        await asyncio.sleep(0)
+        async with pool.acquire(devices[1]) as client:
+            await asyncio.sleep(0.05)
+            assert client.connected
+        assert await closing == 1
+        assert pool.connected == [devices[1]]
+
+
+@pytest.mark.asyncio
+async def test_timeout_does_not_close_a_shared_connection() -> None:
+    async with DeviceSimulator(port=0, latency=0.05) as simulator:
+        device = simulator.address
+        async with AsyncDirectInjectPool(expect_ack=True, max_per_device=2) as pool:
+
+            async def time_out() -> None:
+                async with pool.acquire(device):
+                    await asyncio.sleep(0.01)
+                    raise AsyncDirectInjectError("Timed out waiting for ACK/NAK.")
+
+            waiting = asyncio.create_task(
+                pool.run(device, lambda client: client.set_sv(TARGET, data=1))
+            )
+            with pytest.raises(AsyncDirectInjectError):
+                await time_out()
+            assert await waiting is True
+            assert pool.connected == [device]
+
+
+@pytest.mark.asyncio
+async def test_lost_connection_is_dropped() -> None:
+    async def hang_up(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        await _read_frame(reader)
+        writer.close()
+
+    server = await asyncio.start_server(hang_up, "127.0.0.1", 0)
+    device = ("127.0.0.1", server.sockets[0].getsockname()[1])
+    async with server, AsyncDirectInjectPool(expect_ack=True) as pool:
+        with pytest.raises(AsyncDirectInjectError):
+            await pool.run(device, lambda client: client.set_sv(TARGET, data=1))
+        assert pool.connected == []
+
+
+def test_shared_connections_require_background_reader() -> None:
+    pool = AsyncDirectInjectPool(max_per_device=2)
+    assert pool.client_options == {"background_reader": True}
+    with pytest.raises(ValueError, match="background_reader"):
+        AsyncDirectInjectPool(
+            max_per_device=2, client_options={"background_reader": False}
+        )
@@ -1,7 +1,14 @@
 import pytest
 
 from bss_direct_inject.protocol import (
+    ACK,
+    BODY_LAYOUTS,
+    ESC,
+    NAK,
+    STX,
     DiCommand,
+    DiNotification,
+    DirectInjectCodec,
     DiTarget,
     build_bump_sv_percent_body,
     build_param_preset_recall_body,
@@ -9,8 +16,13 @@ from bss_direct_inject.protocol import (
     build_set_sv_body,
     build_set_sv_percent_body,
     build_subscribe_sv_body,
+    build_subscribe_sv_percent_body,
     build_unsubscribe_sv_body,
+    build_unsubscribe_sv_percent_body,
     build_venue_preset_recall_body,
+    compile_target,
+    pack_body_into,
+    parse_sv_notification_body,
 )
 
 
@@ -120,3 +132,107 @@ def test_set_sv_rejects_out_of_range_data() -> None:
     )
     with pytest.raises(ValueError, match="32-bit"):
         build_set_sv_body(target, data=2**31)
+
+
+def test_target_bytes_roundtrip() -> None:
+    target = DiTarget(
+        node=0x1234, virtual_device=0x03, object_id=0x00ABCD, state_variable=0x0F0E
+    )
+    assert DiTarget.from_bytes(target.to_bytes()) == target
+
+
+def test_parse_sv_notification_body() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    body = build_set_sv_percent_body(target, percent_scaled=-65536)
+    assert parse_sv_notification_body(body) == DiNotification(
+        command=DiCommand.SET_SV_PERCENT, target=target, value=-65536
+    )
+    with pytest.raises(ValueError, match="SET_SV"):
+        parse_sv_notification_body(build_subscribe_sv_body(target, rate_ms=50))
+
+
+@pytest.mark.parametrize(
+    "target",
+    [
+        DiTarget(
+            node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+        ),
+        DiTarget(
+            node=0x0203,
+            virtual_device=ESC,
+            object_id=ACK << 16 | NAK,
+            state_variable=STX,
+        ),
+    ],
+)
+@pytest.mark.parametrize("value", [0, 1, 50, 0x1B1B1B1B, 2**31 - 1])
+def test_compiled_target_frames_match_codec(target: DiTarget, value: int) -> None:
+    compiled = compile_target(target)
+    cases = [
+        (DiCommand.SET_SV, -value, build_set_sv_body(target, -value)),
+        (DiCommand.SUBSCRIBE_SV, value, build_subscribe_sv_body(target, value)),
+        (DiCommand.UNSUBSCRIBE_SV, 0, build_unsubscribe_sv_body(target)),
+        (DiCommand.SET_SV_PERCENT, value, build_set_sv_percent_body(target, value)),
+        (
+            DiCommand.SUBSCRIBE_SV_PERCENT,
+            value,
+            build_subscribe_sv_percent_body(target, value),
+        ),
+        (
+            DiCommand.UNSUBSCRIBE_SV_PERCENT,
+            0,
+            build_unsubscribe_sv_percent_body(target),
+        ),
+        (
+            DiCommand.BUMP_SV_PERCENT,
+            -value,
+            build_bump_sv_percent_body(target, -value),
+        ),
+    ]
+    for command, data, body in cases:
+        assert compiled.encode(command, data) == DirectInjectCodec.encode(body)
+
+
+def test_compiled_target_is_cached_and_validates() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+    )
+    assert compile_target(target) is compile_target(
+        DiTarget(
+            node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+        )
+    )
+    with pytest.raises(ValueError, match="32-bit"):
+        compile_target(target).encode(DiCommand.SUBSCRIBE_SV, -1)
+    with pytest.raises(ValueError, match="VENUE_PRESET_RECALL"):
+        compile_target(target).encode(DiCommand.VENUE_PRESET_RECALL, 1)
+
+
+def test_pack_body_into_matches_builders() -> None:
+    target = DiTarget(
+        node=0x0001, virtual_device=0x03, object_id=0x00ABCD, state_variable=0x0002
+    )
+    expected = [
+        build_set_sv_body(target, -5),
+        build_subscribe_sv_body(target, 50),
+        build_venue_preset_recall_body(3),
+    ]
+    buffer = bytearray(sum(len(body) for body in expected))
+    offset = pack_body_into(buffer, 0, DiCommand.SET_SV, target, -5)
+    offset = pack_body_into(buffer, offset, DiCommand.SUBSCRIBE_SV, target, 50)
+    offset = pack_body_into(buffer, offset, DiCommand.VENUE_PRESET_RECALL, None, 3)
+    assert offset == len(buffer)
+    assert bytes(buffer) == b"".join(expected)
+    assert all(BODY_LAYOUTS[DiCommand(body[0])].size == len(body) for body in expected)
+
+
+def test_pack_body_into_rejects_unsupported_layouts() -> None:
+    buffer = bytearray(64)
+    with pytest.raises(ValueError, match="requires a target"):
+        pack_body_into(buffer, 0, DiCommand.SET_SV, None, 0)
+    with pytest.raises(ValueError, match="variable-length"):
+        pack_body_into(buffer, 0, DiCommand.SET_STRING_SV, None, 0)
+    with pytest.raises(ValueError, match="unsigned 32-bit"):
+        pack_body_into(buffer, 0, DiCommand.PARAM_PRESET_RECALL, None, -1)
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from bss_direct_inject.async_client import (
+    AsyncDirectInjectError,
+    AsyncDirectInjectNakError,
+)
+from bss_direct_inject.metrics import ClientMetrics
+from bss_direct_inject.protocol import (
+    DirectInjectCodec,
+    DiTarget,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+)
+from bss_direct_inject.protocol_client import AsyncDirectInjectProtocolClient
+from bss_direct_inject.reconnect import ReconnectPolicy
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+ESCAPED = DiTarget(
+    node=0x0002, virtual_device=0x03, object_id=0x000106, state_variable=0x0015
+)
+
+
+@pytest.mark.asyncio
+async def test_sends_and_matches_acks_against_simulator() -> None:
+    metrics = ClientMetrics()
+    async with DeviceSimulator(port=0) as simulator:
+        host, port = simulator.address
+        async with AsyncDirectInjectProtocolClient(
+            host, port=port, expect_ack=True, ack_window=8, metrics=metrics
+        ) as client:
+            assert await client.set_sv(TARGET, data=-5) is True
+            assert (
+                await client.send_many([build_set_sv_percent_body(ESCAPED, 3)] * 20)
+                == [True] * 20
+            )
+            with pytest.raises(AsyncDirectInjectNakError):
+                await client.send_body(b"\x00")
+            with pytest.raises(AsyncDirectInjectError, match="background"):
+                await client.read_body()
+        assert simulator.get(TARGET) == -5
+        assert simulator.get_percent(ESCAPED) == 3
+    assert metrics.acks == 21
+    assert metrics.naks == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatches_notifications_split_across_reads() -> None:
+    frames = b"".join(
+        DirectInjectCodec.encode(build_set_sv_body(target, value))
+        for target, value in [(TARGET, 1), (ESCAPED, 2), (TARGET, 3)]
+    )
+    big = DirectInjectCodec.encode(b"\x91" + b"x" * 70000)
+
+    async def handler(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        for index in range(len(frames)):
+            writer.write(frames[index : index + 1])
+            await writer.drain()
+        writer.write(big + frames)
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    async with server, AsyncDirectInjectProtocolClient(host, port=port) as client:
+        updates = client.notification_queue(None)
+        values = [(await updates.get()).value for _ in range(6)]
+        assert values == [1, 2, 3, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_reconnects_and_replays_subscriptions() -> None:
+    simulator = DeviceSimulator(port=0)
+    await simulator.start()
+    host, port = simulator.address
+    async with AsyncDirectInjectProtocolClient(
+        host,
+        port=port,
+        expect_ack=True,
+        reconnect=ReconnectPolicy(initial_delay=0.01),
+    ) as client:
+        assert await client.subscribe_sv(TARGET, rate_ms=1000) is True
+        await simulator.close()
+        async with DeviceSimulator(port=port) as restarted:
+            restarted.set_value(TARGET, 7)
+            updates = client.notification_queue(TARGET)
+            notification = await asyncio.wait_for(updates.get(), 2.0)
+            assert notification.value == 7
+            assert await client.set_sv(TARGET, data=1) is True
+
+
+def test_requires_background_reading() -> None:
+    with pytest.raises(ValueError, match="background"):
+        AsyncDirectInjectProtocolClient("127.0.0.1", background_reader=False)
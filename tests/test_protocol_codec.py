@@ -7,6 +7,8 @@ from bss_direct_inject.protocol import (
     NAK,
     STX,
     DirectInjectCodec,
+    FrameDecoder,
+    scan_frames,
 )
 
 
@@ -45,3 +47,81 @@ def test_decode_rejects_short_frame() -> None:
 def test_decode_rejects_escape_at_end() -> None:
     with pytest.raises(ValueError, match="Escape"):
         DirectInjectCodec.decode(bytes([STX, ESC, ETX]))
+
+
+def test_encode_passes_plain_body_through_unchanged() -> None:
+    body = bytes([0x88, 0x00, 0x01, 0x01])
+    frame = DirectInjectCodec.encode(body)
+    assert frame[1:-2] == body
+
+
+def test_encode_decode_roundtrip_long_worst_case_body() -> None:
+    body = bytes([STX, ETX, ACK, NAK, ESC, 0x88, 0xFF]) * 40
+    frame = DirectInjectCodec.encode(body)
+    assert len(frame) == 2 + len(body) + 5 * 40 + 1
+    assert DirectInjectCodec.decode(frame) == body
+
+
+def test_encode_checksum_matches_xor_for_long_body() -> None:
+    body = bytes(range(256)) + b"\x42"
+    checksum = 0
+    for byte in body:
+        checksum ^= byte
+    assert DirectInjectCodec.decode(DirectInjectCodec.encode(body)) == body
+    assert DirectInjectCodec.encode(body)[-2] == checksum
+
+
+def test_decode_rejects_invalid_escapes() -> None:
+    with pytest.raises(ValueError, match="another escape"):
+        DirectInjectCodec.decode(bytes([STX, 0x88, ESC, ESC, 0x9B, ETX]))
+    with pytest.raises(ValueError, match="0x80"):
+        DirectInjectCodec.decode(bytes([STX, 0x88, ESC, 0x01, 0x89, ETX]))
+
+
+def test_frame_decoder_splits_control_bytes_and_frames() -> None:
+    frame = DirectInjectCodec.encode(bytes([0x88, STX, 0x42]))
+    decoder = FrameDecoder()
+    assert decoder.feed(bytes([ACK]) + frame + bytes([NAK])) == [
+        bytes([ACK]),
+        frame,
+        bytes([NAK]),
+    ]
+
+
+def test_frame_decoder_reassembles_across_chunks() -> None:
+    frame = DirectInjectCodec.encode(b"\x88\x01\x02\x03")
+    decoder = FrameDecoder()
+    frames = []
+    for i in range(len(frame)):
+        frames.extend(decoder.feed(frame[i : i + 1]))
+    assert frames == [frame]
+
+
+def test_frame_decoder_drops_junk_and_truncated_frames() -> None:
+    frame = DirectInjectCodec.encode(b"\x88\x01")
+    decoder = FrameDecoder()
+    assert decoder.feed(b"\x00\x01" + bytes([STX, 0x88]) + frame) == [frame]
+
+
+def test_scan_frames_dispatches_in_place_and_reports_consumed_bytes() -> None:
+    plain = DirectInjectCodec.encode(b"\x88\x01\x02")
+    escaped = DirectInjectCodec.encode(bytes([0x88, STX, 0x42]))
+    bad = plain[:-2] + bytes([plain[-2] ^ 0xFF]) + plain[-1:]
+    partial = DirectInjectCodec.encode(b"\x88\x07")[:3]
+    buffer = bytearray(bytes([ACK]) + plain + escaped + bad + bytes([NAK]) + partial)
+    events: list[object] = []
+    consumed = scan_frames(
+        buffer,
+        len(buffer),
+        events.append,
+        lambda body: events.append(bytes(body)),
+        lambda exc: events.append(str(exc)),
+    )
+    assert events == [
+        ACK,
+        b"\x88\x01\x02",
+        bytes([0x88, STX, 0x42]),
+        "Checksum does not match message body.",
+        NAK,
+    ]
+    assert buffer[consumed:] == partial
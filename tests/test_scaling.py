@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from bss_direct_inject import scaling
+
+
+@pytest.mark.parametrize(
+    ("db", "raw"),
+    [(10.0, 100000), (0.0, 0), (-10.0, -100000), (-100.0, -300000), (-20.0, -160206)],
+)
+def test_gain_law_round_trips(db: float, raw: int) -> None:
+    assert scaling.gain_to_raw(db) == raw
+    assert scaling.raw_to_gain(raw) == pytest.approx(db, abs=1e-4)
+
+
+def test_linear_and_log_laws() -> None:
+    assert scaling.percent_to_raw(50) == 50 * 65536
+    assert scaling.raw_to_percent(65536) == 1.0
+    assert scaling.set_sv_percent_to_raw(12.5) == 1250
+    assert scaling.raw_to_set_sv_percent(10000) == 100.0
+    assert scaling.scalar_to_raw(1.5) == 15000
+    assert scaling.raw_to_scalar(-5000) == -0.5
+    assert scaling.delay_to_raw(10) == 960
+    assert scaling.raw_to_delay(96) == 1.0
+    assert scaling.frequency_to_raw(1000) == 3_000_000
+    assert scaling.raw_to_frequency(3_000_000) == pytest.approx(1000)
+
+
+def test_many_variants_match_scalar_converters() -> None:
+    dbs = [-80.0, -10.5, -10.0, 0.0, 12.0]
+    hz = [20.0, 1000.0, 20000.0]
+    percents = [0.0, 33.3, 100.0]
+    cases = [
+        (scaling.gain_to_raw_many, scaling.gain_to_raw, dbs),
+        (scaling.frequency_to_raw_many, scaling.frequency_to_raw, hz),
+        (scaling.percent_to_raw_many, scaling.percent_to_raw, percents),
+        (scaling.set_sv_percent_to_raw_many, scaling.set_sv_percent_to_raw, percents),
+        (scaling.scalar_to_raw_many, scaling.scalar_to_raw, [-1.25, 2.0]),
+        (scaling.delay_to_raw_many, scaling.delay_to_raw, [0.5, 100.0]),
+    ]
+    for many, one, values in cases:
+        raws = many(values)
+        assert raws.typecode == "i"
+        assert list(raws) == [one(value) for value in values]
+    inverses = [
+        (scaling.raw_to_gain_many, scaling.raw_to_gain),
+        (scaling.raw_to_frequency_many, scaling.raw_to_frequency),
+        (scaling.raw_to_percent_many, scaling.raw_to_percent),
+        (scaling.raw_to_set_sv_percent_many, scaling.raw_to_set_sv_percent),
+        (scaling.raw_to_scalar_many, scaling.raw_to_scalar),
+        (scaling.raw_to_delay_many, scaling.raw_to_delay),
+    ]
+    raws = [-300000, -100001, 0, 1_301_030, 4_301_030]
+    for many, one in inverses:
+        assert list(many(raws)) == pytest.approx([one(raw) for raw in raws])
+
+
+def test_out_of_range_values_raise_value_error() -> None:
+    with pytest.raises(ValueError, match="32-bit"):
+        scaling.percent_to_raw(40000)
+    with pytest.raises(ValueError, match="32-bit"):
+        scaling.gain_to_raw(-math.inf)
+    with pytest.raises(ValueError, match="32-bit"):
+        scaling.percent_to_raw_many([40000])
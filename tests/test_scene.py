@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from bss_direct_inject.async_client import AsyncDirectInjectClient
+from bss_direct_inject.mirror import SvMirror
+from bss_direct_inject.protocol import (
+    DiCommand,
+    DiNotification,
+    DiTarget,
+    build_set_sv_body,
+    build_set_sv_percent_body,
+)
+from bss_direct_inject.scene import (
+    Scene,
+    SceneChange,
+    SceneDiff,
+    apply_diff,
+    apply_diff_async,
+)
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGETS = [
+    DiTarget(node=1, virtual_device=3, object_id=0x000100 + index, state_variable=0)
+    for index in range(4)
+]
+
+
+class RecordingClient:
+    def __init__(self) -> None:
+        self.batches: list[list[bytes]] = []
+
+    def send_many(self, bodies: list[bytes]) -> None:
+        self.batches.append(bodies)
+
+
+def test_diff_skips_known_values_and_inverts() -> None:
+    known = {TARGETS[0]: 0, TARGETS[1]: 5}
+    scene = Scene({TARGETS[0]: 0, TARGETS[1]: 6, TARGETS[2]: 7})
+    diff = scene.diff(known)
+    assert list(diff) == [
+        SceneChange(TARGETS[1], 6, 5),
+        SceneChange(TARGETS[2], 7, None),
+    ]
+    assert diff.bodies() == [
+        build_set_sv_body(TARGETS[1], 6),
+        build_set_sv_body(TARGETS[2], 7),
+    ]
+    assert diff.inverse() == SceneDiff(
+        DiCommand.SET_SV, (SceneChange(TARGETS[1], 5, 6),)
+    )
+
+
+def test_apply_batches_changes_and_records_them() -> None:
+    client = RecordingClient()
+    known: dict[DiTarget, int] = {}
+    scene = Scene({target: 100 for target in TARGETS})
+    assert apply_diff(client, scene.diff(known), known, batch_size=3) == 4
+    assert [len(batch) for batch in client.batches] == [3, 1]
+    assert known == scene.values
+    assert len(scene.diff(known)) == 0
+
+
+def test_apply_paces_batches_to_max_rate() -> None:
+    client = RecordingClient()
+    diff = Scene({target: 1 for target in TARGETS}).diff({})
+    started = time.monotonic()
+    apply_diff(client, diff, batch_size=1, max_rate=100.0)
+    assert time.monotonic() - started >= 0.03
+
+
+def test_percent_scenes_diff_against_the_mirror() -> None:
+    mirror = SvMirror()
+    mirror.update(DiNotification(DiCommand.SET_SV_PERCENT, TARGETS[0], 65536))
+    mirror.update(DiNotification(DiCommand.SET_SV, TARGETS[1], 65536))
+    scene = Scene(
+        {TARGETS[0]: 65536, TARGETS[1]: 65536}, command=DiCommand.SET_SV_PERCENT
+    )
+    diff = scene.diff(mirror)
+    assert diff.bodies() == [build_set_sv_percent_body(TARGETS[1], 65536)]
+    apply_diff(RecordingClient(), diff, mirror)
+    assert mirror.get_percent(TARGETS[1]) == 65536
+    assert Scene.capture(mirror, TARGETS, DiCommand.SET_SV_PERCENT) == scene
+
+
+def test_scene_validates_command_and_values() -> None:
+    with pytest.raises(ValueError):
+        Scene(command=DiCommand.SUBSCRIBE_SV)
+    with pytest.raises(ValueError):
+        Scene({TARGETS[0]: 2**31})
+    with pytest.raises(ValueError):
+        apply_diff(RecordingClient(), Scene({TARGETS[0]: 1}).diff({}), batch_size=0)
+
+
+@pytest.mark.asyncio
+async def test_apply_and_undo_against_simulator() -> None:
+    async with DeviceSimulator(port=0) as simulator:
+        simulator.load((target, 0) for target in TARGETS)
+        known = {target: 0 for target in TARGETS}
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(host, port=port, expect_ack=True) as client:
+            diff = Scene({TARGETS[0]: 0, TARGETS[1]: -50000}).diff(known)
+            assert await apply_diff_async(client, diff, known) == 1
+            assert simulator.get(TARGETS[1]) == -50000
+            await apply_diff_async(client, diff.inverse(), known)
+        assert simulator.get(TARGETS[1]) == 0
+        assert simulator.received == 2
+        assert known == {target: 0 for target in TARGETS}
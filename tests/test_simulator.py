@@ -0,0 +1,92 @@
+import asyncio
+import typing
+
+import pytest
+
+from bss_direct_inject.async_client import (
+    AsyncDirectInjectClient,
+    AsyncDirectInjectError,
+    AsyncDirectInjectNakError,
+)
+from bss_direct_inject.coalesce import PERCENT_MAX
+from bss_direct_inject.protocol import STX, DiCommand, DiTarget
+from bss_direct_inject.simulator import DeviceSimulator
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+
+
+def _client(simulator: DeviceSimulator, **options) -> AsyncDirectInjectClient:
+    host, port = simulator.address
+    return AsyncDirectInjectClient(host, port=port, **options)
+
+
+@pytest.mark.asyncio
+async def test_simulator_stores_state_and_acks() -> None:
+    async with DeviceSimulator(port=0) as simulator:
+        async with _client(simulator, expect_ack=True) as client:
+            assert await client.set_sv(TARGET, data=-5) is True
+            assert await client.set_sv_percent(TARGET, PERCENT_MAX - 10) is True
+            assert await client.bump_sv_percent(TARGET, 100) is True
+            assert await client.venue_preset_recall(2) is True
+        assert simulator.get(TARGET) == -5
+        assert simulator.get_percent(TARGET) == PERCENT_MAX
+        assert simulator.received == 4
+
+
+@pytest.mark.asyncio
+async def test_simulator_naks_bad_frames() -> None:
+    async with DeviceSimulator(port=0) as simulator:
+        async with _client(simulator, expect_ack=True) as client:
+            with pytest.raises(AsyncDirectInjectNakError):
+                await client.send_frame(bytes([STX, 0x88, 0x00, 0x01, 0x03]))
+            with pytest.raises(AsyncDirectInjectNakError):
+                await client.send_body(b"\x42\x00")
+        assert simulator.naks == 2
+
+
+@pytest.mark.asyncio
+async def test_simulator_pushes_subscribed_changes() -> None:
+    async with DeviceSimulator(port=0) as simulator:
+        simulator.set_value(TARGET, 7)
+        async with _client(simulator, background_reader=True) as client:
+            updates = client.notification_queue(TARGET)
+            await client.subscribe_sv(TARGET, rate_ms=5)
+            first = await asyncio.wait_for(updates.get(), timeout=1.0)
+            simulator.set_value(TARGET, 8)
+            second = await asyncio.wait_for(updates.get(), timeout=1.0)
+            await client.unsubscribe_sv(TARGET)
+            assert (first.command, first.value) == (DiCommand.SET_SV, 7)
+            assert second.value == 8
+            await asyncio.sleep(0.02)
+            simulator.set_value(TARGET, 9)
+            await asyncio.sleep(0.02)
+            assert updates.empty()
+
+
+@pytest.mark.asyncio
+async def test_simulator_latency_keeps_reply_order() -> None:
+    async with DeviceSimulator(port=0, latency=0.01, jitter=0.01, seed=1) as sim:
+        async with _client(
+            sim, expect_ack=True, background_reader=True, ack_window=16
+        ) as client:
+            futures = [
+                await client.send_body_pipelined(bytes([0x88]) + bytes(12))
+                for _ in range(16)
+            ]
+            assert await asyncio.gather(*futures) == [True] * 16
+
+
+@pytest.mark.asyncio
+async def test_simulator_drops_frames() -> None:
+    async with DeviceSimulator(port=0, drop_rate=1.0) as simulator:
+        async with _client(simulator, expect_ack=True, timeout=0.05) as client:
+            with pytest.raises(AsyncDirectInjectError, match="Timed out"):
+                await client.set_sv(TARGET, data=1)
+        assert simulator.dropped == 1
+        assert simulator.get(TARGET) is None
+
+
+def test_simulator_annotations_resolve() -> None:
+    assert "_sessions" in typing.get_type_hints(DeviceSimulator)
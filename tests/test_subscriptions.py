@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from bss_direct_inject.async_client import AsyncDirectInjectClient
+from bss_direct_inject.protocol import DiCommand, DiNotification, DiTarget
+from bss_direct_inject.simulator import DeviceSimulator
+from bss_direct_inject.subscriptions import AsyncSubscriptionManager
+
+TARGET = DiTarget(
+    node=0x0001, virtual_device=0x03, object_id=0x000100, state_variable=0x0000
+)
+
+
+class RecordingClient:
+    background_reader = True
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, DiTarget, int | None]] = []
+        self.handlers: list[DiTarget | None] = []
+
+    async def subscribe_sv(self, target: DiTarget, rate_ms: int) -> bool:
+        self.calls.append(("subscribe_sv", target, rate_ms))
+        return True
+
+    async def unsubscribe_sv(self, target: DiTarget) -> bool:
+        self.calls.append(("unsubscribe_sv", target, None))
+        return True
+
+    async def subscribe_sv_percent(self, target: DiTarget, rate_ms: int) -> bool:
+        self.calls.append(("subscribe_sv_percent", target, rate_ms))
+        return True
+
+    async def unsubscribe_sv_percent(self, target: DiTarget) -> bool:
+        self.calls.append(("unsubscribe_sv_percent", target, None))
+        return True
+
+    def add_handler(self, target: DiTarget | None, handler: object) -> None:
+        self.handlers.append(target)
+
+    def remove_handler(self, target: DiTarget | None, handler: object) -> None:
+        self.handlers.remove(target)
+
+
+@pytest.mark.asyncio
+async def test_consumers_share_one_device_subscription_at_the_fastest_rate() -> None:
+    client = RecordingClient()
+    manager = AsyncSubscriptionManager(client)
+    slow = await manager.subscribe(TARGET, 500, lambda notification: None)
+    fast = await manager.subscribe(TARGET, 100, lambda notification: None)
+    again = await manager.subscribe(TARGET, 200, lambda notification: None)
+    percent = await manager.subscribe(TARGET, 100, print, percent=True)
+    assert manager.consumers(TARGET) == 3
+    assert client.handlers == [TARGET]
+    await fast.close()
+    await again.close()
+    await again.close()
+    await slow.close()
+    assert client.handlers == [TARGET]
+    await percent.close()
+    assert client.calls == [
+        ("subscribe_sv", TARGET, 500),
+        ("subscribe_sv", TARGET, 100),
+        ("subscribe_sv_percent", TARGET, 100),
+        ("subscribe_sv", TARGET, 200),
+        ("subscribe_sv", TARGET, 500),
+        ("unsubscribe_sv", TARGET, None),
+        ("unsubscribe_sv_percent", TARGET, None),
+    ]
+    assert client.handlers == []
+    assert manager.device_subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_slow_consumers_are_decimated_but_see_the_last_value() -> None:
+    manager = AsyncSubscriptionManager(RecordingClient())
+    fast: list[int] = []
+    slow: list[int] = []
+    await manager.subscribe(TARGET, 10, lambda n: fast.append(n.value))
+    await manager.subscribe(TARGET, 100, lambda n: slow.append(n.value))
+    for value in range(6):
+        manager._dispatch(DiNotification(DiCommand.SET_SV, TARGET, value))
+    manager._dispatch(DiNotification(DiCommand.SET_SV_PERCENT, TARGET, 9))
+    assert fast == [0, 1, 2, 3, 4, 5]
+    assert slow == [0]
+    await asyncio.sleep(0.15)
+    assert slow == [0, 5]
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_subscribe_is_rolled_back() -> None:
+    client = RecordingClient()
+
+    async def refuse(target: DiTarget, rate_ms: int) -> bool:
+        raise OSError
+
+    client.subscribe_sv = refuse  # type: ignore[method-assign]
+    manager = AsyncSubscriptionManager(client)
+    with pytest.raises(OSError):
+        await manager.subscribe(TARGET, 100, print)
+    assert manager.consumers(TARGET) == 0
+    assert client.handlers == []
+    with pytest.raises(ValueError):
+        await manager.subscribe(TARGET, -1, print)
+    with pytest.raises(ValueError):
+        AsyncSubscriptionManager(AsyncDirectInjectClient("127.0.0.1"))
+
+
+@pytest.mark.asyncio
+async def test_one_consumer_leaving_does_not_break_the_others() -> None:
+    async with DeviceSimulator(port=0, meters=frozenset({TARGET})) as simulator:
+        simulator.set_value(TARGET, 7)
+        host, port = simulator.address
+        async with AsyncDirectInjectClient(
+            host, port=port, expect_ack=True, background_reader=True
+        ) as client:
+            async with AsyncSubscriptionManager(client) as manager:
+                first: asyncio.Queue[int] = asyncio.Queue()
+                second: asyncio.Queue[int] = asyncio.Queue()
+                leaving = await manager.subscribe(
+                    TARGET, 10, lambda n: first.put_nowait(n.value)
+                )
+                await manager.subscribe(
+                    TARGET, 20, lambda n: second.put_nowait(n.value)
+                )
+                assert client.subscriptions == {(DiCommand.SUBSCRIBE_SV, TARGET): 10}
+                await leaving.close()
+                assert client.subscriptions == {(DiCommand.SUBSCRIBE_SV, TARGET): 20}
+                while not second.empty():
+                    second.get_nowait()
+                assert await asyncio.wait_for(second.get(), 1.0) == 7
+            assert client.subscriptions == {}